@@ -5,10 +5,12 @@ example for the joint motion synchronization algorithm
 import numpy as np
 import math
 import traj
+import traj.ros_logging
 from matplotlib import pyplot as plt
 import rospy
 
 rospy.init_node('segment_synchronization', log_level=rospy.DEBUG)
+traj.ros_logging.use_rospy_logging()
 #### limits:
 abs_max_pos= 10.0 
 abs_max_vel= 3.0
@@ -96,13 +98,10 @@ traj_acc = [ [] for jt in range(n_jts)]
 traj_jrk = [ [] for jt in range(n_jts)]
 traj_time = [ ]
 
+samplers = [traj.SegmentSampler(t_start, pos_start[jt], vel_start[jt], jt_jrk[jt], jt_dur[jt]) for jt in range(n_jts)]
 while t <= syn_t:
 	for jt in range( n_jts ):
-		p_start = pos_start[jt]
-		v_start = vel_start[jt]
-		phases_dur = jt_dur[jt]
-		phases_jrk = jt_jrk[jt]
-		pos, vel, acc, jrk = traj.sample_segment(t, t_start, p_start, v_start, phases_jrk, phases_dur)
+		pos, vel, acc, jrk = samplers[jt](t)
 		traj_pos[jt].append(  pos  )
 		traj_vel[jt].append(  vel  )
 		traj_acc[jt].append(  acc  )
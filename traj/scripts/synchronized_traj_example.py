@@ -5,10 +5,12 @@ example to check the joint motion synchronization algorithm [full trajectory]
 import numpy as np
 import math
 import traj
+import traj.ros_logging
 from matplotlib import pyplot as plt
 import rospy
 
 rospy.init_node('traj_synchronization', log_level=rospy.DEBUG)
+traj.ros_logging.use_rospy_logging()
 # limits, option_1: same limits that Jon used in first demo file
 abs_max_pos = np.deg2rad(np.array([ 185.0,    60.0,  132.0,  360.0,  125.0,   360.0]))
 abs_max_vel = np.deg2rad(np.array([ 150.0,   150.0,  200.0,  300.0,  300.0,   600.0]))
@@ -93,19 +95,19 @@ for seg in range(n_segs):
 														path[seg], path[seg+1], estimated_vel[seg], estimated_vel[seg+1],
 		                        						abs_max_pos, abs_max_vel, abs_max_acc, abs_max_jrk)
 	waypt_times.append(waypt_times[-1] + min_sync_time)
+	seg_times = []
 	while abs_t <= waypt_times[-1]:
-		for jt in range(n_jts):
-			p_start = path[seg][jt]
-			v_start = estimated_vel[seg][jt]
-			phases_dur = phase_dur_jt[jt]
-			phases_jrk = phase_jrk_jt[jt]
-			pos, vel, acc, jrk = traj.sample_segment(abs_t, waypt_times[-2], p_start, v_start, phases_jrk, phases_dur)
-			traj_pos[jt].append(pos)
-			traj_vel[jt].append(vel)
-			traj_acc[jt].append(acc)
-			traj_jrk[jt].append(jrk)	
-		traj_time.append(abs_t)
+		seg_times.append(abs_t)
 		abs_t = abs_t + 1/frq
+	# sample all joints at all the time instants of this segment at once: (times x joints x [pos, vel, acc, jrk])
+	sampler = traj.MultiJointSegmentSampler(waypt_times[-2], path[seg], estimated_vel[seg], phase_jrk_jt, phase_dur_jt)
+	samples = sampler(seg_times)
+	for jt in range(n_jts):
+		traj_pos[jt].extend(samples[:, jt, 0])
+		traj_vel[jt].extend(samples[:, jt, 1])
+		traj_acc[jt].extend(samples[:, jt, 2])
+		traj_jrk[jt].extend(samples[:, jt, 3])
+	traj_time.extend(seg_times)
 
 # plot pos, vel, acc, jrk. plot waypoints and estimated velocity as well to check if there is any difference 
 fig, axes = plt.subplots(4, sharex=True)
@@ -1,25 +1,37 @@
-from .parameterize_path import parameterize_path, parameterize_path_with_blends
-from .piecewise_function import PiecewiseFunction
+from .parameterize_path import parameterize_path, parameterize_path_with_blends, BlendedPath
+from .simplify_path import simplify_path
+from .piecewise_function import PiecewiseFunction, PiecewisePolynomial
 from . import seven_segment_type3
 from . import seven_segment_type4
 from . import plot
+from . import planning_stats
 
 from .trajectory import trajectory_for_path
 from .trajectory_v2 import trajectory_for_path_v2
+from .reachability import time_optimal_path_velocities
+from .path_index import PathIndex
 
 from .traj_segment import fit_traj_segment
+from .traj_segment import fit_traj_segment_phases
+from .traj_segment import TrajSegment
 from .traj_segment import calculate_jerk_sign_and_duration
 
 from .segment_planning import traj_segment_planning
 from .segment_planning import calculate_min_pos_reached_acc_jrk_time_acc_time_to_reach_final_vel
+from .segment_planning_batch import traj_segment_planning_batch
 
 from .sample_segment import sample_segment
+from .sample_segment import SegmentSampler
+from .sample_segment import MultiJointSegmentSampler
 from .plot_traj_segment import plot_traj_segment
+from .online_trajectory_generator import OnlineTrajectoryGenerator
 
 from .cubic_eq_roots import real_roots_cubic_eq
 from .cubic_eq_roots import quad_eq_real_root
 from .cubic_eq_roots import min_positive_root2
 from .cubic_eq_roots import min_positive_root3
+from .cubic_eq_roots import real_roots_cubic_eq_batch
+from .cubic_eq_roots import min_positive_root_cubic_eq_batch
 
 from .max_reachable_vel import max_reachable_vel_per_segment
 from .param_max_reachable_vel import set_velocities_at_stop_points_to_zero
@@ -30,3 +42,6 @@ from .synchronize_joint_motion import synchronize_joint_motion
 from .synchronize_joint_motion import motion_direction
 from .synchronize_joint_motion import segment_synchronization
 
+
+from .batch_planning import trajectories_for_paths
+from .batch_planning import synchronize_segments
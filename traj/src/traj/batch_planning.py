@@ -0,0 +1,147 @@
+"""
+Planning of batches of independent trajectories in a pool of worker processes.
+
+Each request (a path, or a multi joint segment to synchronize) is planned by the usual single
+threaded planner in a worker process. Workers send back plain numpy arrays (piece boundaries and
+polynomial coefficients, or phase tables) instead of sympy objects, so the results are cheap to
+pickle, and the trajectories are rebuilt as PiecewisePolynomials in the calling process.
+
+Starting a pool costs much more than planning a single path (every worker imports numpy and
+sympy), so callers planning many batches should create one executor and pass it to every call:
+
+    with concurrent.futures.ProcessPoolExecutor() as executor:
+        for paths in candidate_paths_of_each_cycle:
+            trajectories = traj.trajectories_for_paths(paths, v_max, a_max, j_max, executor=executor)
+
+Requests which the planner rejects with a ValueError give None instead of a result, so one
+infeasible candidate does not discard the rest of the batch.
+"""
+import concurrent.futures
+import logging
+import os
+
+import numpy as np
+from sympy import Symbol
+
+from .piecewise_function import PiecewisePolynomial
+from .synchronize_joint_motion import segment_synchronization
+from .trajectory import trajectory_for_path
+from .trajectory_v2 import trajectory_for_path_v2
+
+logger = logging.getLogger(__name__)
+
+
+def _trajectory_arrays(path, v_start, v_end, max_velocities, max_accelerations, max_jerks, version):
+    """
+    Plan one path and return the boundaries and the position, velocity, acceleration and jerk
+    coefficients, or None if the path can not be planned.
+    """
+    try:
+        if version == 1:
+            functions = [function.to_polynomial()
+                         for function in trajectory_for_path(path, max_velocities, max_accelerations, max_jerks)]
+        else:
+            functions = trajectory_for_path_v2(path, v_start, v_end, max_velocities, max_accelerations, max_jerks,
+                                               numeric=True)
+    except ValueError as error:
+        logger.debug('path can not be planned: %s', error)
+        return None
+    return functions[0].boundaries, [function.coefficients for function in functions]
+
+
+def _synchronization_arrays(pos_start, pos_end, vel_start, vel_end, abs_max_pos, abs_max_vel, abs_max_acc,
+                            abs_max_jrk):
+    """
+    Synchronize one segment and return the synchronization time and its (joints x phases)
+    durations and jerks, or None if the segment can not be synchronized.
+    """
+    try:
+        sync_time, phase_durations, phase_jerks = segment_synchronization(
+            pos_start, pos_end, vel_start, vel_end, abs_max_pos, abs_max_vel, abs_max_acc, abs_max_jrk)
+    except ValueError as error:
+        logger.debug('segment can not be synchronized: %s', error)
+        return None
+    # The reference joint may have fewer phases than the others, pad it with empty phases.
+    n_phases = max(len(durations) for durations in phase_durations)
+    durations = np.zeros((len(phase_durations), n_phases))
+    jerks = np.zeros((len(phase_jerks), n_phases))
+    for jt, (joint_durations, joint_jerks) in enumerate(zip(phase_durations, phase_jerks)):
+        durations[jt, :len(joint_durations)] = joint_durations
+        jerks[jt, :len(joint_jerks)] = joint_jerks
+    return float(sync_time), durations, jerks
+
+
+def _map(function, argument_lists, processes, executor, chunksize):
+    """
+    Call function with each set of arguments, in the given executor or in a new pool of processes.
+    A single process plans everything in the calling process.
+    """
+    n_requests = len(argument_lists[0])
+    if executor is None and (processes == 1 or n_requests <= 1):
+        return list(map(function, *argument_lists))
+    if chunksize is None:
+        # A few chunks per worker balances the load without paying the transfer cost for every request.
+        n_workers = processes or os.cpu_count() or 1
+        chunksize = max(1, n_requests // (4 * n_workers))
+    if executor is not None:
+        return list(executor.map(function, *argument_lists, chunksize=chunksize))
+    with concurrent.futures.ProcessPoolExecutor(processes) as pool:
+        return list(pool.map(function, *argument_lists, chunksize=chunksize))
+
+
+def trajectories_for_paths(paths, max_velocities, max_accelerations, max_jerks, v_start=None, v_end=None, version=2,
+                           processes=None, executor=None, chunksize=None):
+    """
+    Time parameterize each of the given paths, as trajectory_for_path_v2 (or trajectory_for_path
+    if version is 1) does, with the planning spread over a pool of processes.
+
+    The start and end velocities (zero by default) and the limits are shared by all paths. The
+    paths are planned in a new pool of "processes" workers (by default one per core), or in
+    "executor" if one is given. Returns a list with the position, velocity, acceleration and jerk
+    PiecewisePolynomials of each path, or None for the paths which can not be planned.
+    """
+    paths = [np.asarray(path, dtype=np.float64) for path in paths]
+    if not paths:
+        return []
+    dofs = paths[0].shape[1]
+    if version == 1 and (v_start is not None or v_end is not None):
+        raise ValueError('trajectory_for_path always starts and ends at rest')
+    v_start = np.zeros(dofs) if v_start is None else v_start
+    v_end = np.zeros(dofs) if v_end is None else v_end
+    n_paths = len(paths)
+    results = _map(_trajectory_arrays,
+                   [paths] + [[argument] * n_paths for argument in
+                              (v_start, v_end, max_velocities, max_accelerations, max_jerks, version)],
+                   processes, executor, chunksize)
+
+    t = Symbol('t')
+    trajectories = []
+    for result in results:
+        if result is None:
+            trajectories.append(None)
+            continue
+        boundaries, coefficients = result
+        trajectories.append(tuple(PiecewisePolynomial(boundaries, function_coefficients, t)
+                                  for function_coefficients in coefficients))
+    return trajectories
+
+
+def synchronize_segments(segments, abs_max_pos, abs_max_vel, abs_max_acc, abs_max_jrk, processes=None, executor=None,
+                         chunksize=None):
+    """
+    Synchronize each of the given multi joint segments with segment_synchronization, with the
+    planning spread over a pool of processes (see trajectories_for_paths).
+
+    Each segment is a tuple (pos_start, pos_end, vel_start, vel_end) of per joint arrays, the
+    limits are shared by all segments. Returns a list with the synchronization time and the
+    (joints x phases) phase durations and jerks of each segment, or None for the segments which can
+    not be synchronized. Joints with fewer phases than the others end with zero duration phases.
+    """
+    segments = list(segments)
+    if not segments:
+        return []
+    n_segments = len(segments)
+    return _map(_synchronization_arrays,
+                [list(arguments) for arguments in zip(*segments)] +
+                [[limit] * n_segments for limit in (abs_max_pos, abs_max_vel, abs_max_acc, abs_max_jrk)],
+                processes, executor, chunksize)
@@ -1,5 +1,6 @@
 #!/usr/bin/env python
 import math
+import numpy as np
 
 
 def real_roots_cubic_eq ( a,  b,  c,  d):
@@ -163,3 +164,82 @@ def min_positive_root3( r1,  r2,  r3):
     else:
         raise ValueError("there is no real positive roots!" ) 
     return min_rt
+
+
+def real_roots_cubic_eq_batch(a, b, c, d):
+    '''
+    vectorized "real_roots_cubic_eq": finds the real roots of N cubic equations a*x^3 + b*x^2 + c*x + d = 0 at once.
+    a, b, c, d are arrays (or scalars) which are broadcast against each other.
+    it returns an array of shape (N, 3) with the real roots of each equation, missing roots are NaN instead of the -100 sentinel.
+    degenerate equations are handled with masks: a == 0 is solved as a quadratic (or linear) equation,
+    and abs(d) < 1e-20 gives a zero root plus the roots of the remaining quadratic.
+    '''
+    a, b, c, d = np.broadcast_arrays(*[np.atleast_1d(np.asarray(x, dtype=np.float64)) for x in (a, b, c, d)])
+    roots = np.full(a.shape + (3,), np.nan)
+
+    # every branch is evaluated for every equation, branches that don't apply may produce nan/inf and are masked out
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cubic = a != 0.0
+        zero_root = cubic & (np.abs(d) < 1e-20)
+        full_cubic = cubic & ~zero_root
+
+        # a == 0: quadratic b*x^2 + c*x + d, or linear if b is zero too
+        quad_roots = _real_roots_quad_eq_batch(b, c, d)
+        roots[~cubic, :2] = quad_roots[~cubic]
+
+        # d == 0: x*(a*x^2 + b*x + c) = 0
+        roots[zero_root, 0] = 0.0
+        roots[zero_root, 1:] = _real_roots_quad_eq_batch(a, b, c)[zero_root]
+
+        b = b/a
+        c = c/a
+        d = d/a
+        q = (3.0*c - b*b)/9.0
+        r = (-27.0*d + b*(9.0*c - 2.0*b*b))/54.0
+        disc = q*q*q + r*r
+        term1 = b/3.0
+
+        # disc > 0: one root real, two are complex
+        sqrt_disc = np.sqrt(disc)
+        one_real = np.cbrt(r + sqrt_disc) + np.cbrt(r - sqrt_disc) - term1
+        # disc == 0: all roots real, at least two are equal
+        r13 = np.cbrt(r)
+        equal_roots = np.stack((-term1 + 2.0*r13, -(r13 + term1), -(r13 + term1)), axis=-1)
+        # disc < 0: all roots real and unequal
+        minus_q = -q
+        theta = np.arccos(np.clip(r/np.sqrt(minus_q*minus_q*minus_q), -1.0, 1.0))
+        k = np.arange(3)
+        unequal_roots = (-term1[..., np.newaxis] +
+                         2.0*np.sqrt(minus_q)[..., np.newaxis]*np.cos((theta[..., np.newaxis] + 2.0*k*math.pi)/3.0))
+
+        roots[full_cubic & (disc > 0.0), 0] = one_real[full_cubic & (disc > 0.0)]
+        roots[full_cubic & (disc == 0.0)] = equal_roots[full_cubic & (disc == 0.0)]
+        roots[full_cubic & (disc < 0.0)] = unequal_roots[full_cubic & (disc < 0.0)]
+    return roots
+
+
+def _real_roots_quad_eq_batch(a, b, c):
+    '''
+    real roots of a*x^2 + b*x + c = 0 as an array of shape (N, 2), NaN where a root doesn't exist.
+    a == 0 gives the root of the linear equation (once)
+    '''
+    roots = np.full(a.shape + (2,), np.nan)
+    disc = b*b - 4.0*a*c
+    quadratic = (a != 0.0) & (disc >= 0.0)
+    sqrt_disc = np.sqrt(disc)
+    roots[quadratic, 0] = ((-b - sqrt_disc)/(2.0*a))[quadratic]
+    roots[quadratic, 1] = ((-b + sqrt_disc)/(2.0*a))[quadratic]
+    linear = (a == 0.0) & (b != 0.0)
+    roots[linear, 0] = (-c/b)[linear]
+    return roots
+
+
+def min_positive_root_cubic_eq_batch(a, b, c, d):
+    '''
+    vectorized "min_positive_root2/3" of the roots of N cubic equations a*x^3 + b*x^2 + c*x + d = 0:
+    returns an array with the minimum positive real root of each equation, NaN where there is no positive real root
+    '''
+    roots = real_roots_cubic_eq_batch(a, b, c, d)
+    positive_roots = np.where(roots > 0.0, roots, np.inf)
+    min_root = positive_roots.min(axis=-1)
+    return np.where(np.isinf(min_root), np.nan, min_root)
@@ -1,6 +1,10 @@
+import abc
+import itertools
+
 import numpy as np
 
-MAX_TIME_STEPS = 10000
+from .parameterize_path import project_limits_onto_segments
+from .path_index import PathIndex
 
 # How close we have to be to a given position/velocity/acceleration to consider it "reached".
 # These are needed because we are using a discrete approximation of the trajectory. These
@@ -16,14 +20,7 @@ def pvaj_to_pppp(p0, v0, a0, j0, delta_t):
     Convert position, velocity, acceleration, and jerk at one timestep to positions for
     the next 4 timesteps.
     """
-    a_arr = [a0, a0 + j0 * delta_t]
-    v_arr = [v0]
-    for a in a_arr:
-        v_arr.append(v_arr[-1] + delta_t * a)
-    p_arr = [p0]
-    for v in v_arr:
-        p_arr.append(p_arr[-1] + delta_t * v)
-    return p_arr
+    return list(integrate_jerks(p0, v0, a0, (j0, 0.0, 0.0), delta_t)[:, 0])
 
 def pppp_to_pvaj(pppp):
     pass
@@ -35,69 +32,336 @@ def integrate(p, v, a, j, delta_t):
     return p + v * delta_t, v + a * delta_t, a + j * delta_t
 
 
-def smooth_stop_fine_adjustment(trajectory, is_valid, j_max, delta_t, increments=10):
+def integrate_jerks(p, v, a, jerks, delta_t):
     """
+    Propagate the trajectory forward by applying each of the given jerks for one timestep. Returns
+    the (len(jerks) + 1) x 3 array of positions, velocities, and accelerations, starting with the
+    given state.
+
+    Each column is the running sum of its starting value and the changes integrate() would make at
+    each timestep. np.cumsum adds these up one after the other, so the result is exactly the same as
+    calling integrate() in a loop, but takes three numpy calls instead of one call per timestep.
     """
-    smoothed_trajectory = np.tile(np.nan, (MAX_TIME_STEPS, 4))
-    smoothed_trajectory[:len(trajectory)] = trajectory
+    jerks = np.asarray(jerks, dtype=np.float64)
+    states = np.empty((len(jerks) + 1, 3))
+    changes = np.empty(len(jerks) + 1)
+    for column_i, start, derivatives in ((2, a, jerks), (1, v, states[:-1, 2]), (0, p, states[:-1, 1])):
+        changes[0] = start
+        np.multiply(derivatives, delta_t, out=changes[1:])
+        np.cumsum(changes, out=states[:, column_i])
+    return states
+
+
+def constant_jerk_states(p, v, a, j, delta_t, n_steps):
+    """
+    The (n_steps + 1) x 3 array of positions, velocities, and accelerations reached by applying
+    jerk j for n_steps timesteps with integrate().
+    """
+    return integrate_jerks(p, v, a, np.full(n_steps, j), delta_t)
 
-    if len(trajectory) == 0:
-        return trajectory
 
-    for j in np.linspace(-j_max, ):
-        for time_i in range(len(trajectory)):
-            pass
+class BlockConstraint(abc.ABC):
+    """
+    Constraint which checks a whole block of timesteps with one call.
 
+    The functions in this module take an is_valid(position, velocity, acceleration, jerk) callback
+    and call it once per candidate per timestep. If is_valid has a valid_rows method, they instead
+    check whole candidate blocks of timesteps with it. valid_rows takes an (N x 4) array whose
+    columns are position, velocity, acceleration, and jerk, and returns an array of N booleans.
 
-def smooth_stop(trajectory, is_valid, j_max, delta_t):
+    Subclasses implement valid_rows. Instances can also be called like a plain is_valid function.
+    """
+
+    @abc.abstractmethod
+    def valid_rows(self, trajectory):
+        pass
+
+    def first_invalid(self, trajectory):
+        """
+        Index of the first row of the (N x 4) trajectory which isn't valid, or N if all of them are.
+        """
+        return _first_false(self.valid_rows(trajectory))
+
+    def __call__(self, position, velocity, acceleration, jerk):
+        return bool(self.valid_rows(np.array([[position, velocity, acceleration, jerk]]))[0])
+
+
+class ArrayConstraint(BlockConstraint):
+    """
+    BlockConstraint built from a function which takes arrays of positions, velocities,
+    accelerations, and jerks, and returns an array of booleans. Any is_valid function written with
+    numpy operations (np.abs, np.logical_and, ...) instead of python control flow works this way.
+    """
+
+    def __init__(self, are_valid):
+        self.are_valid = are_valid
+
+    def valid_rows(self, trajectory):
+        return np.broadcast_to(self.are_valid(*trajectory.T), len(trajectory))
+
+    def __call__(self, position, velocity, acceleration, jerk):
+        return bool(self.are_valid(position, velocity, acceleration, jerk))
+
+
+def _steps_until_stopped(v, a, j, delta_t):
+    """
+    Number of timesteps (at least one) after which the velocity has dropped to zero when applying
+    constant jerk j <= 0, or 64 if it never does.
+    """
+    # Solve v + a*t + j*t**2/2 = 0 for the first positive t.
+    if j < 0.0:
+        t = (a + np.sqrt(max(a * a - 2.0 * j * max(v, 0.0), 0.0))) / -j
+    elif a < 0.0:
+        t = max(v, 0.0) / -a
+    else:
+        return 64
+    return int(np.ceil(t / delta_t)) + 2
+
+
+def _first_false(values):
+    false_indices = np.flatnonzero(~np.asarray(values, dtype=bool))
+    return int(false_indices[0]) if len(false_indices) else len(values)
+
+
+def _with_jerk(states, jerk):
+    return np.column_stack((states, np.full(len(states), jerk)))
+
+
+class Workspace:
+    """
+    Scratch buffers for the discrete parameterization, reused from one stopping trajectory to the
+    next instead of allocating a new array for each one.
+
+    Each buffer has one row per timestep with position, velocity, acceleration, and jerk columns.
+    Buffers start small and double in size when more rows are needed, so the number of timesteps
+    isn't limited unless max_time_steps is given. Functions using a workspace return views into its
+    buffers, which stay valid until the workspace is used again. Pass the same workspace to repeated
+    calls to avoid allocating buffers every time.
+    """
+
+    INITIAL_TIME_STEPS = 256
+
+    def __init__(self, max_time_steps=None):
+        self.max_time_steps = max_time_steps
+        self._buffers = {}
+
+    def buffer(self, name, n_rows):
+        """
+        The buffer with the given name, grown to at least n_rows rows if needed. Growing keeps the
+        contents, but views taken before won't see later changes. Raises a RuntimeError if n_rows is
+        more than max_time_steps.
+        """
+        if self.max_time_steps is not None and n_rows > self.max_time_steps:
+            raise RuntimeError('Failed to find a solution after {} trajectory points'.format(self.max_time_steps))
+        buffer = self._buffers.get(name)
+        if buffer is None or len(buffer) < n_rows:
+            size = self.INITIAL_TIME_STEPS if buffer is None else len(buffer)
+            while size < n_rows:
+                size *= 2
+            new_buffer = np.full((size, 4), np.nan)
+            if buffer is not None:
+                new_buffer[:len(buffer)] = buffer
+            self._buffers[name] = buffer = new_buffer
+        return buffer
+
+    def swap(self, name, other_name):
+        """
+        Exchange two buffers, e.g. to keep a result while computing the next one.
+        """
+        self._buffers[name], self._buffers[other_name] = (
+            self._buffers.get(other_name), self._buffers.get(name))
+
+
+def smooth_stop(trajectory, is_valid, j_max, delta_t, workspace=None):
     """
     We start with a trajectory which reaches zero velocity if use the most negative valid jerk
     at every timestep. Unfortunately we probably reach zero velocity with a large negative
     acceleration. We need to reach zero velocity and zero acceleration at the same time,
     and so need to switch from max negative jerk to max positive jerk at some timestep.
+
+    We are looking for the latest timestep at which we can switch to positive jerk without the
+    velocity dropping below zero. Switching later than that always makes the velocity drop below
+    zero, switching earlier never does. Instead of trying every timestep from the end, we compute
+    the switching timestep in closed form and check it by integrating the positive jerk section once.
+    If the check disagrees with the prediction, we fall back to bisection, which only relies on
+    switching later being worse.
+
+    The result is a view of the 'stop' buffer of workspace (a new Workspace if none is given).
     """
+    if workspace is None:
+        workspace = Workspace()
+    smoothed_trajectory = workspace.buffer('stop', len(trajectory))
+    smoothed_trajectory[:len(trajectory)] = trajectory
+
     if trajectory[-1, 2] > -ACCELERATION_THRESHOLD:
         # No Need to add a positive jerk section.
-        return trajectory
+        return smoothed_trajectory[:len(trajectory)]
 
-    smoothed_trajectory = np.tile(np.nan, (MAX_TIME_STEPS, 4))
-    smoothed_trajectory[:len(trajectory)] = trajectory
+    def switch_to_positive_jerk(positive_jerk_start_time_i):
+        # A previous attempt may have overwritten this timestep.
+        workspace.buffer('stop', len(trajectory))[positive_jerk_start_time_i, :3] = \
+            trajectory[positive_jerk_start_time_i, :3]
+        return _switch_to_positive_jerk(workspace, positive_jerk_start_time_i, is_valid, j_max, delta_t)
 
     # We need to add a positive jerk section.
-    for positive_jerk_start_time_i in range(len(trajectory) - 1, -1, -1):
-        for time_i in range(positive_jerk_start_time_i, len(smoothed_trajectory) - 1):
-            if not is_valid(*smoothed_trajectory[time_i, :3], j_max):
+    last_time_i = len(trajectory) - 1
+    start_time_i = closed_form_switch_time_i(trajectory, j_max, delta_t)
+
+    # Bracket the switching timestep between the latest timestep known to work (stop_time_i) and the
+    # earliest one known to make the velocity drop below zero (undershoot_time_i).
+    stop_time_i = None
+    stop_length = None
+    undershoot_time_i = last_time_i + 1
+    time_i = start_time_i
+    step = 1
+    while undershoot_time_i - (stop_time_i if stop_time_i is not None else -1) > 1:
+        length = switch_to_positive_jerk(time_i)
+        if length is None:
+            return None
+        if length:
+            stop_time_i, stop_length = time_i, length
+        else:
+            undershoot_time_i = time_i
+        lower = stop_time_i if stop_time_i is not None else -1
+        if undershoot_time_i - lower <= 1:
+            break
+        if stop_time_i is None:
+            # Only too late switches found so far, search backwards with growing steps.
+            time_i = max(undershoot_time_i - step, 0)
+        elif undershoot_time_i > last_time_i:
+            # Only working switches found so far, search forwards with growing steps.
+            time_i = min(stop_time_i + step, last_time_i)
+        else:
+            time_i = (lower + undershoot_time_i) // 2
+        step *= 2
+
+    if stop_time_i is None:
+        # We were unable to decelerate.
+        return None
+    if time_i != stop_time_i:
+        # Trying a later timestep overwrote the end of this stopping trajectory.
+        stop_length = switch_to_positive_jerk(stop_time_i)
+    # The buffer may have grown while switching.
+    smoothed_trajectory = workspace.buffer('stop', stop_length)
+    smoothed_trajectory[stop_length - 1, 3] = np.nan
+    return smoothed_trajectory[:stop_length]
+
+
+def _switch_to_positive_jerk(workspace, positive_jerk_start_time_i, is_valid, j_max, delta_t):
+    """
+    Switch the stopping trajectory in the workspace's 'stop' buffer to positive jerk at the given
+    timestep. Returns the length of the stopping trajectory if we can stop this way, False if the
+    velocity drops below zero first, and None if we hit an invalid state. Raises a RuntimeError if
+    the stopping trajectory doesn't fit in the workspace's max_time_steps.
+
+    The whole positive jerk section is computed with one integrate_jerks call. A BlockConstraint
+    checks it with one valid_rows call, otherwise is_valid is called for each timestep until the
+    section ends.
+    """
+    valid_rows = getattr(is_valid, 'valid_rows', None)
+    time_i = positive_jerk_start_time_i
+    p, v, a = workspace.buffer('stop', time_i + 1)[time_i, :3]
+    while True:
+        # Enough timesteps to bring the acceleration back to zero, plus one.
+        n_steps = int(max(np.ceil((-ACCELERATION_THRESHOLD - a) / (j_max * delta_t)), 0.0)) + 1
+        all_states = constant_jerk_states(p, v, a, j_max, delta_t, n_steps)
+        states = all_states[:-1]
+        # We weren't able to reduce acceleration magnitude to zero before velocity hit zero.
+        undershoot = states[:, 1] < -VELOCITY_THRESHOLD
+        stopped = states[:, 2] > -ACCELERATION_THRESHOLD
+        if valid_rows is not None:
+            invalid = ~valid_rows(_with_jerk(states, j_max))
+        else:
+            invalid = np.zeros(n_steps, dtype=bool)
+            for row_i in range(min(_first_false(~(undershoot | stopped)) + 1, n_steps)):
+                if not is_valid(*states[row_i], j_max):
+                    invalid[row_i] = True
+                    break
+        event_i = _first_false(~(invalid | undershoot | stopped))
+        # Only the timesteps up to the event are kept. Without an event, the last state starts the
+        # next section instead. Asking for more than max_time_steps rows raises.
+        n_kept = min(event_i + 1, n_steps)
+        smoothed_trajectory = workspace.buffer('stop', time_i + n_kept)
+        smoothed_trajectory[time_i:time_i + event_i, 3] = j_max
+        smoothed_trajectory[time_i + 1:time_i + n_kept, :3] = all_states[1:n_kept]
+        if event_i < n_steps:
+            # Same order of checks as for the timesteps before the switch.
+            if invalid[event_i]:
                 return None
+            if undershoot[event_i]:
+                return False
+            return time_i + event_i + 1
+        time_i += n_steps
+        p, v, a = all_states[-1]
 
-            if smoothed_trajectory[time_i, 1] < -VELOCITY_THRESHOLD:
-                # We weren't reduce acceleration magnitude to zero before velocity hit zero.
-                break
-
-            if smoothed_trajectory[time_i, 2] > -ACCELERATION_THRESHOLD:
-                return smoothed_trajectory[:time_i + 1]
-
-            smoothed_trajectory[time_i, 3] = j_max
-            smoothed_trajectory[time_i + 1, :3] = integrate(*smoothed_trajectory[time_i], delta_t)
-
-    # We were unable to decelerate.
-    return None
 
+def closed_form_switch_time_i(trajectory, j_max, delta_t):
+    """
+    Latest timestep of a decelerating trajectory at which switching to positive jerk j_max brings the
+    acceleration back to zero before the velocity drops below zero.
 
-def compute_stopping_trajectory(p_start, v_start, a_start, is_valid, j_max, delta_t):
+    Starting from velocity v and acceleration a < 0, the acceleration after k timesteps of positive
+    jerk is a + k*j_max*delta_t and the velocity is v + delta_t*(k*a + j_max*delta_t*k*(k-1)/2). This
+    is evaluated for every timestep at once, with k the number of timesteps until the acceleration is
+    above -ACCELERATION_THRESHOLD.
+    """
+    velocities = trajectory[:, 1]
+    accelerations = trajectory[:, 2]
+    steps = np.maximum(np.floor((-ACCELERATION_THRESHOLD - accelerations) / (j_max * delta_t)) + 1.0, 0.0)
+    final_velocities = velocities + delta_t * (steps * accelerations + j_max * delta_t * steps * (steps - 1.0) / 2.0)
+    stop_time_indices = np.nonzero(final_velocities >= -VELOCITY_THRESHOLD)[0]
+    if len(stop_time_indices) == 0:
+        return 0
+    return int(stop_time_indices[-1])
+
+
+def compute_stopping_trajectory(p_start, v_start, a_start, is_valid, j_max, delta_t, workspace=None,
+                                predicted_jerks=None):
     """
     The jerk returned by this function during the final timestep is meaningless, since we've
     already stopped at that point.
+
+    predicted_jerks is an optional guess of the jerks of the deceleration, e.g. those of a stopping
+    trajectory computed for a nearby state (see deceleration_jerks). The predicted jerks are checked
+    all at once instead of searched for one timestep at a time (see _follow_prediction), and the
+    search only starts where the prediction runs out. The result is the same as without a
+    prediction.
+
+    The deceleration is built in the 'deceleration' buffer of workspace (a new Workspace if none is
+    given), the result is a view of its 'stop' buffer.
     """
-    trajectory = np.tile(np.nan, (MAX_TIME_STEPS, 4))
+    if workspace is None:
+        workspace = Workspace()
+    valid_rows = getattr(is_valid, 'valid_rows', None)
+    trajectory = workspace.buffer('deceleration', 1)
     trajectory[0, :3] = p_start, v_start, a_start
 
+    start_time_i = 0
+    if predicted_jerks is not None:
+        followed = _follow_prediction(workspace, predicted_jerks, is_valid, j_max, delta_t)
+        if followed is None:
+            return None
+        start_time_i, stopped = followed
+        trajectory = workspace.buffer('deceleration', start_time_i + 1)
+        if stopped:
+            trajectory[start_time_i, 3] = np.nan
+            return smooth_stop(trajectory[:start_time_i + 1], is_valid, j_max, delta_t, workspace)
+
+    if valid_rows is not None:
+        trajectory = _decelerate_blocks(start_time_i, valid_rows, j_max, delta_t, workspace)
+        if trajectory is None:
+            return None
+        return smooth_stop(trajectory, is_valid, j_max, delta_t, workspace)
+
     # Decelerate until our velocity drops to zero.
-    for time_i in range(MAX_TIME_STEPS):
+    for time_i in itertools.count(start_time_i):
         # Invariant: positions, velocities, and accelerations up to and including index time_i have
         # been defined. Jerks up to and including index time_i - 1 have been defined. positions,
         # velocities, accelerations, and jerks up to and including index time_i - 1 are set to
         # valid values. No guarantees for the validity of position, velocity, and acceleration
         # values at index time_i.
+        if time_i + 2 > len(trajectory):
+            trajectory = workspace.buffer('deceleration', time_i + 2)
 
         found_valid_jerk = False
         for j in (-j_max, 0.0):
@@ -114,7 +378,8 @@ def compute_stopping_trajectory(p_start, v_start, a_start, is_valid, j_max, delt
                 continue
 
             if trajectory[time_i + 1, 1] < VELOCITY_THRESHOLD:
-                return smooth_stop(trajectory[:time_i + 2], is_valid, j_max, delta_t)
+                trajectory[time_i + 1, 3] = np.nan
+                return smooth_stop(trajectory[:time_i + 2], is_valid, j_max, delta_t, workspace)
 
             # We try the most desirable jerk (the one that will slow us down the fastest) first.
             # Because of this, we can stop as soon as we find a valid jerk - it is definitely
@@ -125,19 +390,170 @@ def compute_stopping_trajectory(p_start, v_start, a_start, is_valid, j_max, delt
         if not found_valid_jerk:
             return None
 
-    raise RuntimeError('Failed to find a solution after {} trajectory points'.format(
-        MAX_TIME_STEPS))
+
+def deceleration_jerks(workspace):
+    """
+    The jerks of the deceleration last built in the workspace's 'deceleration' buffer, up to the
+    timestep where it stopped (or up to where it failed, followed by older jerks), as a new array.
+    """
+    jerks = workspace.buffer('deceleration', 1)[:, 3]
+    return jerks[:_first_false(~np.isnan(jerks))].copy()
 
 
-def parameterize_path_discrete(p_start, p_end, is_valid, j_max, delta_t):
+def _follow_prediction(workspace, jerks, is_valid, j_max, delta_t):
+    """
+    Build the start of the deceleration in the workspace's 'deceleration' buffer from the predicted
+    jerks, which only has to hold up to the first jerk not in (-j_max, 0).
+
+    At the first timestep where the one timestep at a time search wouldn't choose the predicted
+    jerk, it chooses the other one (or fails), and the decelerations of nearby states mostly differ
+    by such a shifted switch. So the prediction is repaired by swapping that jerk and checking the
+    rest of it again from there. Returns the number of timesteps built and whether the velocity
+    dropped to zero at the end of them, or None if there is a timestep with no valid jerk.
+    """
+    valid_rows = getattr(is_valid, 'valid_rows', None)
+    jerks = np.asarray(jerks, dtype=np.float64)
+    jerks = jerks[:_first_false((jerks == -j_max) | (jerks == 0.0))]
+    trajectory = workspace.buffer('deceleration', 1)
+    time_i = 0
+    failed_time_i = None
+    while len(jerks) > 0:
+        states = integrate_jerks(*trajectory[time_i, :3], jerks, delta_t)
+        p, v, a = states[-1]
+        if v >= VELOCITY_THRESHOLD:
+            # Nearby decelerations end with the same jerk, keep it until the velocity drops to zero.
+            tail_jerks = np.full(_steps_until_stopped(v, a, jerks[-1], delta_t), jerks[-1])
+            states = np.concatenate((states, integrate_jerks(p, v, a, tail_jerks, delta_t)[1:]))
+            jerks = np.concatenate((jerks, tail_jerks))
+        if valid_rows is not None:
+            n_chosen, stopped = _chosen_jerks(states, jerks, valid_rows, j_max, delta_t)
+        else:
+            n_chosen, stopped = _chosen_jerks_scalar(states, jerks, is_valid, j_max, delta_t)
+        trajectory = _keep_deceleration(workspace, time_i, states, jerks, n_chosen)
+        time_i += n_chosen
+        if stopped or n_chosen == len(jerks):
+            return time_i, stopped
+        if time_i == failed_time_i:
+            # Neither jerk is valid at this timestep.
+            return None
+        failed_time_i = time_i
+        jerks = np.concatenate(([0.0 if jerks[n_chosen] == -j_max else -j_max], jerks[n_chosen + 1:]))
+    return time_i, False
+
+
+def _chosen_jerks(states, jerks, valid_rows, j_max, delta_t):
+    """
+    Number of leading timesteps of the deceleration with the given jerks and states (from
+    integrate_jerks) for which the one timestep at a time loop in compute_stopping_trajectory would
+    choose the same jerks, and whether the velocity drops to zero at the end of them. All the rows
+    are checked with one valid_rows call. Each jerk has to be -j_max or 0.
+    """
+    n_steps = len(jerks)
+    # As in the one timestep at a time loop, the jerk has to be valid for this timestep and the
+    # state it leads to has to be valid for the next one. Zero jerk is only chosen where the most
+    # negative jerk isn't valid.
+    zero_i = np.flatnonzero(jerks == 0.0)
+    decelerated_states = states[zero_i] + delta_t * np.column_stack(
+        (states[zero_i, 1], states[zero_i, 2], np.full(len(zero_i), -j_max)))
+    valid = valid_rows(np.concatenate((np.column_stack((states[:-1], jerks)), _with_jerk(states[1:], 0.0),
+                                       _with_jerk(states[zero_i], -j_max), _with_jerk(decelerated_states, 0.0))))
+    chosen = valid[:n_steps] & valid[n_steps:2 * n_steps]
+    n_zero = len(zero_i)
+    chosen[zero_i] &= ~(valid[2 * n_steps:2 * n_steps + n_zero] & valid[2 * n_steps + n_zero:])
+    n_chosen = _first_false(chosen)
+    stopped = np.flatnonzero(states[1:n_chosen + 1, 1] < VELOCITY_THRESHOLD)
+    if len(stopped):
+        return int(stopped[0]) + 1, True
+    return n_chosen, False
+
+
+def _chosen_jerks_scalar(states, jerks, is_valid, j_max, delta_t):
+    """
+    Same as _chosen_jerks, for an is_valid function which checks one timestep at a time.
+    """
+    # Plain floats, indexing numpy arrays one element at a time is much slower.
+    states = states.tolist()
+    for time_i, j in enumerate(jerks.tolist()):
+        p, v, a = states[time_i]
+        if j != 0.0:
+            chosen = is_valid(p, v, a, j) and is_valid(*states[time_i + 1], 0.0)
+        else:
+            chosen = (not (is_valid(p, v, a, -j_max) and is_valid(*integrate(p, v, a, -j_max, delta_t), 0.0)) and
+                      is_valid(p, v, a, 0.0) and is_valid(*states[time_i + 1], 0.0))
+        if not chosen:
+            return time_i, False
+        if states[time_i + 1][1] < VELOCITY_THRESHOLD:
+            return time_i + 1, True
+    return len(jerks), False
+
+
+def _keep_deceleration(workspace, time_i, states, jerks, n_steps):
+    """
+    Write the first n_steps jerks and the states they lead to into the workspace's 'deceleration'
+    buffer, starting at timestep time_i, and return the buffer.
+    """
+    trajectory = workspace.buffer('deceleration', time_i + n_steps + 1)
+    trajectory[time_i:time_i + n_steps, 3] = jerks[:n_steps]
+    trajectory[time_i + 1:time_i + n_steps + 1, :3] = states[1:n_steps + 1]
+    return trajectory
+
+
+def _decelerate_blocks(time_i, valid_rows, j_max, delta_t, workspace):
+    """
+    Block version of the deceleration loop in compute_stopping_trajectory, continuing the
+    deceleration in the workspace's 'deceleration' buffer from timestep time_i. Instead of choosing
+    the jerk one timestep at a time, we apply the same jerk for a block of timesteps and check the
+    whole block with one valid_rows call, keeping the timesteps for which the one timestep at a time
+    loop would have chosen that jerk. Returns the trajectory up to the timestep where the velocity
+    drops to zero, or None if there is a timestep with no valid jerk.
+    """
+    trajectory = workspace.buffer('deceleration', time_i + 1)
+    failed_time_i = None
+    j = -j_max
+    while True:
+        p, v, a = trajectory[time_i, :3]
+        jerks = np.full(_steps_until_stopped(v, a, j, delta_t), j)
+        states = integrate_jerks(p, v, a, jerks, delta_t)
+        n_chosen, stopped = _chosen_jerks(states, jerks, valid_rows, j_max, delta_t)
+        trajectory = _keep_deceleration(workspace, time_i, states, jerks, n_chosen)
+        time_i += n_chosen
+        if stopped:
+            trajectory[time_i, 3] = np.nan
+            return trajectory[:time_i + 1]
+        if time_i == failed_time_i:
+            # Neither jerk is valid at this timestep.
+            return None
+        # The block ends at the first timestep where j isn't chosen, so the other jerk is next.
+        failed_time_i = time_i
+        j = 0.0 if j == -j_max else -j_max
+
+
+def parameterize_path_discrete(p_start, p_end, is_valid, j_max, delta_t, incremental=False, workspace=None):
+    """
+    Time parameterize the path coordinate from p_start to p_end, accelerating with j_max for as
+    long as we can still come to a valid stop afterwards.
+
+    A stopping trajectory is computed at every timestep. Consecutive ones start from nearby states
+    and mostly decelerate the same way, so if incremental is True, the jerks of each deceleration
+    are passed to compute_stopping_trajectory as the prediction for the next one, which saves most
+    of the one timestep at a time search. The result is the same either way. A BlockConstraint is
+    already checked a whole run of jerks at a time, so the flag only applies to is_valid functions.
+
+    All of the intermediate trajectories are kept in the buffers of workspace (a new Workspace if
+    none is given). The result is a view of its 'trajectory' buffer.
+    """
+    if workspace is None:
+        workspace = Workspace()
     # Each row of the trajectory array is one timestep. The columns contain values for position,
-    # velocity, acceleration, and jerk, in that order. We start off with all values as NaN so
-    # that we can tell if we accidentally use an uninitialized value.
-    trajectory = np.tile(np.nan, (MAX_TIME_STEPS, 4))
+    # velocity, acceleration, and jerk, in that order.
+    trajectory = workspace.buffer('trajectory', 2)
     trajectory[0][:3] = p_start, 0.0, 0.0
 
     stopping_trajectory = None
-    for time_i in range(MAX_TIME_STEPS):
+    predicted_jerks = None
+    for time_i in itertools.count():
+        if time_i + 2 > len(trajectory):
+            trajectory = workspace.buffer('trajectory', time_i + 2)
         next_stopping_trajectory = None
 
         if is_valid(*trajectory[time_i, :3], j_max):
@@ -145,11 +561,16 @@ def parameterize_path_discrete(p_start, p_end, is_valid, j_max, delta_t):
             p_next, v_next, a_next = integrate(*trajectory[time_i, :3], j_max, delta_t)
 
             next_stopping_trajectory = compute_stopping_trajectory(
-                p_next, v_next, a_next, is_valid, j_max, delta_t)
+                p_next, v_next, a_next, is_valid, j_max, delta_t, workspace, predicted_jerks)
+            if incremental and not hasattr(is_valid, 'valid_rows'):
+                predicted_jerks = deceleration_jerks(workspace)
 
         if next_stopping_trajectory is None:
             if stopping_trajectory is None:
                 raise RuntimeError("No valid trajectory at start")
+            elif len(stopping_trajectory) == 1:
+                # We followed the last stopping trajectory until we stopped, and still can't move on.
+                raise RuntimeError("No valid trajectory from position {}".format(trajectory[time_i, 0]))
             else:
                 # Use the jerk from last timestep's stopping trajectory.
                 trajectory[time_i, 3] = stopping_trajectory[0, 3]
@@ -157,12 +578,89 @@ def parameterize_path_discrete(p_start, p_end, is_valid, j_max, delta_t):
                 stopping_trajectory = stopping_trajectory[1:]
         else:
             trajectory[time_i, 3] = j_max
+            # Keep this stopping trajectory while the next one is computed in the 'stop' buffer.
+            workspace.swap('stop', 'current stop')
             stopping_trajectory = next_stopping_trajectory
             trajectory[time_i + 1, :3] = p_next, v_next, a_next
 
         if stopping_trajectory[-1][0] >= p_end - POSITION_THRESHOLD:
-            # Reached our goal.
-            return np.vstack((trajectory[:time_i], stopping_trajectory))
+            # Reached our goal. The stopping trajectory starts at the next timestep.
+            n_time_steps = time_i + 1 + len(stopping_trajectory)
+            trajectory = workspace.buffer('trajectory', n_time_steps)
+            trajectory[time_i + 1:n_time_steps] = stopping_trajectory
+            return trajectory[:n_time_steps]
+
 
-    raise RuntimeError(
-        'Failed to find a solution after {} trajectory points'.format(MAX_TIME_STEPS))
+class JointLimitConstraint(BlockConstraint):
+    """
+    Per joint velocity, acceleration, and jerk limits for a trajectory of the path coordinate s
+    along the joint space path q(s). The joint space derivatives follow from the chain rule:
+
+        q_dot = q'(s) s_dot
+        q_ddot = q''(s) s_dot^2 + q'(s) s_ddot
+        q_dddot = q'''(s) s_dot^3 + 3 q''(s) s_dot s_ddot + q'(s) s_dddot
+
+    The path derivatives come from the tables of a PathIndex built when the constraint is
+    created, so checking timesteps doesn't evaluate the path. A timestep is valid if the limits
+    hold with the derivatives at both of the samples around its value of s, and at the start of
+    every piece of the path between them, so the velocity through a corner of the path is limited
+    by the segments on both sides of it and pieces shorter than the sample spacing aren't skipped.
+    The tables can't see the change of direction at a corner itself, so paths should be blended
+    (see parameterize_path_with_blends) to limit the acceleration through their corners.
+    """
+
+    def __init__(self, path, v_max, a_max, j_max, n_samples=1000):
+        self.path_index = PathIndex(path, n_samples)
+        self.s_start = float(self.path_index.boundaries[0])
+        self.s_end = float(self.path_index.boundaries[-1])
+        self.derivatives = self.path_index.derivatives
+        self.v_max, self.a_max, self.j_max = [
+            np.broadcast_to(np.asarray(limit, dtype=np.float64), self.derivatives.shape[-1:])
+            for limit in (v_max, a_max, j_max)]
+
+        # Derivatives at the start of the pieces which start between each pair of samples, padded
+        # with the derivatives at the first sample of the pair where fewer pieces start.
+        start_sample_i = self.path_index.sample_indices(self.path_index.boundaries[1:-1])
+        start_counts = np.bincount(start_sample_i, minlength=len(self.derivatives) - 1)
+        self.piece_start_derivatives = np.repeat(self.derivatives[:-1, np.newaxis], start_counts.max(initial=0),
+                                                 axis=1)
+        ranks = np.arange(len(start_sample_i)) - np.searchsorted(start_sample_i, start_sample_i)
+        self.piece_start_derivatives[start_sample_i, ranks] = self.path_index.start_derivatives[1:]
+
+    def s_j_max(self):
+        """
+        Largest jerk along s for which no joint exceeds its jerk limit anywhere on the path when
+        moving slowly, i.e. when only the q'(s) s_dddot term of the joint jerk matters.
+        """
+        return np.min(project_limits_onto_segments(self.j_max, self.derivatives[:, 0]))
+
+    def valid_rows(self, trajectory):
+        positions = trajectory[:, 0]
+        velocities, accelerations, jerks = [column[:, np.newaxis] for column in trajectory[:, 1:].T]
+        sample_i = self.path_index.sample_indices(positions)
+        valid = (positions >= self.s_start) & (positions <= self.s_end + POSITION_THRESHOLD)
+        piece_start_derivatives = self.piece_start_derivatives[sample_i]
+        for derivatives in [self.derivatives[sample_i], self.derivatives[sample_i + 1]] + [
+                piece_start_derivatives[:, start_i] for start_i in range(piece_start_derivatives.shape[1])]:
+            d1, d2, d3 = derivatives[:, 0], derivatives[:, 1], derivatives[:, 2]
+            joint_velocities = d1 * velocities
+            joint_accelerations = d2 * velocities ** 2 + d1 * accelerations
+            joint_jerks = d3 * velocities ** 3 + 3.0 * d2 * velocities * accelerations + d1 * jerks
+            valid &= np.all((np.abs(joint_velocities) <= self.v_max + VELOCITY_THRESHOLD) &
+                            (np.abs(joint_accelerations) <= self.a_max + ACCELERATION_THRESHOLD) &
+                            (np.abs(joint_jerks) <= self.j_max + JERK_THRESHOLD), axis=1)
+        return valid
+
+
+def parameterize_joint_path_discrete(path, v_max, a_max, j_max, delta_t, n_samples=1000, workspace=None):
+    """
+    Time parameterize the joint space path q(s) (a PiecewiseFunction or PiecewisePolynomial) with
+    the given per joint velocity, acceleration, and jerk limits.
+
+    Builds a JointLimitConstraint for the path and runs parameterize_path_discrete with it from the
+    start to the end of the path, using the constraint's s_j_max as the jerk along s. Returns the
+    trajectory of s; the joint positions are path(trajectory[:, 0]).
+    """
+    constraint = JointLimitConstraint(path, v_max, a_max, j_max, n_samples)
+    return parameterize_path_discrete(constraint.s_start, constraint.s_end, constraint, constraint.s_j_max(),
+                                      delta_t, workspace=workspace)
@@ -1,7 +1,9 @@
 #!/usr/bin/env python
-import rospy
+import logging
 import math
 import traj
+
+logger = logging.getLogger(__name__)
     
     
 def calculate_min_pos_reached_acc_jrk_time_acc_time_to_reach_max_vel_3phases_case(abs_v_start, vm, am, jm):
@@ -152,10 +154,10 @@ def max_reachable_vel_per_segment(abs_pos_diff, abs_v_start, abs_max_pos, abs_ma
     it returns the phases' times: jerk_phase time "tj", acceleration_phase time "ta", velocity_phase time "tv" 
     considering a three phases motion: [acc profile be like /`````\........ ] 
     '''         
-    rospy.logdebug( "\n max_vel_info: pos_diff={}, v_start ={} ".format( abs_pos_diff, abs_v_start) )
+    logger.debug("\n max_vel_info: pos_diff=%s, v_start =%s ", abs_pos_diff, abs_v_start)
     # A) if (pos_diff is zero), then time is zero and v_end = v_start 
     if abs_pos_diff == 0.0:
-        rospy.logdebug("\n>>> case A")
+        logger.debug("\n>>> case A")
         tj= 0.0
         ta= 0.0
         tv= 0.0
@@ -164,42 +166,42 @@ def max_reachable_vel_per_segment(abs_pos_diff, abs_v_start, abs_max_pos, abs_ma
 
     # B) if (pos_diff and v0 have same sign), then (vf is +ve) and (vf is based on pos_diff)  
     elif abs_pos_diff > 0.0 and abs_v_start >= 0.0:  
-        rospy.logdebug(  "\n>>> case B")   
+        logger.debug("\n>>> case B")
         min_pos_to_max_vel, acc_to_max_vel, tj, ta = calculate_min_pos_reached_acc_jrk_time_acc_time_to_reach_max_vel_3phases_case(abs_v_start, abs_max_vel, abs_max_acc, abs_max_jrk)
-        rospy.logdebug( "min_pos_to_max_vel= {}, acc_to_max_vel={}, tj={}, ta={}".format(min_pos_to_max_vel, acc_to_max_vel, tj, ta) )
+        logger.debug("min_pos_to_max_vel= %s, acc_to_max_vel=%s, tj=%s, ta=%s", min_pos_to_max_vel, acc_to_max_vel, tj, ta)
         
         # B1) if abs_pos_diff >= min_pos_to_max_vel, then reach to vm and then continue with vm
         if abs_pos_diff >= min_pos_to_max_vel:
-            rospy.logdebug( "\n>>> case B1")
+            logger.debug("\n>>> case B1")
             abs_v_end = abs_max_vel
             tv = (abs_pos_diff - min_pos_to_max_vel) / abs_max_vel
             return tj, ta, tv, abs_v_end
         
         # B2) else abs_pos_diff < min_pos_to_max_vel, and acc_to_max_vel >= abs_max_acc
         else:
-            rospy.logdebug( "\n>>> case B2")
+            logger.debug("\n>>> case B2")
             tv= 0.0
             min_pos_to_max_acc = calculate_min_pos_to_reach_max_acc_3phases_case(abs_v_start, abs_max_vel, abs_max_acc, abs_max_jrk)
-            rospy.logdebug( "min_pos_to_max_acc= {}".format(min_pos_to_max_acc) )
+            logger.debug("min_pos_to_max_acc= %s", min_pos_to_max_acc)
         
             # B2a) if abs_pos_diff >= min_pos_to_max_acc, then calculate ta such that it gives  abs_pos_diff, tj is already known: tj= am/jm 
             if abs_pos_diff >= min_pos_to_max_acc:
                 tj= abs_max_acc/abs_max_jrk
-                rospy.logdebug( ">>>case B2a" )
+                logger.debug(">>>case B2a")
                 ta, abs_v_end = calculate_acc_time_final_vel_for_pos_diff_3phases_case(abs_pos_diff, abs_v_start, abs_max_vel, abs_max_acc, abs_max_jrk)
-                rospy.logdebug( "tj={},  ta={},  tv={},     v_end= {}".format( tj, ta, tv,  abs_v_end ) )
+                logger.debug("tj=%s,  ta=%s,  tv=%s,     v_end= %s", tj, ta, tv,  abs_v_end)
                 return tj, ta, tv, abs_v_end
                 
             # B2b) else abs_pos_diff < min_pos_to_max_acc, then calculate tj such that it gives  abs_pos_diff, ta is already known: ta= 0.0  
             else:
                 ta= 0.0
-                rospy.logdebug( ">>>case B2b" )
+                logger.debug(">>>case B2b")
                 tj, reached_Acc, abs_v_end = calculate_jrk_time_reached_acc_final_vel_for_pos_diff_3phases_case(abs_pos_diff, abs_v_start, abs_max_vel, abs_max_acc, abs_max_jrk)
-                rospy.logdebug(  "tj={},  ta={},  tv={},   reached_Acc={},     v_end={}".format( tj, ta, tv, reached_Acc, abs_v_end ) )
+                logger.debug("tj=%s,  ta=%s,  tv=%s,   reached_Acc=%s,     v_end=%s", tj, ta, tv, reached_Acc, abs_v_end)
                 return tj, ta, tv, abs_v_end
             
     # C) if (pos_diff and v0 have different sign), then (vf is opposite to v0 sign) and (vf is based on both pos_diff_v0_0 and pos_diff_0_vf) 
     elif abs_pos_diff < 0.0 or abs_v_start < 0.0:#(pos_diff > 0.0 and v_start < 0.0) or (pos_diff < 0.0 and v_start > 0.0):
-        rospy.logdebug(  "\n>>> complex case: not implemented yet "  )      
+        logger.debug("\n>>> complex case: not implemented yet ")
         raise ValueError("Case C: in param_max_vel" )
         return 0.0, 0.0, 0.0, 0.0
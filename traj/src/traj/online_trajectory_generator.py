@@ -0,0 +1,248 @@
+#!/usr/bin/env python
+"""
+online trajectory generation: instead of planning whole segments offline, the generator keeps the current
+pos, vel, acc of each joint and is called once per control cycle. whenever the target pos/vel of a joint changes,
+the joint is re-planned from its current state with the same phase profiles as "fit_traj_segment_phases", so the
+robot can react to a new target within one cycle (see [1], section II for the general idea).
+
+re-planning a joint with non zero acceleration has three parts:
+1. bring the acceleration to zero with maximum jerk (one phase)
+2. if the target can't be reached from there with a simple/complex motion profile (e.g. the joint is moving away
+   from the target too fast to turn around in time), stop first with maximum deceleration
+3. the phase profile of "calculate_jerk_sign_and_duration" to the target. from standstill, a target whose vel points
+   back toward the joint (or is too high to reach over the distance to the target) can't be reached directly, the
+   joint then moves to a turnaround point past the target first, from where it has just enough distance to reach the
+   target vel. this isn't time optimal, and targets whose turnaround point is outside the pos limits are rejected
+each part has a fixed number of phases, so re-planning takes a bounded amount of time. after the last phase, the
+joint continues with the target velocity.
+
+between target changes, each cycle only evaluates the phase table at the new time. this is done for all joints at
+once with numpy functions writing into buffers allocated in the constructor, so no arrays are allocated in steady state.
+
+[1] https://www-cs.stanford.edu/groups/manips/publications/pdfs/Kroeger_2010_TRO.pdf
+"""
+import math
+import logging
+
+import numpy as np
+
+import traj
+
+logger = logging.getLogger(__name__)
+
+# phases of one plan: acceleration to zero (1), stop (3), profile to the turnaround point (13), profile to the target
+# (13), and the final hold (1)
+MAX_PHASES = 31
+
+# how far the end of a planned profile may be from the target, larger errors mean the planner doesn't handle the case
+TARGET_TOLERANCE = 1e-6
+
+
+def _phase_table(p_start, v_start, a_start, phases):
+    '''
+    start time, jerk, and pos, vel, acc at the start of each of the given (jerk, duration) phases, plus one final
+    phase with zero jerk
+    '''
+    table = [(0.0, 0.0, p_start, v_start, a_start)]
+    for j, T in phases:
+        j, T = float(j), float(T)
+        t0, _, p0, v0, a0 = table[-1]
+        table[-1] = (t0, j, p0, v0, a0)
+        table.append((t0 + T, 0.0, j*T*T*T/6.0 + a0*T*T/2.0 + v0*T + p0, j*T*T/2.0 + a0*T + v0, j*T + a0))
+    return table
+
+
+class OnlineTrajectoryGenerator:
+    '''
+    jerk limited online trajectory generator, it takes as argument:
+        1. the current pos "pos_start" of each joint, and optionally its vel "vel_start" and acc "acc_start"
+        2. the limits of each joint: "abs_max_pos", "abs_max_vel", "abs_max_acc", "abs_max_jrk"
+        3. the control cycle time "cycle_time"
+    the initial target is to stop at the current pos. each call to "update" takes the target pos (and vel) of each
+    joint and returns the pos, vel, acc setpoints for the next cycle. the joints are planned independently, each one
+    reaches its target as fast as its limits allow
+    '''
+    def __init__(self, pos_start, abs_max_pos, abs_max_vel, abs_max_acc, abs_max_jrk, cycle_time,
+                 vel_start=None, acc_start=None):
+        self.pos = np.array(pos_start, dtype=np.float64)
+        n_jts = len(self.pos)
+        self.vel = np.zeros(n_jts) if vel_start is None else np.array(vel_start, dtype=np.float64)
+        self.acc = np.zeros(n_jts) if acc_start is None else np.array(acc_start, dtype=np.float64)
+        self.abs_max_pos, self.abs_max_vel, self.abs_max_acc, self.abs_max_jrk = [
+            np.broadcast_to(np.asarray(limit, dtype=np.float64), (n_jts,)) for limit in
+            (abs_max_pos, abs_max_vel, abs_max_acc, abs_max_jrk)]
+        self.cycle_time = cycle_time
+        self.time = 0.0
+        self.target_pos = self.pos.copy()
+        self.target_vel = np.zeros(n_jts)
+
+        #phase table of each joint, (joints x phases), unused phases start at infinity
+        self._phase_start = np.full((n_jts, MAX_PHASES), np.inf)
+        self._phase_jrk = np.zeros((n_jts, MAX_PHASES))
+        self._phase_pos = np.zeros((n_jts, MAX_PHASES))
+        self._phase_vel = np.zeros((n_jts, MAX_PHASES))
+        self._phase_acc = np.zeros((n_jts, MAX_PHASES))
+        self._end_time = np.zeros(n_jts)
+        #buffers for "update"
+        self._in_phase = np.zeros((n_jts, MAX_PHASES), dtype=bool)
+        self._phase_index = np.zeros(n_jts, dtype=np.intp)
+        self._row_offsets = np.arange(n_jts, dtype=np.intp)*MAX_PHASES
+        self._changed = np.zeros(n_jts, dtype=bool)
+        self._vel_changed = np.zeros(n_jts, dtype=bool)
+        self._dt = np.zeros(n_jts)
+        self._jrk = np.zeros(n_jts)
+        self._p0 = np.zeros(n_jts)
+        self._v0 = np.zeros(n_jts)
+        self._a0 = np.zeros(n_jts)
+        for jt in range(n_jts):
+            self._plan(jt)
+
+    @property
+    def n_jts(self):
+        return len(self.pos)
+
+    def finished(self):
+        '''
+        true if all joints follow their target (reached the target pos and keep moving with the target vel)
+        '''
+        return bool(np.all(self._end_time <= self.time))
+
+    def _profile_to_target(self, jt, p_start, v_start, p_end=None, v_end=None):
+        '''
+        phases from (p_start, v_start) with zero acceleration to (p_end, v_end), by default the target of joint "jt",
+        or None if the planner doesn't handle the case
+        '''
+        p_end = self.target_pos[jt].item() if p_end is None else p_end
+        v_end = self.target_vel[jt].item() if v_end is None else v_end
+        try:
+            phases = traj.calculate_jerk_sign_and_duration(p_start, p_end, v_start, v_end, self.abs_max_pos[jt].item(),
+                                                           self.abs_max_vel[jt].item(), self.abs_max_acc[jt].item(),
+                                                           self.abs_max_jrk[jt].item())
+        except ValueError:
+            return None
+        end = _phase_table(p_start, v_start, 0.0, phases)[-1]
+        if abs(end[2] - p_end) > TARGET_TOLERANCE or abs(end[3] - v_end) > TARGET_TOLERANCE:
+            return None
+        return phases
+
+    def _profile_through_turnaround(self, jt, p_start):
+        '''
+        phases from standstill at "p_start" to the target of joint "jt" through a turnaround point, where the joint
+        stops before moving to the target, or None if the planner doesn't handle the case (e.g. the turnaround point
+        is outside the pos limits)
+        '''
+        vm, am, jm = self.abs_max_vel[jt].item(), self.abs_max_acc[jt].item(), self.abs_max_jrk[jt].item()
+        target_pos, target_vel = self.target_pos[jt].item(), self.target_vel[jt].item()
+        #the shortest distance over which the target vel is reached from standstill
+        min_pos_to_vel = abs(traj.calculate_min_pos_reached_acc_jrk_time_acc_time_to_reach_final_vel(
+            0.0, abs(target_vel), vm, am, jm)[0])
+        p_turn = target_pos - math.copysign(min_pos_to_vel, target_vel)
+        turn_phases = self._profile_to_target(jt, p_start, 0.0, p_turn, 0.0)
+        if turn_phases is None:
+            return None
+        target_phases = self._profile_to_target(jt, p_turn, 0.0)
+        if target_phases is None:
+            return None
+        return turn_phases + target_phases
+
+    def _plan(self, jt):
+        '''
+        re-plans joint "jt" from its current state to its target, starting at the current time
+        '''
+        #plain floats, numpy scalar arithmetic is much slower
+        p_start, v_start, a_start = self.pos[jt].item(), self.vel[jt].item(), self.acc[jt].item()
+        vm, am, jm = self.abs_max_vel[jt].item(), self.abs_max_acc[jt].item(), self.abs_max_jrk[jt].item()
+        p, v, a = p_start, v_start, a_start
+        #1. acceleration to zero
+        phases = [(-math.copysign(jm, a), abs(a)/jm)]
+        _, _, p, v, _ = _phase_table(p, v, a, phases)[-1]
+        #a valid state reaches zero acceleration within the velocity limit, only rounding errors are clipped here
+        v = min(max(v, -vm), vm)
+
+        target_phases = self._profile_to_target(jt, p, v)
+        if target_phases is None and v != 0.0:
+            #2. stop, then move to the target from standstill
+            logger.debug("joint %s can't reach its target directly from vel %s, stopping first", jt, v)
+            _, acc_to_zero, t_jrk, t_acc = traj.calculate_min_pos_reached_acc_jrk_time_acc_time_to_reach_final_vel(
+                abs(v), 0.0, vm, am, jm)
+            stop_jrk = -math.copysign(jm, v)
+            stop_phases = [(stop_jrk, t_jrk), (0.0, t_acc), (-stop_jrk, t_jrk)]
+            _, _, p, v, _ = _phase_table(p, v, 0.0, stop_phases)[-1]
+            phases += stop_phases
+            target_phases = self._profile_to_target(jt, p, 0.0)
+        if target_phases is None:
+            #3. the target can't be reached directly from standstill, overshoot and come back
+            logger.debug("joint %s can't reach its target directly from standstill, turning around", jt)
+            target_phases = self._profile_through_turnaround(jt, p)
+        if target_phases is None:
+            raise ValueError("non feasible case: joint {} can't reach pos {} with vel {}".format(
+                jt, self.target_pos[jt], self.target_vel[jt]))
+        phases += target_phases
+
+        table = _phase_table(p_start, v_start, a_start, phases)
+        assert len(table) <= MAX_PHASES
+        t_start, jrk, pos, vel, acc = np.array(table).T
+        n = len(table)
+        self._phase_start[jt, :n] = t_start + self.time
+        self._phase_start[jt, n:] = np.inf
+        self._phase_jrk[jt, :n] = jrk
+        self._phase_pos[jt, :n] = pos
+        self._phase_vel[jt, :n] = vel
+        self._phase_acc[jt, :n] = acc
+        #after the last phase the joint follows the target exactly
+        self._phase_pos[jt, n - 1] = self.target_pos[jt]
+        self._phase_vel[jt, n - 1] = self.target_vel[jt]
+        self._phase_acc[jt, n - 1] = 0.0
+        self._end_time[jt] = self._phase_start[jt, n - 1]
+
+    def update(self, target_pos=None, target_vel=None):
+        '''
+        advances one control cycle and returns the pos, vel, acc setpoints of all joints for it, these are the
+        generator's own arrays and are overwritten by the next call.
+        "target_pos", "target_vel" are the new target of each joint (the target vel defaults to zero), joints whose
+        target changed are re-planned from their current state first. if neither is given the target is kept
+        '''
+        if target_pos is not None:
+            np.not_equal(target_pos, self.target_pos, out=self._changed)
+            if target_vel is None:
+                np.not_equal(self.target_vel, 0.0, out=self._vel_changed)
+            else:
+                np.not_equal(target_vel, self.target_vel, out=self._vel_changed)
+            self._changed |= self._vel_changed
+            if self._changed.any():
+                self.target_pos[...] = target_pos
+                self.target_vel[...] = 0.0 if target_vel is None else target_vel
+                for jt in np.flatnonzero(self._changed):
+                    self._plan(jt)
+
+        self.time += self.cycle_time
+        #phase of each joint: number of phases started before the current time, minus one
+        np.less(self._phase_start, self.time, out=self._in_phase)
+        np.sum(self._in_phase, axis=1, out=self._phase_index)
+        self._phase_index -= 1
+        self._phase_index += self._row_offsets
+        np.take(self._phase_start, self._phase_index, out=self._dt)
+        np.subtract(self.time, self._dt, out=self._dt)
+        np.take(self._phase_jrk, self._phase_index, out=self._jrk)
+        np.take(self._phase_pos, self._phase_index, out=self._p0)
+        np.take(self._phase_vel, self._phase_index, out=self._v0)
+        np.take(self._phase_acc, self._phase_index, out=self._a0)
+        #acc = a0 + j*dt
+        np.multiply(self._jrk, self._dt, out=self.acc)
+        self.acc += self._a0
+        #vel = v0 + dt*(a0 + j*dt/2)
+        np.multiply(self._jrk, self._dt, out=self.vel)
+        self.vel *= 0.5
+        self.vel += self._a0
+        self.vel *= self._dt
+        self.vel += self._v0
+        #pos = p0 + dt*(v0 + dt*(a0 + j*dt/3)/2)
+        np.multiply(self._jrk, self._dt, out=self.pos)
+        self.pos /= 3.0
+        self.pos += self._a0
+        self.pos *= self._dt
+        self.pos *= 0.5
+        self.pos += self._v0
+        self.pos *= self._dt
+        self.pos += self._p0
+        return self.pos, self.vel, self.acc
@@ -1,56 +1,49 @@
-import copy
-
 import numpy as np
-from sympy import Float, Matrix, Piecewise, Symbol, sin, cos
+from sympy import Matrix, Symbol, sin, cos
 
-from .piecewise_function import PiecewiseFunction
+from .piecewise_function import PiecewiseFunction, PiecewisePolynomial, _piece_indices
 
 # Values smaller than this are considered to be zero to avoid numerical problems.
 PRECISION = 1e-6
 
 
-def create_arc_segment(q_blend_start, q_unblended_waypoint, q_blend_end, blend_radius, s):
-    # Make sure all arguments are simple numpy arrays (not sympy matrices).
-    q_blend_start = np.array(q_blend_start).astype(np.float64).flatten()
-    q_unblended_waypoint = np.array(q_unblended_waypoint).astype(np.float64).flatten()
-    q_blend_end = np.array(q_blend_end).astype(np.float64).flatten()
-
-    v1 = q_blend_start - q_unblended_waypoint
-    v2 = q_blend_end - q_unblended_waypoint
-    v1 /= np.linalg.norm(v1)
-    v2 /= np.linalg.norm(v2)
-
-    # Included angle between the two segments
-    included_dot_product = np.dot(v1, v2)
-    if np.abs(included_dot_product) > 1.0 - PRECISION:
-        return 0.0, Matrix(q_blend_start)
-
-    theta = np.arccos(included_dot_product)
-
-    # Distance from unblended waypoint to centerpoint of arc.
-    L = blend_radius / np.cos(theta / 2.0)
-
-    centerline_vector = (v1 + v2) / 2.0
-    centerline_vector /= np.linalg.norm(centerline_vector)
-
-    arc_centerpoint = q_unblended_waypoint + L * centerline_vector
-
-    arc_radius = np.linalg.norm(q_blend_start - arc_centerpoint)
-
-    alpha = np.pi - theta
-    chord_vector = q_blend_end - q_blend_start
-    chord_length = np.linalg.norm(chord_vector)
-    chord_vector /= chord_length
-
-    arc_length = arc_radius * alpha
+def path_segments(path):
+    """
+    Start point, unit direction, and length of each straight segment of the given (waypoints x
+    dofs) path, and the value of s at the start of each segment plus the end of the path, all
+    computed with one pass of array operations.
 
-    angle = (alpha / 2.0 - s / arc_radius)
+    Segments shorter than PRECISION (repeated waypoints) have no direction, so they are left out.
+    Raises ValueError if that leaves no segments.
+    """
+    path = np.asarray(path, dtype=np.float64)
+    deltas = np.diff(path, axis=0)
+    lengths = np.linalg.norm(deltas, axis=1)
+    keep = lengths > PRECISION
+    if not np.any(keep):
+        raise ValueError('Path has no segments longer than {}'.format(PRECISION))
+    starts = path[:-1][keep]
+    lengths = lengths[keep]
+    directions = deltas[keep] / lengths[:, np.newaxis]
+    boundaries = np.concatenate(([0.0], np.cumsum(lengths)))
+    return starts, directions, lengths, boundaries
+
+
+def project_limits_onto_segments(limits, directions):
+    """
+    Project joint limits onto the path variable s of every linear segment at once.
 
-    return arc_length, Matrix(arc_centerpoint) + arc_radius * Matrix(-centerline_vector) * cos(
-        angle) + arc_radius * Matrix(-chord_vector) * sin(angle)
+    directions is an (n_segs x n_jts) array of unit segment directions dq/ds. Joints which don't
+    move along a segment put no limit on s, so the result for each segment is the smallest
+    limit/|dq/ds| over the joints which do move.
+    """
+    slopes = np.abs(directions)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        limit_factors = np.where(slopes > 0.0, np.asarray(limits, dtype=np.float64) / slopes, np.inf)
+    return np.min(limit_factors, axis=1)
 
 
-def parameterize_path(path):
+def parameterize_path(path, numeric=False):
     """
     Represent the given joint-space path as a function q = f(s).
 
@@ -67,68 +60,253 @@ def parameterize_path(path):
 
     Put another way, the path length from s=0 to s=S is equal to the integral from 0 to S
     of the norm of the derivative of the parameterized path function w.r.t. the variable s.
+
+    Repeated waypoints are skipped (see path_segments). If numeric is True, the path is returned
+    as a PiecewisePolynomial with one linear piece per segment instead of as sympy expressions.
+    Building the sympy expressions dominates the cost for long paths, so paths with thousands of
+    waypoints should use the numeric form.
     """
     s = Symbol('s')
-    boundaries = [0.0]
-    functions = []
-    # q0 and q1 are successive joint space positions in the path. "boundaries" are the values of the
+    starts, directions, _, boundaries = path_segments(path)
+    if numeric:
+        return PiecewisePolynomial(boundaries, np.stack((starts, directions), axis=1), s)
+
+    # q0 is the start of each segment in joint space. "boundaries" are the values of the
     # independent variable (often time) at which we switch from one function to the next in our
     # piecewise representation.
-    for q0, q1 in zip(path[:-1], path[1:]):
-        q0 = Matrix(q0)
-        q1 = Matrix(q1)
-        s0 = boundaries[-1]
-        length = (q1 - q0).norm()
-        s1 = s0 + length
-        direction = (q1 - q0) / length
-        boundaries.append(float(s1))
-        functions.append(q0 + direction * s)
+    functions = [Matrix(q0) + Matrix(direction) * s for q0, direction in zip(starts, directions)]
     return PiecewiseFunction(boundaries, functions, s)
 
 
-def parameterize_path_with_blends(path, blend_radius):
-    # We modify the path in place when we add blends. To avoid changing the path which was passed
-    # in, we make a copy here.
-    path = copy.deepcopy(path[:])
+class BlendedPath:
+    """
+    A path of straight segments joined by circular arcs, stored as numeric arrays.
 
-    s = Symbol('s')
-    boundaries = [0.0]
-    functions = []
-    # q0 and q1 are successive joint space positions in the path. "boundaries" are the values of the
-    # independent variable (often time) at which we switch from one function to the next in our
-    # piecewise representation.
-    for point_i in range(len(path) - 1):
-        q0 = Matrix(path[point_i])
-        q1 = Matrix(path[point_i + 1])
-        s0 = boundaries[-1]
-        length = (q1 - q0).norm()
-        s1 = s0 + length
-        direction = (q1 - q0) / length
-
-        if point_i == len(path) - 2:
-            # Last point; no blend
-            boundaries.append(float(s1))
-            functions.append(q0 + direction * s)
-        else:
-            # This segments ends where it enters the blend sphere.
-            segment_length = s1 - s0 - blend_radius
-            boundaries.append(boundaries[-1] + segment_length)
-            functions.append(q0 + direction * s)
+    Each piece is described by a (center, u, v, radius, angle) record, with s relative to the
+    start of the piece:
 
-            q_blend_start = functions[-1].subs(s, segment_length)
+        arcs:  q = center + radius * (u * cos(s / radius) + v * sin(s / radius))
+        lines: q = center + v * s
 
-            q2 = Matrix(path[point_i + 2])
-            length_next = (q2 - q1).norm()
-            direction_next = (q2 - q1) / length_next
-            q_blend_end = q1 + direction_next * blend_radius
+    For arcs, u is the unit vector from the center to the start of the arc, v is the direction
+    of motion at the start, and angle is how far the arc turns. Lines have zero radius, u and
+    angle, center is their start point, and v their direction. The arrays have one row per
+    piece; boundaries has the value of s at the start of each piece, plus the end of the path.
+    """
 
-            arc_length, arc_function = create_arc_segment(q_blend_start, q1, q_blend_end,
-                                                          blend_radius, s)
+    def __init__(self, boundaries, centers, u, v, radii, angles, independent_variable=None):
+        self.boundaries = np.asarray(boundaries, dtype=np.float64)
+        self.centers = np.asarray(centers, dtype=np.float64)
+        self.u = np.asarray(u, dtype=np.float64)
+        self.v = np.asarray(v, dtype=np.float64)
+        self.radii = np.asarray(radii, dtype=np.float64)
+        self.angles = np.asarray(angles, dtype=np.float64)
+        self.independent_variable = independent_variable
+        assert len(self.boundaries) - 1 == len(self.centers) == len(self.radii)
+
+    @property
+    def dofs(self):
+        return self.centers.shape[1]
+
+    def _local_coordinates(self, func_indices, value):
+        values_relative = (np.asarray(value, dtype=np.float64) - self.boundaries[func_indices])[..., np.newaxis]
+        radii = self.radii[func_indices][..., np.newaxis]
+        is_arc = radii > 0.0
+        # Lines get a radius of one so that the (unused) arc terms stay finite.
+        radii = np.where(is_arc, radii, 1.0)
+        return values_relative / radii, radii, is_arc
+
+    def __call__(self, value):
+        """
+        Evaluate the path. A scalar value gives an array with one entry per dof. An array of N
+        values gives an (N x dofs) array.
+        """
+        values = np.asarray(value, dtype=np.float64)
+        return self.evaluate_pieces(_piece_indices(self.boundaries, values), values)
+
+    def evaluate_pieces(self, func_indices, value):
+        """
+        Evaluate the path at values which are known to lie in the pieces with the given indices,
+        without searching the boundaries.
+        """
+        angles, radii, is_arc = self._local_coordinates(func_indices, value)
+        along = np.where(is_arc, radii * np.sin(angles), angles)
+        across = radii * np.cos(angles)
+        return self.centers[func_indices] + self.u[func_indices] * across + self.v[func_indices] * along
+
+    def derivatives(self, value, n_derivatives=3, func_indices=None):
+        """
+        The first n_derivatives derivatives of the path with respect to s at the given values, as
+        an array of shape (len(value) x n_derivatives x dofs). The values are evaluated in the
+        pieces with the given indices if func_indices is given.
+        """
+        values = np.atleast_1d(np.asarray(value, dtype=np.float64))
+        if func_indices is None:
+            func_indices = _piece_indices(self.boundaries, values)
+        angles, radii, is_arc = self._local_coordinates(func_indices, values)
+        derivatives = []
+        for order in range(1, n_derivatives + 1):
+            # The n-th derivative of r cos(s / r) is r^(1 - n) cos(s / r + n pi / 2), and the same for sin.
+            scale = radii ** (1 - order)
+            along = np.where(is_arc, scale * np.sin(angles + order * np.pi / 2.0), 1.0 if order == 1 else 0.0)
+            across = scale * np.cos(angles + order * np.pi / 2.0)
+            derivatives.append(self.u[func_indices] * across + self.v[func_indices] * along)
+        return np.stack(derivatives, axis=-2)
+
+    def sample(self, npoints):
+        independent_variable_values = np.linspace(
+            self.boundaries[0], self.boundaries[-1], npoints)
+        path_points = self(independent_variable_values)
+        return independent_variable_values, path_points
+
+    def to_sympy(self, independent_variable=None):
+        """
+        Convert to a sympy backed PiecewiseFunction, with column matrices as pieces.
+        """
+        if independent_variable is None:
+            independent_variable = self.independent_variable
+        if independent_variable is None:
+            independent_variable = Symbol('s')
+        s = independent_variable
+        functions = []
+        for center, u, v, radius in zip(self.centers, self.u, self.v, self.radii):
+            if radius > 0.0:
+                functions.append(Matrix(center) + radius * Matrix(u) * cos(s / radius) +
+                                 radius * Matrix(v) * sin(s / radius))
+            else:
+                functions.append(Matrix(center) + Matrix(v) * s)
+        return PiecewiseFunction(self.boundaries.copy(), functions, independent_variable)
+
+
+def blended_path(starts, directions, lengths, blend_distances, independent_variable=None):
+    """
+    Join the straight segments of a path (see path_segments) with circular arcs, computing all of
+    the blends at once.
 
-            boundaries.append(boundaries[-1] + arc_length)
-            functions.append(arc_function)
+    The blend at each corner starts and ends blend_distances (a scalar, or one value per corner)
+    away from the corner, along the two segments it joins; the arc is tangent to both. Corners
+    where the path doesn't turn or turns back on itself, and corners with a zero blend distance,
+    are not blended. Raises ValueError if blends would overlap.
+    """
+    n_corners = len(lengths) - 1
+    distances = np.broadcast_to(np.asarray(blend_distances, dtype=np.float64), (n_corners,))
+    incoming = directions[:-1]
+    outgoing = directions[1:]
+    cos_turns = np.sum(incoming * outgoing, axis=1)
+    blended = (np.abs(cos_turns) < 1.0 - PRECISION) & (distances > 0.0)
+    distances = np.where(blended, distances, 0.0)
+
+    # Each segment is shortened by the blends at both of its ends.
+    line_lengths = lengths - np.concatenate((distances, [0.0])) - np.concatenate(([0.0], distances))
+    if np.any(line_lengths < -PRECISION):
+        raise ValueError('Blends overlap on segments {}'.format(np.flatnonzero(line_lengths < -PRECISION)))
+    line_lengths = np.maximum(line_lengths, 0.0)
+
+    # The arc turns by the angle between the segments, its center is on the inside of the corner.
+    turns = np.arccos(np.clip(cos_turns, -1.0, 1.0))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        radii = np.where(blended, distances / np.tan(turns / 2.0), 0.0)
+        normals = outgoing - cos_turns[:, np.newaxis] * incoming
+        normals /= np.linalg.norm(normals, axis=1)[:, np.newaxis]
+    arc_starts = starts[1:] - distances[:, np.newaxis] * incoming
+    normals = np.where(blended[:, np.newaxis], normals, 0.0)
+
+    # Pieces alternate between lines (even indices) and arcs (odd indices).
+    n_pieces = 2 * len(lengths) - 1
+    dofs = starts.shape[1]
+    centers = np.empty((n_pieces, dofs))
+    u = np.zeros((n_pieces, dofs))
+    v = np.empty((n_pieces, dofs))
+    piece_radii = np.zeros(n_pieces)
+    angles = np.zeros(n_pieces)
+    piece_lengths = np.empty(n_pieces)
+    centers[::2] = starts + np.concatenate(([0.0], distances))[:, np.newaxis] * directions
+    v[::2] = directions
+    piece_lengths[::2] = line_lengths
+    centers[1::2] = arc_starts + radii[:, np.newaxis] * normals
+    u[1::2] = -normals
+    v[1::2] = incoming
+    piece_radii[1::2] = radii
+    angles[1::2] = np.where(blended, turns, 0.0)
+    piece_lengths[1::2] = radii * angles[1::2]
+
+    keep = piece_lengths > 0.0
+    boundaries = np.concatenate(([0.0], np.cumsum(piece_lengths[keep])))
+    return BlendedPath(boundaries, centers[keep], u[keep], v[keep], piece_radii[keep], angles[keep],
+                       independent_variable)
+
+
+def adaptive_blend_distances(directions, lengths, max_deviation, max_blend_distance=np.inf):
+    """
+    The largest blend distance (see blended_path) at each corner of a path of straight segments
+    (see path_segments) for which the arc passes within max_deviation of the corner, computed for
+    all corners at once.
+
+    An arc starting a distance d from a corner where the path turns by an angle alpha passes
+    d * tan(alpha / 4) from the corner. Each distance is limited to max_blend_distance and to half
+    of the shorter of the two segments meeting at the corner, so neighbouring blends never overlap.
+    """
+    cos_turns = np.clip(np.sum(directions[:-1] * directions[1:], axis=1), -1.0, 1.0)
+    with np.errstate(divide='ignore'):
+        distances = max_deviation / np.tan(np.arccos(cos_turns) / 4.0)
+    return np.minimum(np.minimum(distances, max_blend_distance), np.minimum(lengths[:-1], lengths[1:]) / 2.0)
 
-            path[point_i + 1] = np.array(functions[-1].subs(s, arc_length)).astype(
-                np.float64).flatten()
 
-    return PiecewiseFunction(boundaries, functions, s)
+def parameterize_path_with_blends(path, blend_radius=None, numeric=False, max_deviation=None):
+    """
+    Represent the given joint-space path as a function q = f(s) like parameterize_path, but with
+    the corners replaced by circular arcs. Each blend starts blend_radius before its waypoint and
+    ends blend_radius after it, along the two segments (see blended_path). blend_radius is either
+    one value for all corners, or one value per corner after repeated waypoints are removed.
+
+    If max_deviation is given, every corner instead gets the largest blend which passes within
+    max_deviation of the waypoint and doesn't overlap its neighbours, limited to blend_radius if
+    that is also given (see adaptive_blend_distances).
+
+    If numeric is True, the path is returned as a BlendedPath instead of as sympy expressions.
+    """
+    starts, directions, lengths, _ = path_segments(path)
+    if max_deviation is not None:
+        blend_radius = adaptive_blend_distances(directions, lengths, max_deviation,
+                                                np.inf if blend_radius is None else blend_radius)
+    elif blend_radius is None:
+        raise ValueError('Either blend_radius or max_deviation must be given')
+    path_function = blended_path(starts, directions, lengths, blend_radius, Symbol('s'))
+    if numeric:
+        return path_function
+    return path_function.to_sympy()
+
+
+def path_derivatives(path, s_values, n_derivatives=3, side='right'):
+    """
+    Evaluate the first n_derivatives derivatives of the path q(s) (a PiecewiseFunction or
+    PiecewisePolynomial) at the given values of s. Returns an array of shape
+    (len(s_values) x n_derivatives x dofs).
+
+    At a boundary between two pieces, the derivatives are those of the piece starting there, or of
+    the piece ending there if side is 'left' (as for np.searchsorted).
+
+    Paths made of polynomial pieces are differentiated numerically; other paths (e.g. ones with
+    blend arcs) are differentiated with sympy, once per piece.
+    """
+    s_values = np.asarray(s_values, dtype=np.float64)
+    boundaries = np.asarray(path.boundaries, dtype=np.float64)
+    func_indices = np.clip(np.searchsorted(boundaries, s_values, side=side) - 1, 0, len(boundaries) - 2)
+    if isinstance(path, BlendedPath):
+        return path.derivatives(s_values, n_derivatives, func_indices)
+    if isinstance(path, PiecewiseFunction):
+        try:
+            path = path.to_polynomial()
+        except ValueError:
+            pass
+    derivatives = []
+    function = path
+    for _ in range(n_derivatives):
+        if isinstance(function, PiecewiseFunction):
+            function = PiecewiseFunction(function.boundaries, [f.diff(function.independent_variable)
+                                                               for f in function.functions],
+                                         function.independent_variable)
+        else:
+            function = function.differentiate()
+        derivatives.append(np.reshape(function.evaluate_pieces(func_indices, s_values), (len(s_values), -1)))
+    return np.stack(derivatives, axis=1)
@@ -0,0 +1,95 @@
+"""
+Precomputed lookup tables for a joint space path q(s) which is evaluated many times, e.g. at every
+candidate timestep of a planner working along s.
+
+A PathIndex samples q'(s), q''(s), q'''(s) and the curvature of the path once, at a fixed
+resolution, and keeps the direction at the start of each piece of the path. Looking up the table
+sample for a value of s is a division. Finding the piece which contains s starts from the piece
+found by the previous lookup, so a sequence of increasing values of s (the usual case when
+stepping along a path) costs O(1) per lookup on average instead of a search of the boundaries.
+"""
+import bisect
+
+import numpy as np
+
+from .parameterize_path import path_derivatives
+
+
+class PathIndex:
+    """
+    Lookup tables for the path q(s) (a PiecewiseFunction, PiecewisePolynomial, or BlendedPath):
+
+        boundaries: the values of s at which the pieces of the path start, plus the end of the path
+        directions: unit direction of the path at the start of each piece
+        start_derivatives: (pieces x 3 x dofs) array of q'(s), q''(s), q'''(s) at the start of each piece
+        s_samples: n_samples evenly spaced values of s from the start to the end of the path
+        derivatives: (n_samples x 3 x dofs) array of q'(s), q''(s), q'''(s) at each sample
+        curvature: curvature of the path at each sample
+    """
+
+    def __init__(self, path, n_samples=1000):
+        self.path = path
+        self.boundaries = np.asarray(path.boundaries, dtype=np.float64)
+        self.s_samples = np.linspace(self.boundaries[0], self.boundaries[-1], n_samples)
+        self.s_step = self.s_samples[1] - self.s_samples[0]
+        # One evaluation for the samples and the piece starts, sympy paths are differentiated only once.
+        derivatives = path_derivatives(path, np.concatenate((self.s_samples, self.boundaries[:-1])), 3)
+        self.derivatives = derivatives[:n_samples]
+        self.start_derivatives = derivatives[n_samples:]
+        start_tangents = self.start_derivatives[:, 0]
+        self.directions = start_tangents / np.linalg.norm(start_tangents, axis=1)[:, np.newaxis]
+
+        # Curvature of a curve in N dimensions: |q' x q''| / |q'|^3, with |q' x q''|^2 = |q'|^2 |q''|^2 - (q'.q'')^2.
+        d1, d2 = self.derivatives[:, 0], self.derivatives[:, 1]
+        speeds_squared = np.sum(d1 * d1, axis=1)
+        cross_squared = speeds_squared * np.sum(d2 * d2, axis=1) - np.sum(d1 * d2, axis=1) ** 2
+        self.curvature = np.sqrt(np.maximum(cross_squared, 0.0)) / speeds_squared ** 1.5
+
+        # Python floats, comparing them is much faster than indexing into the boundaries array.
+        self._boundary_list = self.boundaries.tolist()
+        self._piece_i = 0
+
+    @property
+    def n_pieces(self):
+        return len(self.boundaries) - 1
+
+    def piece_index(self, s):
+        """
+        Index of the piece of the path which contains the scalar s, continuing from the piece of
+        the previous lookup. Values past either end of the path are in the first or last piece.
+        """
+        boundaries = self._boundary_list
+        piece_i = self._piece_i
+        if s < boundaries[piece_i]:
+            # Going backwards along the path, search from the start.
+            piece_i = max(bisect.bisect_right(boundaries, s) - 1, 0)
+        else:
+            last_piece_i = len(boundaries) - 2
+            while piece_i < last_piece_i and s >= boundaries[piece_i + 1]:
+                piece_i += 1
+        self._piece_i = piece_i
+        return piece_i
+
+    def position(self, s):
+        """
+        The joint positions q(s) at the scalar s, using piece_index to find the piece.
+        """
+        return self.path.evaluate_pieces(self.piece_index(s), s)
+
+    def sample_indices(self, s):
+        """
+        Index of the table sample at or before each value of s (a scalar or an array), so that
+        each s lies between samples i and i + 1.
+        """
+        sample_i = np.floor_divide(np.asarray(s, dtype=np.float64) - self.s_samples[0], self.s_step)
+        return np.clip(sample_i, 0, len(self.s_samples) - 2).astype(np.intp)
+
+    def interpolated_derivatives(self, s):
+        """
+        q'(s), q''(s), q'''(s) at each value of s (a scalar or an array), linearly interpolated
+        between the table samples, as an array of shape s.shape + (3, dofs).
+        """
+        s = np.asarray(s, dtype=np.float64)
+        sample_i = self.sample_indices(s)
+        weights = ((s - self.s_samples[sample_i]) / self.s_step)[..., np.newaxis, np.newaxis]
+        return (1.0 - weights) * self.derivatives[sample_i] + weights * self.derivatives[sample_i + 1]
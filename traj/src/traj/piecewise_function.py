@@ -1,4 +1,7 @@
 import numpy as np
+from sympy import Add, Float, Matrix, Poly, Symbol, lambdify, sympify
+from sympy.matrices import MatrixBase
+from sympy.polys.polyerrors import PolynomialError
 
 
 class PiecewiseFunction:
@@ -15,8 +18,22 @@ class PiecewiseFunction:
         self.functions = functions
         self.independent_variable = independent_variable
         assert len(boundaries) - 1 == len(functions)
+        # Numeric evaluators of the pieces, each built the first time it is called with an array.
+        self._piece_evaluators = {}
+
+    @property
+    def dofs(self):
+        function = sympify(self.functions[0])
+        return len(function) if isinstance(function, MatrixBase) else 1
 
     def __call__(self, value):
+        """
+        Evaluate the function. A scalar value gives an array with one entry per dof. An array of N
+        values gives an (N x dofs) array, computed with one search over the boundaries and one
+        vectorized evaluation per piece.
+        """
+        if np.ndim(value) > 0:
+            return self._evaluate_array(value)
         if value == self.boundaries[-1]:
             # For convenience, we include the final time in the last segment
             func_i = len(self.functions) - 1
@@ -26,17 +43,60 @@ class PiecewiseFunction:
         return np.array(self.functions[func_i].subs(
             self.independent_variable, value_relative)).astype(np.float64).flatten()
 
+    def _evaluate_array(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        # Boundaries computed with sympy may be sympy numbers rather than floats.
+        return self.evaluate_pieces(_piece_indices(self.boundaries.astype(np.float64), values), values)
+
+    def evaluate_pieces(self, func_indices, value):
+        """
+        Evaluate the function at values which are known to lie in the pieces with the given
+        indices, without searching the boundaries. Uses the numeric piece evaluators, so scalar
+        values don't go through sympy either.
+        """
+        values = np.asarray(value, dtype=np.float64)
+        if np.ndim(func_indices) == 0:
+            return self._piece_evaluator(func_indices)(values - float(self.boundaries[func_indices]))
+        boundaries = self.boundaries.astype(np.float64)
+        results = np.empty(values.shape + (self.dofs,))
+        for func_i in np.unique(func_indices):
+            mask = func_indices == func_i
+            results[mask] = self._piece_evaluator(func_i)(values[mask] - boundaries[func_i])
+        return results
+
+    def _piece_evaluator(self, func_i):
+        evaluator = self._piece_evaluators.get(func_i)
+        if evaluator is None:
+            evaluator = self._piece_evaluators[func_i] = _piece_evaluator(self.functions[func_i],
+                                                                          self.independent_variable)
+        return evaluator
+
+    def to_polynomial(self):
+        """
+        Convert to a numeric PiecewisePolynomial. Raises ValueError if any of the pieces is not a
+        polynomial in the independent variable.
+        """
+        try:
+            piece_coefficients = [_polynomial_coefficients(function, self.independent_variable)
+                                  for function in self.functions]
+        except PolynomialError:
+            raise ValueError('Piecewise function has non-polynomial pieces')
+        n_coefficients = max(coefficients.shape[0] for coefficients in piece_coefficients)
+        coefficients = np.array([np.pad(c, ((0, n_coefficients - c.shape[0]), (0, 0))) for c in piece_coefficients])
+        return PiecewisePolynomial(self.boundaries.astype(np.float64), coefficients, self.independent_variable)
+
     def extend(self, other):
         # If the start of the other piecewise function isn't zero, there would be a gap in the middle of the
         # combined function that would have no defined values. We don't have any good way to handle that.
         assert (other.boundaries[0] == 0.0)
         self.boundaries = np.concatenate((self.boundaries[:-1], other.boundaries + self.boundaries[-1]))
         self.functions = np.concatenate((self.functions, other.functions))
+        self._piece_evaluators = {}
 
     def sample(self, npoints):
         independent_variable_values = np.linspace(
             self.boundaries[0], self.boundaries[-1], npoints)
-        path_points = np.array([self(v) for v in independent_variable_values])
+        path_points = self(independent_variable_values)
         return independent_variable_values, path_points
 
     def integrate(self, integration_constant):
@@ -47,3 +107,178 @@ class PiecewiseFunction:
                                                                         function_i - 1])
             integrated_functions.append(start_value + self.functions[function_i].integrate(self.independent_variable))
         return PiecewiseFunction(self.boundaries[:], integrated_functions, self.independent_variable)
+
+
+class PiecewisePolynomial:
+    """
+    A piecewise polynomial function of a single variable, stored as numeric coefficients.
+
+    This is the numeric counterpart of PiecewiseFunction. Each piece is a polynomial in the
+    independent variable relative to the start of that piece, with coefficients stored lowest
+    order first. The coefficient array has shape (number of pieces, degree + 1, number of dofs).
+
+    Evaluation, integration, and differentiation work directly on the coefficients, so no sympy
+    is involved unless the caller asks for the sympy form with to_sympy().
+    """
+
+    def __init__(self, boundaries, coefficients, independent_variable=None):
+        self.boundaries = np.asarray(boundaries, dtype=np.float64)
+        coefficients = np.asarray(coefficients, dtype=np.float64)
+        if coefficients.ndim == 2:
+            # Single dof function given as (number of pieces, degree + 1).
+            coefficients = coefficients[:, :, np.newaxis]
+        self.coefficients = coefficients
+        self.independent_variable = independent_variable
+        assert self.coefficients.ndim == 3
+        assert len(self.boundaries) - 1 == len(self.coefficients)
+
+    @property
+    def degree(self):
+        return self.coefficients.shape[1] - 1
+
+    @property
+    def dofs(self):
+        return self.coefficients.shape[2]
+
+    def __call__(self, value):
+        """
+        Evaluate the function. A scalar value gives an array with one entry per dof. An array of N
+        values gives an (N x dofs) array.
+        """
+        values = np.asarray(value, dtype=np.float64)
+        return self.evaluate_pieces(_piece_indices(self.boundaries, values), values)
+
+    def evaluate_pieces(self, func_indices, value):
+        """
+        Evaluate the function at values which are known to lie in the pieces with the given
+        indices, without searching the boundaries.
+        """
+        values_relative = (np.asarray(value, dtype=np.float64) - self.boundaries[func_indices])[..., np.newaxis]
+        # Horner's method, starting from the highest order coefficient.
+        result = self.coefficients[func_indices, -1].copy()
+        for power in range(self.degree - 1, -1, -1):
+            result = result * values_relative + self.coefficients[func_indices, power]
+        return result
+
+    def extend(self, other):
+        # If the start of the other piecewise function isn't zero, there would be a gap in the middle of the
+        # combined function that would have no defined values. We don't have any good way to handle that.
+        assert (other.boundaries[0] == 0.0)
+        assert (other.dofs == self.dofs)
+        self.boundaries = np.concatenate((self.boundaries[:-1], other.boundaries + self.boundaries[-1]))
+        # Pad the lower degree function with zero coefficients so that all pieces can share one array.
+        n_coefficients = max(self.degree, other.degree) + 1
+        self.coefficients = np.concatenate((_pad_coefficients(self.coefficients, n_coefficients),
+                                            _pad_coefficients(other.coefficients, n_coefficients)))
+
+    def sample(self, npoints):
+        independent_variable_values = np.linspace(
+            self.boundaries[0], self.boundaries[-1], npoints)
+        path_points = self(independent_variable_values)
+        return independent_variable_values, path_points
+
+    def integrate(self, integration_constant):
+        n_pieces, n_coefficients, dofs = self.coefficients.shape
+        powers = np.arange(1, n_coefficients + 1)[:, np.newaxis]
+        integrated_coefficients = np.zeros((n_pieces, n_coefficients + 1, dofs))
+        integrated_coefficients[:, 1:] = self.coefficients / powers
+
+        # Each piece starts where the previous one ended, so the constant term of each piece is the
+        # integration constant plus the integral over all of the previous pieces.
+        durations = np.diff(self.boundaries)[:, np.newaxis, np.newaxis]
+        increments = np.sum(integrated_coefficients[:, 1:] * durations ** powers, axis=1)
+        integrated_coefficients[:, 0] = integration_constant + np.cumsum(increments, axis=0) - increments
+        return PiecewisePolynomial(self.boundaries.copy(), integrated_coefficients, self.independent_variable)
+
+    def differentiate(self):
+        n_pieces, n_coefficients, dofs = self.coefficients.shape
+        if n_coefficients == 1:
+            return PiecewisePolynomial(self.boundaries.copy(), np.zeros((n_pieces, 1, dofs)),
+                                       self.independent_variable)
+        powers = np.arange(1, n_coefficients)[:, np.newaxis]
+        return PiecewisePolynomial(self.boundaries.copy(), self.coefficients[:, 1:] * powers,
+                                   self.independent_variable)
+
+    def to_sympy(self, independent_variable=None):
+        """
+        Convert to a sympy backed PiecewiseFunction.
+
+        Single dof functions become scalar sympy expressions, multi dof functions become column matrices.
+        """
+        if independent_variable is None:
+            independent_variable = self.independent_variable
+        if independent_variable is None:
+            independent_variable = Symbol('t')
+        functions = []
+        for piece_coefficients in self.coefficients:
+            expressions = [
+                Add(*[Float(c) * independent_variable ** power for power, c in enumerate(piece_coefficients[:, dof_i])])
+                for dof_i in range(self.dofs)]
+            if self.dofs == 1:
+                functions.append(expressions[0])
+            else:
+                functions.append(Matrix(expressions))
+        return PiecewiseFunction(self.boundaries.copy(), functions, independent_variable)
+
+
+def _piece_indices(boundaries, values):
+    # Values past either end are assigned to the first or last piece. For convenience, this includes
+    # the final boundary in the last piece.
+    func_indices = np.searchsorted(boundaries, values, side='right') - 1
+    return np.clip(func_indices, 0, len(boundaries) - 2)
+
+
+def _polynomial_coefficients(function, independent_variable):
+    """
+    Coefficients of a sympy polynomial (or column matrix of polynomials), lowest order first, as an
+    array of shape (degree + 1, dofs).
+    """
+    function = sympify(function)
+    components = list(function) if isinstance(function, MatrixBase) else [function]
+    component_coefficients = [np.array(Poly(component, independent_variable).all_coeffs()[::-1], dtype=np.float64)
+                              for component in components]
+    n_coefficients = max(len(c) for c in component_coefficients)
+    return np.array([np.pad(c, (0, n_coefficients - len(c))) for c in component_coefficients]).T
+
+
+def _piece_evaluator(function, independent_variable):
+    """
+    Build a numeric function which evaluates one sympy piece at an array of values, giving an array of
+    shape (number of values, dofs). Polynomial pieces use Horner's method on their coefficients; anything
+    else (e.g. the arcs in blended paths) falls back to lambdify.
+    """
+    try:
+        coefficients = _polynomial_coefficients(function, independent_variable)
+    except PolynomialError:
+        function = sympify(function)
+        components = list(function) if isinstance(function, MatrixBase) else [function]
+        component_functions = [lambdify(independent_variable, component, 'numpy') for component in components]
+
+        def evaluate_lambdified(values):
+            return np.stack([np.broadcast_to(f(values), values.shape) for f in component_functions], axis=-1)
+        return evaluate_lambdified
+
+    def evaluate_polynomial(values):
+        result = np.broadcast_to(coefficients[-1], values.shape + coefficients.shape[-1:])
+        for power in range(len(coefficients) - 2, -1, -1):
+            result = result * values[..., np.newaxis] + coefficients[power]
+        return result
+    return evaluate_polynomial
+
+
+def _pad_coefficients(coefficients, n_coefficients):
+    padding = n_coefficients - coefficients.shape[1]
+    return np.pad(coefficients, ((0, 0), (0, padding), (0, 0)))
+
+
+def piecewise_constant(boundaries, values, independent_variable, numeric=False):
+    """
+    Piecewise function which takes the given constant value on each piece.
+
+    This is how jerk profiles are built. If numeric is True, the result is a PiecewisePolynomial,
+    otherwise it is a sympy backed PiecewiseFunction.
+    """
+    if numeric:
+        return PiecewisePolynomial(boundaries, np.reshape(np.asarray(values, dtype=np.float64), (-1, 1, 1)),
+                                   independent_variable)
+    return PiecewiseFunction(boundaries, [Float(value) for value in values], independent_variable)
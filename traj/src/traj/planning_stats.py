@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+"""
+instrumentation for the segment planner: call counts and latency histograms per branch, and the slowest calls with
+their inputs, to find the cases which blow the cycle time budget.
+
+instrumented functions (see "instrumented") record which branches they take with "note_branch", e.g. the "b2a" case
+of "equal_vel_case_planning". a call's branch is the list of branches noted during it, including the branches of the
+instrumented functions it calls, e.g. "simple_positive/b2b". recording is disabled by default, then instrumented functions only
+check a flag before calling the planner and "note_branch" returns immediately:
+
+    traj.planning_stats.enable()
+    ... plan segments ...
+    print(traj.planning_stats.report())
+    traj.planning_stats.slowest_cases('traj_segment_planning')
+"""
+import bisect
+import functools
+import heapq
+import itertools
+import time
+
+# upper edges of the latency histogram bins, in microseconds
+HISTOGRAM_BINS_US = (1.0, 2.0, 5.0, 10.0, 20.0, 50.0, 100.0, 200.0, 500.0, 1000.0, 2000.0, 5000.0, float('inf'))
+
+_enabled = False
+# branches noted by each of the instrumented calls in progress, innermost last
+_active_calls = []
+# (function name, branch) -> BranchStats
+_branch_stats = {}
+# function name -> heap of the slowest calls (latency_us, sequence number, args, branch)
+_slowest = {}
+_n_slowest = 20
+_sequence = itertools.count()
+
+
+class BranchStats:
+    '''
+    number of calls, total and max latency, and latency histogram (see HISTOGRAM_BINS_US) of one branch of a function
+    '''
+    def __init__(self):
+        self.calls = 0
+        self.total_us = 0.0
+        self.max_us = 0.0
+        self.histogram = [0]*len(HISTOGRAM_BINS_US)
+
+    def add(self, latency_us):
+        self.calls += 1
+        self.total_us += latency_us
+        self.max_us = max(self.max_us, latency_us)
+        self.histogram[bisect.bisect_left(HISTOGRAM_BINS_US, latency_us)] += 1
+
+    @property
+    def mean_us(self):
+        return self.total_us/self.calls
+
+
+def enable(n_slowest=20):
+    '''
+    starts recording, keeping the "n_slowest" slowest calls of each function
+    '''
+    global _enabled, _n_slowest
+    _n_slowest = n_slowest
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def is_enabled():
+    return _enabled
+
+
+def reset():
+    '''
+    discards everything recorded so far
+    '''
+    _branch_stats.clear()
+    _slowest.clear()
+
+
+def note_branch(branch):
+    '''
+    records that the innermost instrumented call in progress took "branch"
+    '''
+    if _enabled and _active_calls:
+        _active_calls[-1].append(branch)
+
+
+def instrumented(function):
+    '''
+    decorator which records the latency, branch, and inputs of each call to "function" while recording is enabled
+    '''
+    name = function.__name__
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        if not _enabled:
+            return function(*args, **kwargs)
+        branches = []
+        _active_calls.append(branches)
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        except Exception:
+            #an error raised by an instrumented call inside this one is already part of its branch
+            if not (branches and branches[-1].endswith('error')):
+                branches.append('error')
+            raise
+        finally:
+            latency_us = (time.perf_counter() - start)*1e6
+            _active_calls.pop()
+            branch = '/'.join(branches)
+            if _active_calls:
+                _active_calls[-1].append(branch)
+            _record(name, branch, latency_us, args, kwargs)
+    return wrapper
+
+
+def _record(name, branch, latency_us, args, kwargs):
+    stats = _branch_stats.get((name, branch))
+    if stats is None:
+        stats = _branch_stats[(name, branch)] = BranchStats()
+    stats.add(latency_us)
+    slowest = _slowest.setdefault(name, [])
+    case = (latency_us, next(_sequence), (args, kwargs), branch)
+    if len(slowest) < _n_slowest:
+        heapq.heappush(slowest, case)
+    elif latency_us > slowest[0][0]:
+        heapq.heapreplace(slowest, case)
+
+
+def branch_stats():
+    '''
+    returns a dict (function name, branch) -> BranchStats of everything recorded so far
+    '''
+    return dict(_branch_stats)
+
+
+def slowest_cases(function_name, n=None):
+    '''
+    returns the slowest recorded calls of the given function, slowest first, as a list of dicts with the latency
+    (in microseconds), branch, and the args/kwargs the function was called with
+    '''
+    cases = sorted(_slowest.get(function_name, []), reverse=True)[:n]
+    return [{'latency_us': latency_us, 'branch': branch, 'args': args, 'kwargs': kwargs}
+            for latency_us, _, (args, kwargs), branch in cases]
+
+
+def report(n_slowest=5):
+    '''
+    returns a text report with the call count and latencies of each branch of each function, followed by the
+    "n_slowest" slowest calls of each function
+    '''
+    lines = ['{:35s} {:45s} {:>8s} {:>10s} {:>10s}'.format('function', 'branch', 'calls', 'mean_us', 'max_us')]
+    for (name, branch), stats in sorted(_branch_stats.items()):
+        lines.append('{:35s} {:45s} {:8d} {:10.1f} {:10.1f}'.format(name, branch or '-', stats.calls, stats.mean_us,
+                                                                    stats.max_us))
+        histogram = ', '.join('<{:g}us: {}'.format(edge, count)
+                              for edge, count in zip(HISTOGRAM_BINS_US, stats.histogram) if count)
+        lines.append('    ' + histogram)
+    for name in sorted(_slowest):
+        lines.append('')
+        lines.append('slowest calls of {}:'.format(name))
+        for case in slowest_cases(name, n_slowest):
+            lines.append('{:10.1f} us  {:45s} {}'.format(case['latency_us'], case['branch'] or '-', case['args']))
+    return '\n'.join(lines)
@@ -12,10 +12,10 @@ def plot_trajectory(figure, position, velocity, acceleration, jerk, n_points=300
     """
     boundaries = jerk.boundaries
     plot_times = np.linspace(position.boundaries[0], position.boundaries[-1], n_points)
-    positions = np.array([position(t) for t in plot_times])
-    velocities = np.array([velocity(t) for t in plot_times])
-    accelerations = np.array([acceleration(t) for t in plot_times])
-    jerks = np.array([jerk(t) for t in plot_times])
+    positions = position(plot_times)
+    velocities = velocity(plot_times)
+    accelerations = acceleration(plot_times)
+    jerks = jerk(plot_times)
     axes = figure.subplots(4, sharex=True)
     for joint_i in range(positions.shape[1]):
         c = joint_colors[joint_i]
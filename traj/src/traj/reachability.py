@@ -0,0 +1,198 @@
+"""
+Time optimal parameterization of a joint space path q(s) with joint velocity and acceleration
+limits, using reachability analysis on a grid of s (as in TOPP-RA).
+
+Along the path, the joint velocities and accelerations are
+
+    q_dot = q'(s) s_dot
+    q_ddot = q'(s) s_ddot + q''(s) s_dot^2
+
+With x = s_dot^2 and u = s_ddot, the velocity limits bound x at each grid point and the
+acceleration limits bound u between lines in x. Between grid points i and i + 1, the path
+acceleration is constant, so x_{i+1} = x_i + 2 (s_{i+1} - s_i) u_i, which is exact for constant
+acceleration.
+
+The controllable set of a grid point is the interval of x from which the end of the path can be
+reached with the desired final velocity, computed with one backward pass. The reachable set is the
+interval of x which can be reached from the start of the path, computed with one forward pass. The
+time optimal parameterization greedily takes the largest u which stays in the next controllable
+set. Every update is an intersection of half-lines in x, computed for all pairs of lower and upper
+bounds on u at once with numpy, so no linear programs are needed and the cost is linear in the
+number of grid points.
+
+The grid contains every piece boundary of the path, so that short pieces such as blend arcs are
+always constrained. At a boundary, the limits have to hold with the derivatives of the pieces on
+both sides of it. Where the direction of the path changes at a boundary (an unblended corner), the
+joint velocities would have to change instantly unless the path velocity is zero, so the path
+has to stop there.
+"""
+import numpy as np
+
+from .parameterize_path import path_derivatives
+
+# Path derivatives smaller than this are considered to be zero.
+SLOPE_THRESHOLD = 1e-9
+# Intervals can be empty by this much because of floating point errors.
+X_TOLERANCE = 1e-9
+# Changes of q'(s) smaller than this at a piece boundary are not corners.
+CORNER_THRESHOLD = 1e-6
+
+
+def path_grid(path, n_grid_points):
+    """
+    Roughly n_grid_points evenly spaced values of s from the start to the end of the path, plus the
+    boundaries between the pieces of the path.
+    """
+    boundaries = np.asarray(path.boundaries, dtype=np.float64)
+    return np.union1d(np.linspace(boundaries[0], boundaries[-1], n_grid_points), boundaries)
+
+
+def path_constraints(path, s_grid, v_max, a_max):
+    """
+    Constraints on x = s_dot^2 and u = s_ddot at each value of s in s_grid.
+
+    Returns x_max, the largest x allowed by the velocity limits (and by the acceleration limits
+    for joints which only move because the path curves), and the lines lower_u = l0 + l1 x and
+    upper_u = u0 + u1 x between which the acceleration limits keep u, as four
+    (len(s_grid) x 2 dofs) arrays. The constraints use the derivatives of the path on both sides of
+    each value of s, which only differ at piece boundaries, and x_max is zero at corners.
+    """
+    right = path_derivatives(path, s_grid, 2)
+    left = path_derivatives(path, s_grid, 2, side='left')
+    corners = np.any(np.abs(right[:, 0] - left[:, 0]) > CORNER_THRESHOLD, axis=1)
+    # One column per joint and side, the constraints of both sides are combined like those of the joints.
+    derivatives = np.concatenate((left, right), axis=2)
+    d1, d2 = derivatives[:, 0], derivatives[:, 1]
+    v_max = np.tile(np.asarray(v_max, dtype=np.float64), 2)
+    a_max = np.tile(np.asarray(a_max, dtype=np.float64), 2)
+    moving = np.abs(d1) > SLOPE_THRESHOLD
+    curving = np.abs(d2) > SLOPE_THRESHOLD
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x_max = np.min(np.where(moving, (v_max / np.abs(d1)) ** 2, np.inf), axis=1)
+        x_max = np.minimum(x_max, np.min(np.where(~moving & curving, a_max / np.abs(d2), np.inf), axis=1))
+        # -a_max <= d1 u + d2 x <= a_max, solved for u.
+        half_width = np.where(moving, a_max / np.abs(d1), np.inf)
+        slope = np.where(moving, -d2 / d1, 0.0)
+    x_max[corners] = 0.0
+    return x_max, (-half_width, slope, half_width, slope)
+
+
+def _transition_bounds(x_next_lo, x_next_hi, delta_s):
+    """
+    Lines bounding u so that x_next = x + 2 delta_s u lies in [x_next_lo, x_next_hi].
+    """
+    return (np.array([x_next_lo / (2.0 * delta_s)]), np.array([-1.0 / (2.0 * delta_s)]),
+            np.array([x_next_hi / (2.0 * delta_s)]), np.array([-1.0 / (2.0 * delta_s)]))
+
+
+def _bounds_at(u_bounds, i, transition):
+    return tuple(np.concatenate((bound[i], transition_bound)) for bound, transition_bound in zip(u_bounds, transition))
+
+
+def _feasible_x(l0, l1, u0, u1, x_lo, x_hi):
+    """
+    The interval of x in [x_lo, x_hi] for which every lower bound line on u is below every upper
+    bound line, as (lo, hi), or None if it is empty.
+    """
+    # Each pair of lines gives slope * x + offset <= 0.
+    slopes = l1[:, np.newaxis] - u1[np.newaxis, :]
+    offsets = l0[:, np.newaxis] - u0[np.newaxis, :]
+    flat = np.abs(slopes) <= SLOPE_THRESHOLD * np.maximum(np.abs(l1[:, np.newaxis]), np.abs(u1[np.newaxis, :]))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        crossings = -offsets / slopes
+    if np.any(flat & (offsets > X_TOLERANCE)):
+        return None
+    x_hi = min(x_hi, np.min(crossings[~flat & (slopes > 0.0)], initial=np.inf))
+    x_lo = max(x_lo, np.max(crossings[~flat & (slopes < 0.0)], initial=-np.inf))
+    if x_lo > x_hi + X_TOLERANCE:
+        return None
+    return x_lo, max(x_lo, x_hi)
+
+
+def _extreme_next_x(offsets, slopes, x_lo, x_hi, delta_s, upper):
+    """
+    The largest (if upper is True) or smallest x + 2 delta_s u over x in [x_lo, x_hi], with u at
+    the lowest upper bound line (or highest lower bound line) given by offsets and slopes.
+    """
+    # The extreme of a piecewise linear function is at an end of the interval or where two lines cross.
+    next_offsets = 2.0 * delta_s * offsets
+    next_slopes = 1.0 + 2.0 * delta_s * slopes
+    with np.errstate(divide='ignore', invalid='ignore'):
+        crossings = ((next_offsets[np.newaxis, :] - next_offsets[:, np.newaxis]) /
+                     (next_slopes[:, np.newaxis] - next_slopes[np.newaxis, :])).ravel()
+    candidates = np.concatenate(([x_lo, x_hi], crossings[(crossings > x_lo) & (crossings < x_hi)]))
+    finite = np.isfinite(next_offsets)
+    values = next_offsets[finite] + next_slopes[finite] * candidates[:, np.newaxis]
+    if upper:
+        return np.max(np.min(values, axis=1))
+    return np.min(np.max(values, axis=1))
+
+
+def controllable_sets(s_grid, x_max, u_bounds, x_end):
+    """
+    The controllable set [lo, hi] of x = s_dot^2 at each grid point, as an (len(s_grid) x 2)
+    array: the values of x from which x_end can be reached at the end of the path. Raises
+    ValueError if the start of the path has no controllable values.
+    """
+    sets = np.full((len(s_grid), 2), np.nan)
+    if x_end > x_max[-1] + X_TOLERANCE:
+        raise ValueError('Final velocity violates the limits at the end of the path')
+    sets[-1] = x_end, x_end
+    for i in range(len(s_grid) - 2, -1, -1):
+        transition = _transition_bounds(sets[i + 1, 0], sets[i + 1, 1], s_grid[i + 1] - s_grid[i])
+        interval = _feasible_x(*_bounds_at(u_bounds, i, transition), 0.0, x_max[i])
+        if interval is None:
+            raise ValueError('Path can not be traversed with the given limits (s = {})'.format(s_grid[i]))
+        sets[i] = interval
+    return sets
+
+
+def reachable_sets(s_grid, x_max, u_bounds, x_start, controllable):
+    """
+    The reachable set [lo, hi] of x = s_dot^2 at each grid point, as an (len(s_grid) x 2) array:
+    the values of x which can be reached from x_start at the start of the path while staying in the
+    controllable sets. Raises ValueError if x_start is not controllable.
+    """
+    sets = np.full((len(s_grid), 2), np.nan)
+    if not controllable[0, 0] - X_TOLERANCE <= x_start <= controllable[0, 1] + X_TOLERANCE:
+        raise ValueError('Initial velocity can not be brought to the final velocity along the path')
+    sets[0] = x_start, x_start
+    for i in range(len(s_grid) - 1):
+        delta_s = s_grid[i + 1] - s_grid[i]
+        transition = _transition_bounds(controllable[i + 1, 0], controllable[i + 1, 1], delta_s)
+        l0, l1, u0, u1 = _bounds_at(u_bounds, i, transition)
+        x_lo, x_hi = _feasible_x(l0, l1, u0, u1, sets[i, 0], sets[i, 1])
+        sets[i + 1] = (_extreme_next_x(l0, l1, x_lo, x_hi, delta_s, upper=False),
+                       _extreme_next_x(u0, u1, x_lo, x_hi, delta_s, upper=True))
+    return sets
+
+
+def time_optimal_path_velocities(path, v_max, a_max, n_grid_points=1000, s_dot_start=0.0, s_dot_end=0.0):
+    """
+    Time optimal velocity along the path q(s) (a PiecewiseFunction or PiecewisePolynomial, e.g. from
+    parameterize_path or parameterize_path_with_blends) with the given per joint velocity and
+    acceleration limits.
+
+    Returns the grid of s values (see path_grid), the path velocity s_dot at each of them, and the
+    time at which each of them is reached.
+    """
+    s_grid = path_grid(path, n_grid_points)
+    x_max, u_bounds = path_constraints(path, s_grid, v_max, a_max)
+    controllable = controllable_sets(s_grid, x_max, u_bounds, s_dot_end ** 2)
+    if not controllable[0, 0] - X_TOLERANCE <= s_dot_start ** 2 <= controllable[0, 1] + X_TOLERANCE:
+        raise ValueError('Initial velocity can not be brought to the final velocity along the path')
+
+    x = np.empty(len(s_grid))
+    x[0] = s_dot_start ** 2
+    for i in range(len(s_grid) - 1):
+        delta_s = s_grid[i + 1] - s_grid[i]
+        # The largest acceleration allowed by the limits which keeps us in the controllable set.
+        u = min(np.min(u_bounds[2][i] + u_bounds[3][i] * x[i]), (controllable[i + 1, 1] - x[i]) / (2.0 * delta_s))
+        x[i + 1] = min(max(x[i] + 2.0 * delta_s * u, controllable[i + 1, 0]), controllable[i + 1, 1])
+    s_dots = np.sqrt(np.maximum(x, 0.0))
+
+    # With constant acceleration between grid points, the average velocity is the mean of the ends.
+    with np.errstate(divide='ignore'):
+        durations = 2.0 * np.diff(s_grid) / (s_dots[:-1] + s_dots[1:])
+    times = np.concatenate(([0.0], np.cumsum(durations)))
+    return s_grid, s_dots, times
@@ -0,0 +1,47 @@
+"""
+Optional ROS integration for the library's logging.
+
+The planning modules log through the standard logging module (under the "traj" logger), so importing
+traj does not need ROS. Nodes that want the library's log messages in rosout can call
+use_rospy_logging() after rospy.init_node(). This is the only module in the package which imports rospy.
+"""
+import logging
+
+import rospy
+
+
+class RospyHandler(logging.Handler):
+    """
+    Logging handler which forwards records to the matching rospy log function.
+    """
+
+    def emit(self, record):
+        try:
+            message = self.format(record)
+        except Exception:
+            self.handleError(record)
+            return
+        if record.levelno >= logging.CRITICAL:
+            rospy.logfatal(message)
+        elif record.levelno >= logging.ERROR:
+            rospy.logerr(message)
+        elif record.levelno >= logging.WARNING:
+            rospy.logwarn(message)
+        elif record.levelno >= logging.INFO:
+            rospy.loginfo(message)
+        else:
+            rospy.logdebug(message)
+
+
+def use_rospy_logging(level=logging.DEBUG):
+    """
+    Send log messages from the traj package to rospy.
+
+    Messages below the given level are dropped before they are formatted. rospy then applies the
+    node's own log level on top of this.
+    """
+    logger = logging.getLogger('traj')
+    if not any(isinstance(handler, RospyHandler) for handler in logger.handlers):
+        logger.addHandler(RospyHandler())
+    logger.setLevel(level)
+    return logger
@@ -1,12 +1,14 @@
 #!/usr/bin/env python
 """
-sampling funtion for 10_phase segment, it takes as argument:
+sampling funtion for multi_phase segment (e.g. 10_phase), it takes as argument:
 1. start time/pos/vel
 2. jerk value and duration of each phase
 3. the time instant at which we need to calculate pos, vel, acc, jrk
 and returns pos, vel, acc, jrk at that time instant
 """
 
+import bisect
+
 import numpy as np
 
 
@@ -55,6 +57,128 @@ def sample( t, p_start, v_start, phase_times, phase_jrk,  infl_points_acc, infl_
         return pos, vel, acc, jrk
   
   
+def inflection_points(p_start, v_start, phase_jrk, phase_dur):
+    '''
+    returns the phase times and the acc, vel, pos at each inflection point where phase changes (including the start and
+    end of the segment), phases are along the last axis so p_start/v_start can be arrays (e.g. one entry per joint)
+    '''
+    #the change of each quantity over a phase only depends on the lower derivatives at the start of that phase,
+    #so the inflection points are cumulative sums of these changes
+    def cumulative(changes):
+        return np.concatenate((np.zeros(changes.shape[:-1] + (1,)), np.cumsum(changes, axis=-1)), axis=-1)
+    jrk = phase_jrk
+    dur = phase_dur
+    phase_times = cumulative(dur)
+    infl_points_acc = cumulative(jrk*dur)
+    acc = infl_points_acc[..., :-1]
+    infl_points_vel = np.asarray(v_start)[..., np.newaxis] + cumulative(jrk*dur**2/2.0 + acc*dur)
+    vel = infl_points_vel[..., :-1]
+    infl_points_pos = np.asarray(p_start)[..., np.newaxis] + cumulative(jrk*dur**3/6.0 + acc*dur**2/2.0 + vel*dur)
+    return phase_times, infl_points_acc, infl_points_vel, infl_points_pos
+
+
+class SegmentSampler:
+    '''
+    a trajectory segment prepared for repeated sampling, it takes as argument:
+        1. starting time "t_start", starting position "p_start", and starting velocity "v_start"
+        2. jerk value and jerk duration of each phase: "phase_jrk", "phase_dur" (any number of phases)
+    the phase times and the pos, vel, acc at each inflection point are computed once here, 
+    calling the sampler with a time instant (or an array of time instants) only looks up the phase and evaluates it
+    '''
+    def __init__(self, t_start, p_start, v_start, phase_jrk, phase_dur):
+        self.t_start = t_start
+        self.phase_jrk = np.asarray(phase_jrk, dtype=np.float64)
+        self.phase_dur = np.asarray(phase_dur, dtype=np.float64)
+        self.phase_times, self.infl_points_acc, self.infl_points_vel, self.infl_points_pos = inflection_points(
+            p_start, v_start, self.phase_jrk, self.phase_dur)
+        #plain float copies for sampling one time instant at a time (e.g. once per control cycle), 
+        #where numpy's per call overhead would dominate
+        self._phase_table = list(zip(self.phase_jrk.tolist(), self.phase_dur.tolist(), self.infl_points_acc.tolist(), 
+                                     self.infl_points_vel.tolist(), self.infl_points_pos.tolist()))
+        self._phase_times = self.phase_times.tolist()
+        self._end_state = (self.infl_points_pos[-1].item(), self.infl_points_vel[-1].item(), self.infl_points_acc[-1].item(), 0.0)
+
+    @property
+    def duration(self):
+        return self.phase_times[-1]
+
+    def __call__(self, t):
+        '''
+        returns pos, vel, acc, jrk at time instant "t", if "t" is an array each of them is an array of the same shape.
+        as in "sample", before the segment the start state is held and after it the end state, both with zero jerk
+        '''
+        if np.ndim(t) == 0:
+            return self._sample_scalar(float(t) - self.t_start)
+        t = np.asarray(t, dtype=np.float64) - self.t_start
+        ph = find_phase(t, self.phase_times)
+        outside = (ph < 0) | (ph >= len(self.phase_dur))
+        ph = np.clip(ph, 0, len(self.phase_dur) - 1)
+        t = np.clip(t - self.phase_times[ph], 0.0, self.phase_dur[ph])
+        jrk = np.where(outside, 0.0, self.phase_jrk[ph])
+        acc = self.phase_jrk[ph]*t        +  self.infl_points_acc[ph]
+        vel = self.phase_jrk[ph]*t**2/2.0 +  self.infl_points_acc[ph]*t           + self.infl_points_vel[ph]
+        pos = self.phase_jrk[ph]*t**3/6.0 +  self.infl_points_acc[ph]*t**2/2.0    + self.infl_points_vel[ph]*t + self.infl_points_pos[ph]
+        return pos, vel, acc, jrk
+
+    def _sample_scalar(self, t):
+        ph = bisect.bisect_left(self._phase_times, t) - 1
+        if ph < 0: #before segment
+            jrk, dur, acc, vel, pos = self._phase_table[0]
+            return pos, vel, acc, 0.0
+        if ph >= len(self._phase_table): #after segment
+            return self._end_state
+        jrk, dur, acc, vel, pos = self._phase_table[ph]
+        t = t - self._phase_times[ph]
+        return (jrk*t**3/6.0 + acc*t**2/2.0 + vel*t + pos,
+                jrk*t**2/2.0 + acc*t + vel,
+                jrk*t + acc,
+                jrk)
+
+
+class MultiJointSegmentSampler:
+    '''
+    samples all joints of a synchronized segment at once, it takes as argument:
+        1. starting time "t_start", and the starting position "pos_start" and velocity "vel_start" of each joint
+        2. jerk value and duration of each phase for each joint: "phase_jrk_jt", "phase_dur_jt", as returned by 
+           "segment_synchronization" (joints x phases), joints with fewer phases are padded with zero duration phases
+    calling the sampler with an array of T time instants returns a (T x joints x 4) array of pos, vel, acc, jrk,
+    a single time instant gives a (joints x 4) array. outside the segment the start/end states are held with zero jerk
+    '''
+    def __init__(self, t_start, pos_start, vel_start, phase_jrk_jt, phase_dur_jt):
+        self.t_start = t_start
+        n_phases = max(len(dur) for dur in phase_dur_jt)
+        self.phase_jrk = np.array([np.pad(np.asarray(jrk, dtype=np.float64), (0, n_phases - len(jrk))) for jrk in phase_jrk_jt])
+        self.phase_dur = np.array([np.pad(np.asarray(dur, dtype=np.float64), (0, n_phases - len(dur))) for dur in phase_dur_jt])
+        self.phase_times, self.infl_points_acc, self.infl_points_vel, self.infl_points_pos = inflection_points(
+            np.asarray(pos_start, dtype=np.float64), np.asarray(vel_start, dtype=np.float64), self.phase_jrk, self.phase_dur)
+
+    @property
+    def n_jts(self):
+        return self.phase_dur.shape[0]
+
+    @property
+    def duration(self):
+        return np.max(self.phase_times[:, -1])
+
+    def __call__(self, t):
+        t = np.asarray(t, dtype=np.float64) - self.t_start
+        n_phases = self.phase_dur.shape[1]
+        #phase of each (time, joint): number of phase times before t, minus one (same as "find_phase")
+        ph = np.sum(self.phase_times < t[..., np.newaxis, np.newaxis], axis=-1) - 1
+        outside = (ph < 0) | (ph >= n_phases)
+        ph = np.clip(ph, 0, n_phases - 1)
+        jt = np.arange(self.n_jts)
+        t = np.clip(t[..., np.newaxis] - self.phase_times[jt, ph], 0.0, self.phase_dur[jt, ph])
+        jrk = self.phase_jrk[jt, ph]
+        acc = self.infl_points_acc[jt, ph]
+        vel = self.infl_points_vel[jt, ph]
+        pos = self.infl_points_pos[jt, ph]
+        return np.stack((jrk*t**3/6.0 + acc*t**2/2.0 + vel*t + pos,
+                         jrk*t**2/2.0 + acc*t + vel,
+                         jrk*t + acc,
+                         np.where(outside, 0.0, jrk)), axis=-1)
+
+
 def sample_segment(t, t_start, p_start, v_start, phase_jrk, phase_dur):
     '''
     this functions is to sample a trajectory segment, it takes as argument:
@@ -65,17 +189,6 @@ def sample_segment(t, t_start, p_start, v_start, phase_jrk, phase_dur):
         pos, vel, acc, and jrk at that time instant "t"
 
     J, T are vectors of size equal to number of phases 
+    to sample the same segment many times, build a SegmentSampler once and call it instead
     '''
-    #convert durations to  times
-    phase_times = [ sum(phase_dur[0:i]) for i in range(0, len(phase_dur)+1) ]
-       
-    #calculate pos,vel,acc at each inflection point where phase changes: 
-    infl_points_acc=[0.0]
-    infl_points_vel=[v_start]
-    infl_points_pos=[p_start]
-    for i in range (0, 10):
-        infl_points_acc.append( phase_jrk[i]*phase_dur[i]        +  infl_points_acc[i] )
-        infl_points_vel.append( phase_jrk[i]*phase_dur[i]**2/2.0 +  infl_points_acc[i]*phase_dur[i]          + infl_points_vel[i]  )
-        infl_points_pos.append( phase_jrk[i]*phase_dur[i]**3/6.0 +  infl_points_acc[i]*phase_dur[i]**2/2.0   + infl_points_vel[i]*phase_dur[i]  + infl_points_pos[i] )
-    
-    return sample( t-t_start, p_start, v_start, phase_times, phase_jrk,  infl_points_acc, infl_points_vel, infl_points_pos)
+    return SegmentSampler(t_start, p_start, v_start, phase_jrk, phase_dur)(t)
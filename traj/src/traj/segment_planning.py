@@ -2,9 +2,12 @@
 """
 this file contains main low level planning function "traj_segment_planning" to to calculate the values of t_jrk, t_acc, t_vel for each phase of the segment
 """
-import rospy
+import logging
 import math
 from . import cubic_eq_roots as rt
+from . import planning_stats
+
+logger = logging.getLogger(__name__)
 
 
 def calculate_min_pos_reached_acc_to_reach_max_vel(v, vm, am, jm):
@@ -224,7 +227,7 @@ def equal_vel_case_planning (pos_diff, v, abs_max_vel, abs_max_acc, abs_max_jrk)
     # check if reached_acc_to_max_vel < abs_max_acc: 
     #if yes: then no const_acc phase, check if a const_vel phase is required or not (to satisfy pos_diff) 
     if(reached_acc_to_max_vel<= abs_max_acc):
-        rospy.logdebug("case a: maxAcc won't be reached !  /\\/ ")
+        logger.debug("case a: maxAcc won't be reached !  /\\/ ")
         reached_vel = abs_max_vel
         reached_acc = reached_acc_to_max_vel      
         t_max_jrk = reached_acc_to_max_vel/abs_max_jrk
@@ -232,16 +235,18 @@ def equal_vel_case_planning (pos_diff, v, abs_max_vel, abs_max_acc, abs_max_jrk)
         t_max_vel = 0.0
         
         if(pos_diff > min_pos_to_max_vel):
-            rospy.logdebug("\n >>> case a1: require const_vel_phase=zero_acc_phase [ /\-----\/ ]" )
+            logger.debug("\n >>> case a1: require const_vel_phase=zero_acc_phase [ /\-----\/ ]")
+            planning_stats.note_branch('a1')
             t_max_vel= (pos_diff - min_pos_to_max_vel )/ abs_max_vel
         else:
-            rospy.logdebug("\n >>> case a2: calculate Acc corresponds to pos_diff [ /\\/ ]")
+            logger.debug("\n >>> case a2: calculate Acc corresponds to pos_diff [ /\\/ ]")
+            planning_stats.note_branch('a2')
             acc = calculate_reached_acc_in_case_no_const_acc_phase(pos_diff, v, abs_max_vel, abs_max_acc, abs_max_jrk)
             t_max_jrk = acc/abs_max_jrk
                 
     #if  no: check if a const_acc phase is required or not (to satisfy pos_diff) 
     elif(reached_acc_to_max_vel > abs_max_acc):
-        rospy.logdebug("case b: maxAcc will be reached !  /'''\\.../")
+        logger.debug("case b: maxAcc will be reached !  /'''\\.../")
         min_pos_to_max_vel, t_max_acc = calculate_min_pos_const_acc_time_to_reach_max_acc_and_max_vel(v, abs_max_vel, abs_max_acc, abs_max_jrk)
         reached_vel = abs_max_vel
         reached_acc = abs_max_acc    
@@ -249,17 +254,20 @@ def equal_vel_case_planning (pos_diff, v, abs_max_vel, abs_max_acc, abs_max_jrk)
         t_max_vel = 0.0
         
         if(pos_diff >= min_pos_to_max_vel):
-            rospy.logdebug("\n >>> case b1: require const_vel_phase=zero_acc_phase [ /```\------\.../ ]" )
+            logger.debug("\n >>> case b1: require const_vel_phase=zero_acc_phase [ /```\------\.../ ]")
+            planning_stats.note_branch('b1')
             t_max_vel= (pos_diff - min_pos_to_max_vel )/ abs_max_vel
         else:
             min_pos_to_max_acc = calculate_min_pos_to_reach_max_acc(v, abs_max_vel, abs_max_acc, abs_max_jrk)
-            rospy.logdebug("case b2: min_pos_to_max_acc= {}, Dp= {} ".format(min_pos_to_max_acc, pos_diff) )
+            logger.debug("case b2: min_pos_to_max_acc= %s, Dp= %s ", min_pos_to_max_acc, pos_diff)
             if(pos_diff >= min_pos_to_max_acc):
-                rospy.logdebug( "\n >>> case b2a: calculate acc_time-reached_vel corresponds to pos_diff [ /````\\..../ ]" )
+                logger.debug("\n >>> case b2a: calculate acc_time-reached_vel corresponds to pos_diff [ /````\\..../ ]")
+                planning_stats.note_branch('b2a')
                 acc_time = calculate_const_acc_time(pos_diff, v, abs_max_vel, abs_max_acc, abs_max_jrk)
                 t_max_acc = acc_time
             else:
-                rospy.logdebug( "\n >>> case b2b: calculate acc corresponds to pos_diff [ /\\/ ]")
+                logger.debug("\n >>> case b2b: calculate acc corresponds to pos_diff [ /\\/ ]")
+                planning_stats.note_branch('b2b')
                 acc = calculate_reached_acc_in_case_no_const_acc_phase(pos_diff, v, abs_max_vel, abs_max_acc, abs_max_jrk)
                 t_max_jrk = acc/abs_max_jrk
                 t_max_acc = 0.0
@@ -269,6 +277,7 @@ def equal_vel_case_planning (pos_diff, v, abs_max_vel, abs_max_acc, abs_max_jrk)
 
 
 ### the main function to plan motion profile for a general_velocity-to-general_velocity segment
+@planning_stats.instrumented
 def traj_segment_planning(p_start, p_end, abs_v_start, abs_v_end, abs_max_vel, abs_max_acc, abs_max_jrk):
     '''
     this function selects a motion profile for a trajectory segment with a given start and end velocities/positions, 
@@ -277,7 +286,7 @@ def traj_segment_planning(p_start, p_end, abs_v_start, abs_v_end, abs_max_vel, a
     #calculate min_pos required to reach vf from v0   
     abs_min_pos_to_vf, acc_to_vf, t_jrk_to_vf, t_acc_to_vf = calculate_min_pos_reached_acc_jrk_time_acc_time_to_reach_final_vel(abs_v_start, abs_v_end, abs_max_vel, abs_max_acc, abs_max_jrk)
     if abs_min_pos_to_vf > abs(p_end-p_start) and  abs_min_pos_to_vf - abs(p_end-p_start) > 1e-5: # if abs_min_pos_to_vf> abs(p_end-p_start), then these values are not feasible
-        rospy.logdebug(">>> min required position difference to reach v_end from v_start= {} > abs(p_end-p_start)={} ".format(abs_min_pos_to_vf, abs(p_end-p_start)))
+        logger.debug(">>> min required position difference to reach v_end from v_start= %s > abs(p_end-p_start)=%s ", abs_min_pos_to_vf, abs(p_end-p_start))
         raise ValueError("non feasible case: violate min_pos_to_vf" )      
         return 0, 0, 0, 0, 0
     
@@ -292,10 +301,11 @@ def traj_segment_planning(p_start, p_end, abs_v_start, abs_v_end, abs_max_vel, a
             ## plan the rest of the motion using the equal start/end vel case
             t_jrk, t_acc, t_vel, reached_vel, reached_acc = equal_vel_case_planning ( abs(pos_diff), abs_v, abs_max_vel, abs_max_acc, abs_max_jrk)
         else:
+            planning_stats.note_branch('to_vf_only')
             t_jrk=0.0
             t_acc=0.0
             t_vel=0.0
     # return time for both: from v0_to_vf case and for equal_vel_case 
-    rospy.logdebug(">>> output of traj_segment_planning: t_jrk_to_vf, t_acc_to_vf, t_jrk, t_acc, t_vel: ")
-    rospy.logdebug("{},  {}, {},  {}, {}".format(t_jrk_to_vf, t_acc_to_vf, t_jrk, t_acc, t_vel) ) 
+    logger.debug(">>> output of traj_segment_planning: t_jrk_to_vf, t_acc_to_vf, t_jrk, t_acc, t_vel: ")
+    logger.debug("%s,  %s, %s,  %s, %s", t_jrk_to_vf, t_acc_to_vf, t_jrk, t_acc, t_vel)
     return t_jrk_to_vf, t_acc_to_vf, t_jrk, t_acc, t_vel
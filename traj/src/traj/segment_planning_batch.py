@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+"""
+vectorized counterpart of "segment_planning": the same low level planning as "traj_segment_planning", but for arrays of segments.
+all inputs are numpy arrays (or scalars) which are broadcast against each other; every branch of the scalar planner is
+evaluated for all segments and the right one is selected per segment using masks, so planning N segments costs a handful of
+numpy calls instead of N python calls.
+"""
+import numpy as np
+from . import cubic_eq_roots as rt
+
+
+def _three_phases_pos(v0, jm, tj, ta):
+    '''
+    position reached (starting from zero position/acceleration and velocity "v0") by the phases [jm, 0, -jm] with durations [tj, ta, tj]
+    '''
+    a1 =  jm*tj
+    v1 =  jm*tj*tj/2.0 + v0
+    v2 =                 a1*ta   + v1
+    p1 =  jm*tj*tj*tj/6.0 + v0*tj
+    p2 =                 a1*ta*ta/2.0  + v1*ta + p1
+    p3 = -jm*tj*tj*tj/6.0 + a1*tj*tj/2.0 + v2*tj + p2
+    return p3
+
+
+def _seven_phases_pos(v0, jm, tj, ta):
+    '''
+    position reached by the phases [jm, 0, -jm, 0, -jm, 0, jm] with durations [tj, ta, tj, 0, tj, ta, tj]:
+    accelerating from "v0" and then decelerating back to "v0" covers twice the distance of the acceleration part
+    '''
+    return 2.0*_three_phases_pos(v0, jm, tj, ta)
+
+
+def calculate_reached_acc_in_case_no_const_acc_phase_batch(Dp, v, vm, am, jm):
+    '''
+    vectorized "calculate_reached_acc_in_case_no_const_acc_phase": the acceleration reached to move "Dp" starting with velocity "v"
+    without a const_acc phase, zero for Dp == 0
+    '''
+    acc = rt.min_positive_root_cubic_eq_batch(2.0, 0.0, 4*v*jm, -jm**2*Dp)
+    return np.where(Dp > 0.0, acc, 0.0)
+
+
+def calculate_const_acc_time_batch(Dp, v, vm, am, jm):
+    '''
+    vectorized "calculate_const_acc_time": the acceleration_phase time "ta" required to move "Dp" starting with velocity "v"
+    '''
+    a = 0.0
+    b = am*jm**2
+    c = 3*am**2*jm + 2*v*jm**2
+    d = 2*am**3 + 4*v*am*jm - jm**2*Dp
+    return rt.min_positive_root_cubic_eq_batch(a, b, c, d)
+
+
+def calculate_min_pos_reached_acc_jrk_time_acc_time_to_reach_final_vel_batch(v0, vf, vm, am, jm):
+    '''
+    vectorized "calculate_min_pos_reached_acc_jrk_time_acc_time_to_reach_final_vel":
+    returns arrays of min_pos_to_vf, acc_to_vf, tj, ta to reach the final Velocity "vf" starting with initial_vel "v0"
+    '''
+    v0, vf, vm, am, jm = np.broadcast_arrays(*[np.asarray(x, dtype=np.float64) for x in (v0, vf, vm, am, jm)])
+    jm_signed = np.copysign(jm, vf - v0)
+    # case 1: max acc is not reached
+    tj_1 = np.sqrt(jm*np.abs(vf-v0))/jm
+    acc_1 = jm_signed*tj_1
+    # case 2: max acc is reached, there is a const_acc phase
+    tj_2 = am/jm
+    ta_2 = (np.abs(vf-v0) - am**2/jm)/am
+    acc_2 = jm_signed*tj_2
+
+    max_acc_reached = np.abs(acc_1) > am
+    tj = np.where(max_acc_reached, tj_2, tj_1)
+    ta = np.where(max_acc_reached, ta_2, 0.0)
+    acc_to_vf = np.where(max_acc_reached, acc_2, acc_1)
+    min_pos_to_vf = _three_phases_pos(v0, jm_signed, tj, ta)
+
+    same_vel = vf == v0
+    return (np.where(same_vel, 0.0, min_pos_to_vf), np.where(same_vel, 0.0, acc_to_vf),
+            np.where(same_vel, 0.0, tj), np.where(same_vel, 0.0, ta))
+
+
+def equal_vel_case_planning_batch(pos_diff, v, abs_max_vel, abs_max_acc, abs_max_jrk):
+    '''
+    vectorized "equal_vel_case_planning": returns arrays of t_jrk, t_acc, t_vel for segments with equal start/end velocities "v"
+    '''
+    vm = abs_max_vel
+    am = abs_max_acc
+    jm = abs_max_jrk
+    # case a: maxAcc won't be reached
+    reached_acc_to_max_vel = np.sqrt(jm*(vm-v))
+    t_jrk_a = reached_acc_to_max_vel/jm
+    min_pos_to_max_vel_a = _seven_phases_pos(v, jm, t_jrk_a, 0.0)
+    case_a = reached_acc_to_max_vel <= am
+    # case b: maxAcc will be reached
+    t_jrk_b = am/jm
+    t_acc_b = (vm-v-(am**2/jm))/am
+    min_pos_to_max_vel_b = _seven_phases_pos(v, jm, t_jrk_b, t_acc_b)
+    min_pos_to_max_acc = _seven_phases_pos(v, jm, t_jrk_b, 0.0)
+
+    # case a1 and b1: const_vel phase is required
+    min_pos_to_max_vel = np.where(case_a, min_pos_to_max_vel_a, min_pos_to_max_vel_b)
+    case_a1 = case_a & (pos_diff > min_pos_to_max_vel)
+    case_b1 = ~case_a & (pos_diff >= min_pos_to_max_vel)
+    t_vel = np.where(case_a1 | case_b1, (pos_diff - min_pos_to_max_vel)/vm, 0.0)
+    # case b2a: calculate acc_time corresponds to pos_diff
+    case_b2a = ~case_a & ~case_b1 & (pos_diff >= min_pos_to_max_acc)
+    # case a2 and b2b: calculate acc corresponds to pos_diff
+    case_no_const_acc = (case_a & ~case_a1) | (~case_a & ~case_b1 & ~case_b2a)
+
+    t_jrk = np.where(case_a, t_jrk_a, t_jrk_b)
+    t_jrk = np.where(case_no_const_acc, calculate_reached_acc_in_case_no_const_acc_phase_batch(pos_diff, v, vm, am, jm)/jm, t_jrk)
+    t_acc = np.where(case_b1, t_acc_b, 0.0)
+    t_acc = np.where(case_b2a, calculate_const_acc_time_batch(pos_diff, v, vm, am, jm), t_acc)
+    return t_jrk, t_acc, t_vel
+
+
+def traj_segment_planning_batch(p_start, p_end, abs_v_start, abs_v_end, abs_max_vel, abs_max_acc, abs_max_jrk):
+    '''
+    vectorized "traj_segment_planning": returns arrays of t_jrk_to_vf, t_acc_to_vf, t_jrk, t_acc, t_vel, one entry per segment.
+    unlike the scalar version it does not raise for non feasible segments (those that violate min_pos_to_vf),
+    all the times of these segments are set to NaN instead
+    '''
+    arrays = np.broadcast_arrays(*[np.asarray(x, dtype=np.float64) for x in
+                                   (p_start, p_end, abs_v_start, abs_v_end, abs_max_vel, abs_max_acc, abs_max_jrk)])
+    p_start, p_end, abs_v_start, abs_v_end, abs_max_vel, abs_max_acc, abs_max_jrk = arrays
+    # all branches are evaluated for all segments, branches that do not apply may produce nan/inf which are masked out
+    with np.errstate(divide='ignore', invalid='ignore'):
+        abs_min_pos_to_vf, acc_to_vf, t_jrk_to_vf, t_acc_to_vf = calculate_min_pos_reached_acc_jrk_time_acc_time_to_reach_final_vel_batch(
+            abs_v_start, abs_v_end, abs_max_vel, abs_max_acc, abs_max_jrk)
+        abs_pos_diff = np.abs(p_end - p_start)
+        non_feasible = (abs_min_pos_to_vf > abs_pos_diff) & (abs_min_pos_to_vf - abs_pos_diff > 1e-5)
+
+        abs_v = np.where(abs_v_end > abs_v_start, abs_v_end, abs_v_start)
+        pos_diff = p_end - p_start - np.copysign(abs_min_pos_to_vf, p_end - p_start)
+        t_jrk, t_acc, t_vel = equal_vel_case_planning_batch(np.abs(pos_diff), abs_v, abs_max_vel, abs_max_acc, abs_max_jrk)
+        rest_of_motion = np.abs(abs_pos_diff - abs_min_pos_to_vf) > 1e-7
+        t_jrk = np.where(rest_of_motion, t_jrk, 0.0)
+        t_acc = np.where(rest_of_motion, t_acc, 0.0)
+        t_vel = np.where(rest_of_motion, t_vel, 0.0)
+
+    return tuple(np.where(non_feasible, np.nan, t) for t in (t_jrk_to_vf, t_acc_to_vf, t_jrk, t_acc, t_vel))
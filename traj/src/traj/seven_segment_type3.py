@@ -1,10 +1,7 @@
-from sympy import integrate
-from sympy.core.numbers import Float
+from .piecewise_function import piecewise_constant
 
-from .piecewise_function import PiecewiseFunction
 
-
-def fit(p_start, p_end, v_max, a_max, j_max, independent_variable):
+def fit(p_start, p_end, v_max, a_max, j_max, independent_variable, numeric=False):
     """
     Find the optimal seven segment trajectory for zero start and end velocities, and the given
     start and end positions.
@@ -14,6 +11,9 @@ def fit(p_start, p_end, v_max, a_max, j_max, independent_variable):
         Herrera-Aguilar, Ignacio, and Daniel Sidobre. "Soft motion trajectory planning and
         control for service manipulator robot." Workshop on Physical Human-Robot Interaction in
         Anthropic Domains at IROS. 2006.
+
+    If numeric is True, the jerk is returned as a PiecewisePolynomial instead of a sympy backed
+    PiecewiseFunction.
     """
     assert (a_max > 0.0)
     assert (j_max > 0.0)
@@ -60,19 +60,9 @@ def fit(p_start, p_end, v_max, a_max, j_max, independent_variable):
 
     segment_jerks_and_durations = [(j_max, T_j), (0.0, T_a), (-j_max, T_j), (0.0, T_v), (-j_max,
                                                                                          T_j), (0.0, T_a), (j_max, T_j)]
-    segments = []
-    p0 = p_start
-    v0 = 0.0
-    a0 = 0.0
     times = [0.0]
-    jerk_functions = []
-    acceleration_functions = []
-    velocity_functions = []
-    position_functions = []
-    # Integrate jerk starting from the start of the trajectory and going all the way through the end.
     for j0, T in segment_jerks_and_durations:
         times.append(times[-1] + T)
-        jerk_functions.append(Float(j0))
 
-    jerk = PiecewiseFunction(times, jerk_functions, independent_variable)
+    jerk = piecewise_constant(times, [j0 for j0, T in segment_jerks_and_durations], independent_variable, numeric)
     return jerk
@@ -1,7 +1,6 @@
 import numpy as np
-from sympy.core.numbers import Float
 
-from .piecewise_function import PiecewiseFunction
+from .piecewise_function import piecewise_constant
 
 # Turns on extra velidation of generated trajectories. The validation is quite expensive, so you probably want it off
 # most of the time. Enabling it while debugging catches problems earlier, making it easier to find the bug.
@@ -88,7 +87,7 @@ def validate_acceleration_segments(independent_variable_start, v_start, v_end, a
     return True
 
 
-def fit_acceleration_triangle(v_start, v_end, a_max, j_max, independent_variable):
+def fit_acceleration_triangle(v_start, v_end, a_max, j_max, independent_variable, numeric=False):
     """
     Positive acceleration triangle: v_end is greater than v_start, and the acceleration
     at the start and end is the same.
@@ -96,22 +95,22 @@ def fit_acceleration_triangle(v_start, v_end, a_max, j_max, independent_variable
     assert (a_max >= 0.0)
     assert (j_max >= 0.0)
     if np.isclose(v_start, v_end):
-        return PiecewiseFunction([0.0, 0.0], [Float(0.0)], independent_variable)
+        return piecewise_constant([0.0, 0.0], [0.0], independent_variable, numeric)
 
     segment_duration = np.sqrt(np.abs((v_end - v_start) / j_max))
     j = np.sign(v_end - v_start) * j_max
-    piecewise_jerk_function = PiecewiseFunction([0.0, segment_duration, 2.0 * segment_duration], [Float(j), Float(-j)],
-                                                independent_variable)
+    piecewise_jerk_function = piecewise_constant([0.0, segment_duration, 2.0 * segment_duration], [j, -j],
+                                                 independent_variable, numeric)
     if VALIDATION_ENABLED:
         validate_acceleration_segments(0.0, v_start, v_end, a_max, j_max, piecewise_jerk_function)
     return piecewise_jerk_function
 
 
-def fit_acceleration_trapezoid(v_start, v_end, a_max, j_max, independent_variable):
+def fit_acceleration_trapezoid(v_start, v_end, a_max, j_max, independent_variable, numeric=False):
     assert (a_max >= 0.0)
     assert (j_max >= 0.0)
     if np.isclose(v_start, v_end):
-        return PiecewiseFunction([0.0, 0.0], [Float(0.0)], independent_variable)
+        return piecewise_constant([0.0, 0.0], [0.0], independent_variable, numeric)
 
     j = np.sign(v_end - v_start) * j_max
     a = np.sign(v_end - v_start) * a_max
@@ -119,16 +118,16 @@ def fit_acceleration_trapezoid(v_start, v_end, a_max, j_max, independent_variabl
     ramp_duration = a_max / j_max
     ramp_velocity_change = 0.5 * a * ramp_duration
     segment_2_duration = np.abs(v_end - v_start - 2.0 * ramp_velocity_change) / a_max
-    piecewise_jerk_function = PiecewiseFunction(
-        np.cumsum([0.0, ramp_duration, segment_2_duration, ramp_duration]), [Float(j), Float(0.0), Float(-j)],
-        independent_variable)
+    piecewise_jerk_function = piecewise_constant(
+        np.cumsum([0.0, ramp_duration, segment_2_duration, ramp_duration]), [j, 0.0, -j],
+        independent_variable, numeric)
 
     if VALIDATION_ENABLED:
         validate_acceleration_segments(0.0, v_start, v_end, a_max, j_max, piecewise_jerk_function)
     return piecewise_jerk_function
 
 
-def fit_acceleration_segments(v_start, v_end, a_max, j_max, independent_variable):
+def fit_acceleration_segments(v_start, v_end, a_max, j_max, independent_variable, numeric=False):
     """
     3 segment trajectory segment with positive max jerk, 0 jerk, and negative max jerk segments. The
     middle section may have zero duration if we can't reach max accleration. v_end is greater than v_start,
@@ -136,17 +135,20 @@ def fit_acceleration_segments(v_start, v_end, a_max, j_max, independent_variable
     """
     min_velocity_change_if_reach_a_max = j_max * (a_max / j_max) ** 2.0
     if np.abs(min_velocity_change_if_reach_a_max) > np.abs(v_end - v_start):
-        return fit_acceleration_triangle(v_start, v_end, a_max, j_max, independent_variable)
+        return fit_acceleration_triangle(v_start, v_end, a_max, j_max, independent_variable, numeric)
     else:
-        return fit_acceleration_trapezoid(v_start, v_end, a_max, j_max, independent_variable)
+        return fit_acceleration_trapezoid(v_start, v_end, a_max, j_max, independent_variable, numeric)
 
 
-def fit_given_cruising_velocity(p_start, p_end, v_start, v_end, v_cruise, a_max, j_max, independent_variable):
-    jerk_for_first_three_segments = fit_acceleration_segments(v_start, v_cruise, a_max, j_max, independent_variable)
+def fit_given_cruising_velocity(p_start, p_end, v_start, v_end, v_cruise, a_max, j_max, independent_variable,
+                                numeric=False):
+    jerk_for_first_three_segments = fit_acceleration_segments(v_start, v_cruise, a_max, j_max, independent_variable,
+                                                              numeric)
     if jerk_for_first_three_segments is None:
         return None
 
-    jerk_for_last_three_segments = fit_acceleration_segments(v_cruise, v_end, a_max, j_max, independent_variable)
+    jerk_for_last_three_segments = fit_acceleration_segments(v_cruise, v_end, a_max, j_max, independent_variable,
+                                                             numeric)
     if jerk_for_last_three_segments is None:
         return None
 
@@ -166,6 +168,10 @@ def fit_given_cruising_velocity(p_start, p_end, v_start, v_end, v_cruise, a_max,
         position_for_last_three_segments.boundaries[-1]) - position_for_last_three_segments(
         position_for_last_three_segments.boundaries[0])
 
+    # Evaluating a piecewise function gives an array with one value per dof; we only have one dof here.
+    segments_123_distance_traveled = float(segments_123_distance_traveled[0])
+    segments_567_distance_traveled = float(segments_567_distance_traveled[0])
+
     segment_4_distance = (p_end - p_start - segments_123_distance_traveled - segments_567_distance_traveled)
     total_distance = segments_123_distance_traveled + segment_4_distance + segments_567_distance_traveled
     if np.abs(total_distance - (p_end - p_start)) > 1e-8:
@@ -174,7 +180,7 @@ def fit_given_cruising_velocity(p_start, p_end, v_start, v_end, v_cruise, a_max,
     if segment_4_duration < 0.0:
         return None
 
-    jerk_for_segment_4 = PiecewiseFunction([0.0, segment_4_duration], [Float(0.0)], independent_variable)
+    jerk_for_segment_4 = piecewise_constant([0.0, segment_4_duration], [0.0], independent_variable, numeric)
 
     jerk = jerk_for_first_three_segments
     jerk.extend(jerk_for_segment_4)
@@ -187,11 +193,18 @@ def fit_given_cruising_velocity(p_start, p_end, v_start, v_end, v_cruise, a_max,
 
 
 def fit(p_start, p_end, v_start, v_end, v_max, a_max, j_max, independent_variable,
-        num_velocities_to_try=16):
+        num_velocities_to_try=16, numeric=False):
+    """
+    Find the fastest seven segment trajectory by trying a range of cruising velocities.
+
+    If numeric is True, the jerk is returned as a PiecewisePolynomial instead of a sympy backed
+    PiecewiseFunction.
+    """
     best_jerk = None
     best_end_time = np.inf
     for v_cruise in np.linspace(-v_max, v_max, num_velocities_to_try):
-        jerk = fit_given_cruising_velocity(p_start, p_end, v_start, v_end, v_cruise, a_max, j_max, independent_variable)
+        jerk = fit_given_cruising_velocity(p_start, p_end, v_start, v_end, v_cruise, a_max, j_max, independent_variable,
+                                           numeric)
         if jerk is None:
             continue
 
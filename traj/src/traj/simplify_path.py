@@ -0,0 +1,71 @@
+"""
+Removal of redundant waypoints from joint space paths before they are parameterized.
+
+Paths from dense IK sampling contain many waypoints which are (nearly) on the straight line between
+their neighbours, or (nearly) repeat the previous waypoint. Every waypoint becomes a segment, and
+every segment costs planning time and usually a slowdown at its corner, so these waypoints are
+removed with the Ramer-Douglas-Peucker algorithm: starting from the first and last waypoints, the
+waypoint furthest from the straight segment between two kept waypoints is kept if it is further
+than the tolerance, and the two halves are simplified the same way.
+
+Instead of recursing, all spans between kept waypoints are split at once, so each pass over the
+path is a handful of numpy operations and the number of passes is the depth of the recursion.
+"""
+import numpy as np
+
+
+def _segment_distances(points, starts, ends):
+    """
+    Distance from each point to the straight segment between the matching start and end points.
+    """
+    chords = ends - starts
+    chord_lengths_squared = np.sum(chords * chords, axis=1)
+    offsets = points - starts
+    with np.errstate(divide='ignore', invalid='ignore'):
+        fractions = np.where(chord_lengths_squared > 0.0,
+                             np.sum(offsets * chords, axis=1) / chord_lengths_squared, 0.0)
+    # Distances are to the segment rather than to the line, so that waypoints where the path turns
+    # back on itself are kept.
+    fractions = np.clip(fractions, 0.0, 1.0)
+    return np.linalg.norm(offsets - fractions[:, np.newaxis] * chords, axis=1)
+
+
+def simplify_path(path, tolerance):
+    """
+    Remove the waypoints of the (waypoints x dofs) path which are within tolerance of the path
+    through the remaining waypoints. The tolerance is a distance in joint space, or one positive
+    value per joint to measure the distance with each joint scaled by its tolerance.
+
+    Returns the simplified path and the indices of its waypoints in the original path, i.e.
+    simplified_path == path[indices]. The first and last waypoints are always kept.
+    """
+    path = np.asarray(path, dtype=np.float64)
+    tolerance = np.asarray(tolerance, dtype=np.float64)
+    scaled_path = path
+    if tolerance.ndim > 0:
+        scaled_path = path / tolerance
+        tolerance = 1.0
+    n_waypoints = len(path)
+    keep = np.zeros(n_waypoints, dtype=bool)
+    keep[[0, -1]] = True
+    # Waypoints in spans which may still be split.
+    open_spans = np.ones(n_waypoints, dtype=bool)
+    while True:
+        kept_indices = np.flatnonzero(keep)
+        candidates = np.flatnonzero(open_spans & ~keep)
+        if len(candidates) == 0:
+            break
+        # Candidates are sorted, so the candidates of each span are next to each other.
+        spans = np.searchsorted(kept_indices, candidates) - 1
+        distances = _segment_distances(scaled_path[candidates], scaled_path[kept_indices[spans]],
+                                       scaled_path[kept_indices[spans + 1]])
+        span_starts = np.flatnonzero(np.concatenate(([True], spans[1:] != spans[:-1])))
+        split = np.maximum.reduceat(distances, span_starts) > tolerance
+        # The first waypoint of each span after sorting by decreasing distance is the furthest one.
+        by_distance = np.lexsort((-distances, spans))
+        keep[candidates[by_distance[span_starts[split]]]] = True
+        # Spans which aren't split are final.
+        span_sizes = np.diff(np.concatenate((span_starts, [len(candidates)])))
+        open_spans[candidates[~np.repeat(split, span_sizes)]] = False
+    indices = np.flatnonzero(keep)
+    return path[indices], indices
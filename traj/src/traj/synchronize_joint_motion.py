@@ -2,7 +2,9 @@
 import math
 import numpy as np
 import traj 
-import rospy
+import logging
+
+logger = logging.getLogger(__name__)
 
 
 def synchronize_joint_motion(t_syn, pos_diff, v_start, v_end, abs_max_pos, abs_max_vel, abs_max_acc, abs_max_jrk):
@@ -40,7 +42,7 @@ def synchronize_joint_motion(t_syn, pos_diff, v_start, v_end, abs_max_pos, abs_m
 
 	# choose a motion profile 
 	case = 1
-	rospy.logdebug(">> synchronize_jt_7phs case 1")
+	logger.debug(">> synchronize_jt_7phs case 1")
 	v = max(abs_v_start, abs_v_end)
 	jk =  -(2*tav*v - pd_eq_vel + 4*tjv*v + tvv*v)/(tav**2*tjv + 3*tav*tjv**2 + tvv*tav*tjv + 2*tjv**3 + tvv*tjv**2)
 	a1 =  jk*tjv 
@@ -48,10 +50,10 @@ def synchronize_joint_motion(t_syn, pos_diff, v_start, v_end, abs_max_pos, abs_m
 	v1 =  jk*tjv*tjv/2 +             + v
 	v2 =                    a1*tav   + v1
 	v3 = -jk*tjv*tjv/2 +    a2*tjv   + v2
-	rospy.logdebug(">> jk, a1, v3:  {}, {}, {}".format( jk, a1, v3))
+	logger.debug(">> jk, a1, v3:  %s, %s, %s", jk, a1, v3)
 
 	if abs(jk) > abs_max_jrk or v3 < 0.0 or v3 > abs_max_vel or abs(a1)> abs_max_acc:
-		rospy.logdebug( ">> synchronize_jt_7phs case 2" )
+		logger.debug(">> synchronize_jt_7phs case 2")
 		case = 2
 		v = min(abs_v_start, abs_v_end)
 		jk =  -(2*tav*v - pd_eq_vel + 4*tjv*v + tvv*v)/(tav**2*tjv + 3*tav*tjv**2 + tvv*tav*tjv + 2*tjv**3 + tvv*tjv**2)
@@ -60,7 +62,7 @@ def synchronize_joint_motion(t_syn, pos_diff, v_start, v_end, abs_max_pos, abs_m
 		v1 =  jk*tjv*tjv/2 +             + v
 		v2 =                    a1*tav   + v1
 		v3 = -jk*tjv*tjv/2 +    a2*tjv   + v2
-		rospy.logdebug(">>  jk, a1, v3: {}, {}, {}".format( jk, a1, v3))
+		logger.debug(">>  jk, a1, v3: %s, %s, %s", jk, a1, v3)
 		
 		if abs(jk) > abs_max_jrk or v3 < 0.0 or v3 > abs_max_vel or abs(a1)> abs_max_acc:
 			raise ValueError("synchronize_jt_7phs: motion is not feasible") 
@@ -110,38 +112,36 @@ def segment_synchronization(pos_start, pos_end, vel_start, vel_end,
 	section V,  synchronization steps 1,2,3
 	[1] https://www-cs.stanford.edu/groups/manips/publications/pdfs/Kroeger_2010_TRO.pdf
 	'''
-	rospy.logdebug(">> pos_start:\n{}".format(pos_start))
-	rospy.logdebug(">> pos_end:\n{}".format(pos_end))
-	rospy.logdebug(">> vel_start:\n{}".format(vel_start))
-	rospy.logdebug(">> vel_end:\n{}".format(vel_end))
+	logger.debug(">> pos_start:\n%s", pos_start)
+	logger.debug(">> pos_end:\n%s", pos_end)
+	logger.debug(">> vel_start:\n%s", vel_start)
+	logger.debug(">> vel_end:\n%s", vel_end)
 	pos_diff = [pf-pi for pi, pf in zip(pos_start, pos_end)]
 	motion_dir = [] 
 	n_jts = len(pos_diff)
 	for jt in range(n_jts):
 		motion_dir.append(traj.motion_direction(vel_start[jt],  vel_end[jt], pos_diff[jt]))
 
-	# step 1: find the minimum time motion for each joints 
-	min_motion_time  = [ ]
-	for jt in range(n_jts):
-		# min time for each segment: phases times
-		tj_2vf, ta_2vf, t_jrk, t_acc, t_vel = traj.traj_segment_planning(0.0, abs(pos_diff[jt]), abs(vel_start[jt]), abs(vel_end[jt]),
-																		 abs_max_vel[jt], abs_max_acc[jt], abs_max_jrk[jt])
-		min_time = 2*tj_2vf + ta_2vf +  4*t_jrk + 2*t_acc + t_vel
-		min_motion_time.append(min_time) 
+	# step 1: find the minimum time motion for each joints, all joints are planned at once 
+	tj_2vf, ta_2vf, t_jrk, t_acc, t_vel = traj.traj_segment_planning_batch(0.0, np.abs(pos_diff), np.abs(vel_start), np.abs(vel_end),
+																		   abs_max_vel, abs_max_acc, abs_max_jrk)
+	if np.isnan(tj_2vf).any():
+		raise ValueError("non feasible case: violate min_pos_to_vf" )
+	min_motion_time = list(2*tj_2vf + ta_2vf +  4*t_jrk + 2*t_acc + t_vel)
 
 	# step 2: find the joint that has the maximum time motion (reference joint)
 	ref_jt = min_motion_time.index(max(min_motion_time))
 	min_sync_time  = max(min_motion_time) 
 	syn_t = min_sync_time
-	rospy.logdebug(">> syn_t : {} ".format(syn_t))
-	rospy.logdebug(">> ref_jt: {} ".format(ref_jt))
-	rospy.logdebug(">> min_T : {} ".format(min_motion_time))
+	logger.debug(">> syn_t : %s ", syn_t)
+	logger.debug(">> ref_jt: %s ", ref_jt)
+	logger.debug(">> min_T : %s ", min_motion_time)
 
 	# step 3: calculate new jrk_sgn_dur
 	phase_dur_jt = []
 	phase_jrk_jt = []
 	for jt in range(n_jts):
-		rospy.logdebug("\n\n>> jt:{}, PD: {}, v_start:{}, v_end:{}".format(jt, pos_diff[jt], vel_start[jt], vel_end[jt]))
+		logger.debug("\n\n>> jt:%s, PD: %s, v_start:%s, v_end:%s", jt, pos_diff[jt], vel_start[jt], vel_end[jt])
 		p_diff = abs(pos_diff[jt])   
 		v_start = abs(vel_start[jt])
 		v_end = abs(vel_end[jt])
@@ -155,5 +155,5 @@ def segment_synchronization(pos_start, pos_end, vel_start, vel_end,
 		jrk = [motion_dir[jt]*jsd[0] for jsd in jrk_sign_dur]
 		phase_dur_jt.append(dur)
 		phase_jrk_jt.append(jrk)
-		rospy.logdebug(">> dur:{}".format(sum(dur)))
+		logger.debug(">> dur:%s", sum(dur))
 	return min_sync_time, phase_dur_jt, phase_jrk_jt
@@ -9,12 +9,16 @@ fit_traj_segment does high level planning for the segment:
 5. it generates pos, vel, acc, jrk vectors using the abovemention times: t_jr, t_acc, t_vel
 6. it returns vectors of pos, vel, acc, jrk  
 '''
+import numpy as np
 from sympy import integrate, Symbol
 from sympy.core.numbers import Float
-from .piecewise_function import PiecewiseFunction
+from .piecewise_function import PiecewiseFunction, PiecewisePolynomial
 import traj
 import math
-import rospy
+import logging
+from . import planning_stats
+
+logger = logging.getLogger(__name__)
 
 # Function to assign jerk sign for each phase based on the motion (+ve/-ve): it is determined by start/end vel, and pos_diff 
 def assign_jerk_sign_According_to_motion_type(p_start, p_end, v_start, v_end, p_max, v_max, a_max, j_max):
@@ -29,7 +33,7 @@ def assign_jerk_sign_According_to_motion_type(p_start, p_end, v_start, v_end, p_
          
     else:# v_end != v_start:
         if v_start*v_end < 0: #won't be need it in complex motion case 
-            rospy.logdebug("this a complex motion, stop point will be calculated to join the +ve/-ve motion part " )          
+            logger.debug("this a complex motion, stop point will be calculated to join the +ve/-ve motion part ")
         elif abs_v_start < abs_v_end : #acc motion
             if(v_start >= 0 and v_end >= 0): # positive motion
                 j_max_to_vf = j_max #math.copysign(j_max, v_end)
@@ -47,6 +51,7 @@ def assign_jerk_sign_According_to_motion_type(p_start, p_end, v_start, v_end, p_
     return j_max_to_vf, j_max
 
 
+@planning_stats.instrumented
 def calculate_jerk_sign_and_duration(p_start, p_end, v_start, v_end, p_max, v_max, a_max, j_max, independent_variable=Symbol('t')):
     '''
     this function calculates the jerk_value && the duration associated with each phase of the segment
@@ -60,25 +65,25 @@ def calculate_jerk_sign_and_duration(p_start, p_end, v_start, v_end, p_max, v_ma
     # for p_start: it depends on direction of v_start, as we can not put p_start as p_max if v_start is in +ve direction 
     if(abs(v_start) > v_max):       
         v_start = math.copysign(v_max, v_start)
-        rospy.logdebug("\nWarning: \n>>> these values are not feasible:  v_start should be within the limit v_max !")
-        rospy.logdebug(">>> v_start: {}, v_max: {}".format(v_start, v_max) )
+        logger.debug("\nWarning: \n>>> these values are not feasible:  v_start should be within the limit v_max !")
+        logger.debug(">>> v_start: %s, v_max: %s", v_start, v_max)
         #if abs(v_start) - v_max >1e-15:
         raise ValueError("non feasible case: violate v_max, v_start: {}, v_max: {}".format(v_start, v_max) )
 
     if(abs(v_end) > v_max):
        v_end = math.copysign(v_max, v_end) 
-       rospy.logdebug("\nWarning: \n>>> these values are not feasible,   v_end should be within the limit v_max !")
-       rospy.logdebug(">>> v_end: {}, v_max: {}".format(v_end, v_max) )
+       logger.debug("\nWarning: \n>>> these values are not feasible,   v_end should be within the limit v_max !")
+       logger.debug(">>> v_end: %s, v_max: %s", v_end, v_max)
        raise ValueError("non feasible case: violate v_max, v_end: {}, v_max: {}".format(v_end, v_max) )
  
     if(abs(p_end) > p_max):
-        rospy.logdebug("\nWarning: \n>>> these values are not feasible,   p_end should be within the limit p_max !")
+        logger.debug("\nWarning: \n>>> these values are not feasible,   p_end should be within the limit p_max !")
         p_end = math.copysign(p_max, p_end)
         
     if(abs(p_start) > p_max):
         p_start = math.copysign(p_max, p_start)
         if (p_start*v_start>0.0) or (v_start==0 and p_start*v_end>0.0): #direction of motion 
-            rospy.debug("\nWarning: \n>>> these values are not feasible,  p_start = p_max, and motion in the direction of v_start will violate p_max!")
+            logger.debug("\nWarning: \n>>> these values are not feasible,  p_start = p_max, and motion in the direction of v_start will violate p_max!")
             raise ValueError("non feasible case: violate p_max" ) 
             
     # reject unfeasible/iillogical cases 
@@ -104,7 +109,8 @@ def calculate_jerk_sign_and_duration(p_start, p_end, v_start, v_end, p_max, v_ma
             if v_start < 0.0 and v_end > 0.0: # from negative to positive 
                 if abs(p_start+minPos_to_zero) > p_max or abs(p_start+minPos_to_zero+minPos_to_vf) > p_max or  abs(p_start+minPos_to_zero+minPos_to_vf+pos_dominant) > p_max:
                     raise ValueError("non feasible case: violate p_max") 
-                rospy.logdebug("\n\n>>>positive dominant case: negative to positive: {}, {}, {}, {}".format(p_start, p_end, v_start, v_end) )
+                logger.debug("\n\n>>>positive dominant case: negative to positive: %s, %s, %s, %s", p_start, p_end, v_start, v_end)
+                planning_stats.note_branch('complex_positive_dominant_neg_to_pos')
                 t_jrk_not_used, t_acc_not_used, t_jrk_dominant, t_acc_dominant, t_vel_dominant = traj.traj_segment_planning(p_start, p_end - minPos_to_zero - minPos_to_vf,       abs_v_end,      abs_v_end,      v_max, a_max, j_max) 
                 segment_jerks_and_durations = [( j_max, t_jrk_to_zero),  (0.0, t_acc_to_zero),  (-j_max, t_jrk_to_zero ),
                                                ( j_max, t_jrk_to_vf),    (0.0, t_acc_to_vf),    (-j_max, t_jrk_to_vf ),
@@ -112,7 +118,8 @@ def calculate_jerk_sign_and_duration(p_start, p_end, v_start, v_end, p_max, v_ma
             elif v_start > 0.0 and v_end < 0.0: #from positive to negative
                 if abs(p_start+pos_dominant) > p_max or abs(p_start+pos_dominant+minPos_to_zero) > p_max or  abs(p_start+pos_dominant+minPos_to_zero+minPos_to_vf) > p_max:
                     raise ValueError("non feasible case: violate p_max")                 
-                rospy.logdebug("\n\n>>>positive dominant case: positive to negative: {}, {}, {}, {}".format(p_start, p_end, v_start, v_end))
+                logger.debug("\n\n>>>positive dominant case: positive to negative: %s, %s, %s, %s", p_start, p_end, v_start, v_end)
+                planning_stats.note_branch('complex_positive_dominant_pos_to_neg')
                 t_jrk_not_used, t_acc_not_used, t_jrk_dominant, t_acc_dominant, t_vel_dominant = traj.traj_segment_planning(p_start, p_end-minPos_to_zero-minPos_to_vf, abs_v_start, abs_v_start, v_max, a_max, j_max) 
                 segment_jerks_and_durations = [( j_max, t_jrk_dominant), (0.0, t_acc_dominant), (-j_max, t_jrk_dominant),  (0, t_vel_dominant), (-j_max, t_jrk_dominant), (0.0, t_acc_dominant), (j_max, t_jrk_dominant),
                                                (-j_max, t_jrk_to_zero),  (0.0, t_acc_to_zero),  ( j_max, t_jrk_to_zero ),
@@ -125,7 +132,8 @@ def calculate_jerk_sign_and_duration(p_start, p_end, v_start, v_end, p_max, v_ma
             if v_start < 0.0 and v_end > 0.0: # from negative to positive
                 if abs(p_start+pos_dominant) > p_max or abs(p_start+pos_dominant+minPos_to_zero) > p_max or  abs(p_start+pos_dominant+minPos_to_zero+minPos_to_vf) > p_max:
                     raise ValueError("non feasible case: violate p_max")                 
-                rospy.logdebug("\n\n>>>negative dominant case: negative to positive: {}, {}, {}, {}".format(p_start, p_end, v_start, v_end))
+                logger.debug("\n\n>>>negative dominant case: negative to positive: %s, %s, %s, %s", p_start, p_end, v_start, v_end)
+                planning_stats.note_branch('complex_negative_dominant_neg_to_pos')
                 t_jrk_not_used, t_acc_not_used, t_jrk_dominant, t_acc_dominant, t_vel_dominant = traj.traj_segment_planning(p_start, p_end-minPos_to_zero-minPos_to_vf, abs_v_start, abs_v_start, v_max, a_max, j_max)                                          
                 segment_jerks_and_durations = [(-j_max, t_jrk_dominant), (0.0, t_acc_dominant), ( j_max, t_jrk_dominant),  (0, t_vel_dominant),(j_max, t_jrk_dominant), (0.0, t_acc_dominant), (-j_max, t_jrk_dominant),
                                                ( j_max, t_jrk_to_zero),  (0.0, t_acc_to_zero),  (-j_max, t_jrk_to_zero ),
@@ -133,7 +141,8 @@ def calculate_jerk_sign_and_duration(p_start, p_end, v_start, v_end, p_max, v_ma
             elif v_start > 0.0 and v_end < 0.0: #from positive to negative
                 if abs(p_start+minPos_to_zero) > p_max or abs(p_start+minPos_to_zero+minPos_to_vf) > p_max or  abs(p_start+minPos_to_zero+minPos_to_vf+pos_dominant) > p_max:
                     raise ValueError("non feasible case: violate p_max")       
-                rospy.logdebug("\n\n>>>negative dominant case: positive to negative: {}, {}, {}, {}".format(p_start, p_end, v_start, v_end)  )         
+                logger.debug("\n\n>>>negative dominant case: positive to negative: %s, %s, %s, %s", p_start, p_end, v_start, v_end)
+                planning_stats.note_branch('complex_negative_dominant_pos_to_neg')
                 t_jrk_not_used, t_acc_not_used, t_jrk_dominant, t_acc_dominant, t_vel_dominant = traj.traj_segment_planning(p_start+ minPos_to_zero + minPos_to_vf, p_end , abs_v_end, abs_v_end,  v_max, a_max, j_max)
                 segment_jerks_and_durations = [(-j_max, t_jrk_to_zero),  (0.0, t_acc_to_zero),  ( j_max, t_jrk_to_zero ),
                                                (-j_max, t_jrk_to_vf),    (0.0, t_acc_to_vf),    ( j_max, t_jrk_to_vf ),
@@ -146,21 +155,23 @@ def calculate_jerk_sign_and_duration(p_start, p_end, v_start, v_end, p_max, v_ma
         minPos_v02vf = minPos_to_zero + minPos_to_vf
         if v_start < 0 and v_end > 0: #from -ve to +ve
             if pos_diff < minPos_v02vf:
-                rospy.logdebug(">>>>>> non optimal case <<<<<<< ")
+                logger.debug(">>>>>> non optimal case <<<<<<< ")
         else:
             if pos_diff > minPos_v02vf:
-                rospy.logdebug(">>>>>> non optimal case <<<<<<< ")
+                logger.debug(">>>>>> non optimal case <<<<<<< ")
                    
     # 2)simple motion:  positive or negative velocity, v0 and vf have same sign 
     else:
         # same action will be performed in both simple +ve or simple -ve motion, this part can be used later 
         # A) simple positive motion
         if(v_start >= 0 and v_end >= 0): # case one: both are positive
-            rospy.logdebug("\n\n>>>simple postive motion: {}, {}, {}, {} ".format(p_start, p_end, v_start, v_end))
+            logger.debug("\n\n>>>simple postive motion: %s, %s, %s, %s ", p_start, p_end, v_start, v_end)
+            planning_stats.note_branch('simple_positive')
 
         # B) simple negative motion                        
         elif (v_start <= 0 and v_end <= 0): # case two: both are negative
-            rospy.logdebug("\n\n>>>simple negative motion: {}, {}, {}, {} ".format(p_start, p_end, v_start, v_end))
+            logger.debug("\n\n>>>simple negative motion: %s, %s, %s, %s ", p_start, p_end, v_start, v_end)
+            planning_stats.note_branch('simple_negative')
         t_jrk_to_vf, t_acc_to_vf, t_jrk, t_acc, t_vel = traj.traj_segment_planning(p_start, p_end, abs_v_start, abs_v_end, v_max, a_max, j_max)
         j_max_to_vf, j_max = assign_jerk_sign_According_to_motion_type(p_start, p_end, v_start, v_end, p_max, v_max, a_max, j_max)
         if abs_v_end > abs_v_start:
@@ -172,15 +183,95 @@ def calculate_jerk_sign_and_duration(p_start, p_end, v_start, v_end, p_max, v_ma
     return segment_jerks_and_durations
    
    
+class TrajSegment:
+    '''
+    A fitted trajectory segment stored as its phase table: the jerk value and duration of each phase, 
+    plus the pos, vel, acc at the start of each phase (the inflection points), all plain floats.
+    it can be evaluated at a time instant, or an array of time instants, without any sympy 
+    '''
+    def __init__(self, p_start, v_start, segment_jerks_and_durations):
+        phase_jrk = []
+        phase_dur = []
+        phase_times = [0.0]
+        infl_points_acc = [0.0]
+        infl_points_vel = [v_start]
+        infl_points_pos = [p_start]
+        for j, T in segment_jerks_and_durations:
+            a0 = infl_points_acc[-1]
+            v0 = infl_points_vel[-1]
+            p0 = infl_points_pos[-1]
+            phase_jrk.append(j)
+            phase_dur.append(T)
+            phase_times.append(phase_times[-1] + T)
+            infl_points_acc.append( j*T             + a0 )
+            infl_points_vel.append( j*T*T/2.0       + a0*T       + v0 )
+            infl_points_pos.append( j*T*T*T/6.0     + a0*T*T/2.0 + v0*T + p0 )
+        self.phase_jrk = np.array(phase_jrk, dtype=np.float64)
+        self.phase_dur = np.array(phase_dur, dtype=np.float64)
+        self.phase_times = np.array(phase_times)
+        self.infl_points_acc = np.array(infl_points_acc)
+        self.infl_points_vel = np.array(infl_points_vel)
+        self.infl_points_pos = np.array(infl_points_pos)
+
+    @property
+    def duration(self):
+        return self.phase_times[-1]
+
+    def segment_jerks_and_durations(self):
+        return list(zip(self.phase_jrk, self.phase_dur))
+
+    def __call__(self, t):
+        '''
+        returns pos, vel, acc, jrk at time instant "t" (relative to the start of the segment), 
+        if "t" is an array, each of them is an array of the same shape
+        times outside the segment are evaluated using the first/last phase
+        '''
+        ph = np.searchsorted(self.phase_times, t, side='right') - 1
+        ph = np.clip(ph, 0, len(self.phase_dur) - 1)
+        t = t - self.phase_times[ph]
+        jrk = self.phase_jrk[ph]
+        acc = jrk*t           + self.infl_points_acc[ph]
+        vel = jrk*t**2/2.0    + self.infl_points_acc[ph]*t        + self.infl_points_vel[ph]
+        pos = jrk*t**3/6.0    + self.infl_points_acc[ph]*t**2/2.0 + self.infl_points_vel[ph]*t + self.infl_points_pos[ph]
+        return pos, vel, acc, jrk
+
+    def to_piecewise_polynomials(self, independent_variable=Symbol('t')):
+        '''
+        returns pos, vel, acc, jrk as numeric PiecewisePolynomial, coefficients are taken directly from the phase table
+        '''
+        p0 = self.infl_points_pos[:-1]
+        v0 = self.infl_points_vel[:-1]
+        a0 = self.infl_points_acc[:-1]
+        j = self.phase_jrk
+        position = PiecewisePolynomial(self.phase_times, np.stack((p0, v0, a0/2.0, j/6.0), axis=1), independent_variable)
+        velocity = PiecewisePolynomial(self.phase_times, np.stack((v0, a0, j/2.0), axis=1), independent_variable)
+        acceleration = PiecewisePolynomial(self.phase_times, np.stack((a0, j), axis=1), independent_variable)
+        jerk = PiecewisePolynomial(self.phase_times, j[:, np.newaxis], independent_variable)
+        return position, velocity, acceleration, jerk
+
+
+def fit_traj_segment_phases(p_start, p_end, v_start, v_end, p_max, v_max, a_max, j_max):
+    '''
+    fast version of "fit_traj_segment": it only uses float arithmetic and returns a TrajSegment 
+    (the jerk/duration phase table with pos/vel/acc at each phase boundary) instead of sympy functions
+    '''
+    segment_jerks_and_durations = calculate_jerk_sign_and_duration(p_start, p_end, v_start, v_end, p_max, v_max, a_max, j_max)
+    return TrajSegment(p_start, v_start, segment_jerks_and_durations)
+
+
 # the main function to fit traj segment with generic start/end velocities 
-def fit_traj_segment(p_start, p_end, v_start, v_end, p_max, v_max, a_max, j_max, independent_variable=Symbol('t')):
+def fit_traj_segment(p_start, p_end, v_start, v_end, p_max, v_max, a_max, j_max, independent_variable=Symbol('t'), numeric=False):
     '''
     This function selects a motion profile for a general trajectory segment with a given start/end velocities/positions
     considering the start and end accelerations/jerks are zeros
+    if numeric is True, pos, vel, acc, jrk are returned as numeric PiecewisePolynomial instead of sympy expressions
     '''
 
     # Step_1. calculate jerk_sign_and_duration 
     segment_jerks_and_durations = calculate_jerk_sign_and_duration(p_start, p_end, v_start, v_end, p_max, v_max, a_max, j_max, independent_variable=Symbol('t'))
+
+    if numeric:
+        return TrajSegment(p_start, v_start, segment_jerks_and_durations).to_piecewise_polynomials(independent_variable)
    
     # Step_2:  generate pos, vel, acc, jrk using the calculated "segment_jerks_and_durations"          
     p0 = p_start
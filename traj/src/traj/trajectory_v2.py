@@ -1,61 +1,36 @@
 import numpy as np
 from sympy import diff, Symbol
-from .piecewise_function import PiecewiseFunction
-from .parameterize_path import parameterize_path
+from .piecewise_function import PiecewiseFunction, PiecewisePolynomial
+from .parameterize_path import parameterize_path, project_limits_onto_segments
 import traj
-import rospy
+import logging
 
+logger = logging.getLogger(__name__)
 
-def project_limits_onto_s(limits, function, s_end):
-    slope = np.abs(np.array(diff(function)).astype(np.float64).flatten())
-    limit_factor = limits / slope
-    return min(limit_factor)
 
-
-def trajectory_for_path_v2(path, v_start, v_end,
-                           max_velocities, max_accelerations, max_jerks):
-    path_function = parameterize_path(path)
-    t = Symbol('t')
-    s = path_function.independent_variable
-    # check n_jts, n_segs
-    n_segs = len(path_function.functions)
+def max_reachable_s_velocities(lengths, s_v_start, s_v_end, s_v_max, s_a_max, s_j_max):
+    """
+    Velocity along s at each waypoint, from a forward pass starting at s_v_start and a backward
+    pass ending at s_v_end over segments with the given lengths and limits on s.
+    """
+    n_segs = len(lengths)
 
     # step 1: find Max Forward velocity
-    s_fw_vel = []
+    s_fw_vel = [s_v_start]
     for seg in range(n_segs):
-        fsegment = path_function.functions[seg]
-        s0 = path_function.boundaries[seg]
-        s1 = path_function.boundaries[seg + 1]
-        # Project joint limits onto this segment's direction to get limits on s
-        v_max = project_limits_onto_s(max_velocities, fsegment, s1-s0)
-        a_max = project_limits_onto_s(max_accelerations, fsegment, s1-s0)
-        j_max = project_limits_onto_s(max_jerks, fsegment, s1-s0)
-        if seg == 0:
-            s_v_start = project_limits_onto_s(v_start, fsegment, s1-s0)
-            s_fw_vel.append(s_v_start)
-        tj, ta, tv, s_v_nxt = traj.max_reachable_vel_per_segment(s1-s0, s_fw_vel[seg],
-                                                     30.0, j_max, a_max, j_max)
+        tj, ta, tv, s_v_nxt = traj.max_reachable_vel_per_segment(
+            lengths[seg], s_fw_vel[seg], 30.0, s_v_max[seg], s_a_max[seg], s_j_max[seg])
         s_fw_vel.append(s_v_nxt)
-    rospy.logdebug("\n>>> s_fw_vel: \n {}".format(s_fw_vel))
+    logger.debug("\n>>> s_fw_vel: \n %s", s_fw_vel)
 
     # step 2: find Max Backward velocity
-    s_bk_vel = []
-    for seg in range(n_segs):
-        fsegment = path_function.functions[n_segs - seg - 1]
-        s0 = path_function.boundaries[n_segs - seg - 1]
-        s1 = path_function.boundaries[n_segs - seg]
-        # Project joint limits onto this segment's direction to get limits on s
-        v_max = project_limits_onto_s(max_velocities, fsegment, s1-s0)
-        a_max = project_limits_onto_s(max_accelerations, fsegment, s1-s0)
-        j_max = project_limits_onto_s(max_jerks, fsegment, s1-s0)
-        if seg == 0:
-            s_v_end = project_limits_onto_s(v_end, fsegment, s1-s0)
-            s_bk_vel.append(s_v_end)
+    s_bk_vel = [s_v_end]
+    for seg in reversed(range(n_segs)):
         tj, ta, tv, s_v_nxt = traj.max_reachable_vel_per_segment(
-            s1-s0, s_bk_vel[seg], 30.0, v_max, a_max, j_max)
+            lengths[seg], s_bk_vel[-1], 30.0, s_v_max[seg], s_a_max[seg], s_j_max[seg])
         s_bk_vel.append(s_v_nxt)
     s_bk_vel.reverse()
-    rospy.logdebug("\n>>> s_bk_vel: \n {}".format(s_bk_vel))
+    logger.debug("\n>>> s_bk_vel: \n %s", s_bk_vel)
 
     # step 3: find final max reachable vel
     # check condition when v_start or v_end is not feasible:
@@ -64,10 +39,45 @@ def trajectory_for_path_v2(path, v_start, v_end,
         raise ValueError("combination of v_start({}) & v_end({})"
                          "is not feasible".format(s_fw_vel[0], s_bk_vel[-1]))
     # calcuate max_rechable_vels that grantee v_end at the end of
-    # the trajectory for this portion of traj
-    s_estimated_vel = [min(fw, bk) for fw, bk in zip(s_fw_vel, s_bk_vel)]
-    rospy.logdebug("\n>>> s_estimated_vel: \n {}".format(s_estimated_vel))
+    # the trajectory for this portion of traj. a waypoint is the end of one
+    # segment and the start of the next, so it has to respect the velocity
+    # limit of both
+    waypoint_v_max = np.minimum(np.append(np.inf, s_v_max), np.append(s_v_max, np.inf))
+    s_estimated_vel = [min(fw, bk, vm) for fw, bk, vm in zip(s_fw_vel, s_bk_vel, waypoint_v_max)]
+    logger.debug("\n>>> s_estimated_vel: \n %s", s_estimated_vel)
+    return s_estimated_vel
+
+
+def trajectory_for_path_v2(path, v_start, v_end,
+                           max_velocities, max_accelerations, max_jerks, numeric=False):
+    """
+    Time parameterize a path of straight segments, returning position, velocity, acceleration and
+    jerk as piecewise functions of time.
+
+    If numeric is True, the functions are PiecewisePolynomials for all joints at once instead of
+    sympy backed PiecewiseFunctions. Both use the same velocities along the path.
+    """
+    # The velocity passes only need the length and direction of each segment.
+    numeric_path_function = parameterize_path(path, numeric=True)
+    starts = numeric_path_function.coefficients[:, 0]
+    directions = numeric_path_function.coefficients[:, 1]
+    lengths = np.diff(numeric_path_function.boundaries)
+
+    # Project joint limits onto each segment's direction to get limits on s
+    s_v_max = project_limits_onto_segments(max_velocities, directions)
+    s_a_max = project_limits_onto_segments(max_accelerations, directions)
+    s_j_max = project_limits_onto_segments(max_jerks, directions)
+    s_v_start = project_limits_onto_segments(v_start, directions[:1])[0]
+    s_v_end = project_limits_onto_segments(v_end, directions[-1:])[0]
+    s_estimated_vel = max_reachable_s_velocities(lengths, s_v_start, s_v_end, s_v_max, s_a_max, s_j_max)
+
     # step 4: use the estimated max reachable velocity
+    if numeric:
+        return _numeric_trajectory(starts, directions, lengths, s_estimated_vel, s_v_max, s_a_max, s_j_max)
+
+    path_function = parameterize_path(path)
+    t = Symbol('t')
+    s = path_function.independent_variable
     trajectory_position_functions = []
     trajectory_velocity_functions = []
     trajectory_acceleration_functions = []
@@ -75,23 +85,19 @@ def trajectory_for_path_v2(path, v_start, v_end,
     trajectory_boundaries = [0.0]
     for segment_i in range(len(path_function.functions)):
         fsegment = path_function.functions[segment_i]
-        rospy.logdebug("\n\n >>>>>>>>> seg: {} ".format(segment_i))
+        logger.debug("\n\n >>>>>>>>> seg: %s ", segment_i)
         s0 = path_function.boundaries[segment_i]
         s1 = path_function.boundaries[segment_i + 1]
         p_start = np.array(fsegment.subs(s, 0.0)).astype(np.float64).flatten()
         p_end = np.array(
                 fsegment.subs(s, s1 - s0)).astype(np.float64).flatten()
-        rospy.logdebug((p_start, p_end))
+        logger.debug("%s", (p_start, p_end))
 
-        # Project joint limits onto this segment's direction to get limits on s
-        v_max = project_limits_onto_s(max_velocities, fsegment, s1-s0)
-        a_max = project_limits_onto_s(max_accelerations, fsegment, s1-s0)
-        j_max = project_limits_onto_s(max_jerks, fsegment, s1-s0)
         # Compute 7 segment profile for s as a function of time.
         this_segment_start_time = trajectory_boundaries[-1]
         s_position, s_velocity, s_acceleration, s_jerk = traj.fit_traj_segment(
             0, s1-s0, s_estimated_vel[segment_i], s_estimated_vel[segment_i+1],
-            30.0, v_max, a_max, j_max)
+            30.0, s_v_max[segment_i], s_a_max[segment_i], s_j_max[segment_i])
 
         # Substitute time profile for s into the path function to get
         # trajectory as a function of t.
@@ -116,3 +122,31 @@ def trajectory_for_path_v2(path, v_start, v_end,
                               trajectory_acceleration_functions, t),
             PiecewiseFunction(trajectory_boundaries,
                               trajectory_jerk_functions, t))
+
+
+def _numeric_trajectory(starts, directions, lengths, s_estimated_vel, s_v_max, s_a_max, s_j_max):
+    """
+    Fit the s(t) profile of every segment numerically and compose it with the linear segment
+    q(s) = q0 + d*s. Since the segment is linear, the derivatives of q(t) are d times the derivatives
+    of s(t), so the coefficients for all joints come from one broadcast multiplication per segment.
+    """
+    t = Symbol('t')
+    boundaries = [np.zeros(1)]
+    coefficients = [[], [], [], []]
+    segment_start_time = 0.0
+    for segment_i in range(len(lengths)):
+        s_segment = traj.fit_traj_segment_phases(
+            0.0, lengths[segment_i], s_estimated_vel[segment_i], s_estimated_vel[segment_i+1],
+            30.0, s_v_max[segment_i], s_a_max[segment_i], s_j_max[segment_i])
+        s_functions = s_segment.to_piecewise_polynomials(t)
+        for function_i, s_function in enumerate(s_functions):
+            q_coefficients = s_function.coefficients * directions[segment_i]
+            if function_i == 0:
+                q_coefficients[:, 0] += starts[segment_i]
+            coefficients[function_i].append(q_coefficients)
+        boundaries.append(s_functions[0].boundaries[1:] + segment_start_time)
+        segment_start_time = boundaries[-1][-1]
+
+    boundaries = np.concatenate(boundaries)
+    return tuple(PiecewisePolynomial(boundaries, np.concatenate(function_coefficients), t)
+                 for function_coefficients in coefficients)
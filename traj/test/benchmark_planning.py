@@ -0,0 +1,292 @@
+#!/usr/bin/env python
+'''
+microbenchmarks for the planning hot paths.
+
+every benchmark builds its cases from a fixed seed, so two runs time exactly the same inputs. each case is timed
+separately and the per call times are summarized as percentiles (in microseconds). results are written as JSON,
+and a previous results file can be given as baseline to flag benchmarks which got slower:
+
+    python benchmark_planning.py --output baseline.json
+    python benchmark_planning.py --output new.json --compare baseline.json
+
+with --compare the script exits with status 1 if any benchmark's median is slower than the baseline by more than
+the tolerance.
+'''
+import argparse
+import json
+import platform
+import sys
+import time
+
+import numpy as np
+
+import traj
+import traj.discrete_time_parameterization
+
+SEED = 0
+
+#limits
+p_max = 30.0
+v_max = 3.0
+a_max = 4.0
+j_max = 10.0
+
+# p_end, v_start, v_end: the 34 cases of non-zero velocity segment planning
+segment_cases = [(1.0, 0.0, 0.0), (3.0, 0.0, 0.0), (5.0, 0.0, 0.0), (2.0, 1.0, 1.0), (3.0, 2.5, 2.5), (3.0, 0.5, 0.5),
+                 (10.0, 0.5, 0.5), (2.0, 0.5, 1.5), (5.0, 2.0, 2.5), (3.0, 0.5, 2.5), (5.0, 0.5, 2.5), (2.0, 1.5, 0.5),
+                 (5.0, 2.5, 2.0), (3.0, 2.5, 0.5), (5.0, 2.5, 0.5), (-1.0, 0.0, 0.0), (-3.0, 0.0, 0.0), (-5.0, 0.0, 0.0),
+                 (-2.0, -1.0, -1.0), (-3.0, -2.5, -2.5), (-3.0, -0.5, -0.5), (-10.0, -0.5, -0.5), (-2.0, -0.5, -1.5),
+                 (-5.0, -2.0, -2.5), (-3.0, -0.5, -2.5), (-5.0, -0.5, -2.5), (-2.0, -1.5, -0.5), (-5.0, -2.5, -2.0),
+                 (-3.0, -2.5, -0.5), (-5.0, -2.5, -0.5), (10.0, 1.5, -1.0), (5.0, -1.5, 1.0), (-10.0, 1.5, -1.0),
+                 (-5.0, -1.5, 1.0)]
+
+# name -> (function building the list of cases from a random generator, number of times each case is timed)
+BENCHMARKS = {}
+
+
+def benchmark(name, repeats):
+    def register(setup):
+        BENCHMARKS[name] = (setup, repeats)
+        return setup
+    return register
+
+
+def feasible_cases(rng, n_cases, draw, function):
+    '''
+    draws random arguments until "n_cases" of them are accepted by "function" (planners raise ValueError otherwise)
+    '''
+    cases = []
+    while len(cases) < n_cases:
+        args = draw(rng)
+        try:
+            function(*args)
+        except ValueError:
+            continue
+        cases.append(args)
+    return cases
+
+
+@benchmark('fit_traj_segment', repeats=3)
+def fit_traj_segment_cases(rng):
+    return [lambda case=case: traj.fit_traj_segment(0.0, case[0], case[1], case[2], p_max, v_max, a_max, j_max)
+            for case in segment_cases]
+
+
+@benchmark('fit_traj_segment_phases', repeats=50)
+def fit_traj_segment_phases_cases(rng):
+    return [lambda case=case: traj.fit_traj_segment_phases(0.0, case[0], case[1], case[2], p_max, v_max, a_max, j_max)
+            for case in segment_cases]
+
+
+@benchmark('traj_segment_planning', repeats=20)
+def traj_segment_planning_cases(rng):
+    def draw(rng):
+        return (0.0, rng.uniform(0.0, 10.0), rng.uniform(0.0, v_max), rng.uniform(0.0, v_max), v_max, a_max, j_max)
+    cases = feasible_cases(rng, 200, draw, traj.traj_segment_planning)
+    return [lambda args=args: traj.traj_segment_planning(*args) for args in cases]
+
+
+@benchmark('traj_segment_planning_batch_1000', repeats=50)
+def traj_segment_planning_batch_cases(rng):
+    args = (0.0, rng.uniform(0.0, 10.0, 1000), rng.uniform(0.0, v_max, 1000), rng.uniform(0.0, v_max, 1000),
+            v_max, a_max, j_max)
+    return [lambda: traj.traj_segment_planning_batch(*args)]
+
+
+@benchmark('real_roots_cubic_eq', repeats=20)
+def real_roots_cubic_eq_cases(rng):
+    coefficients = rng.uniform(-10.0, 10.0, (200, 4))
+    return [lambda c=c: traj.real_roots_cubic_eq(*c) for c in coefficients]
+
+
+@benchmark('max_reachable_vel_per_segment', repeats=20)
+def max_reachable_vel_per_segment_cases(rng):
+    def draw(rng):
+        return (rng.uniform(0.0, 10.0), rng.uniform(0.0, v_max), p_max, v_max, a_max, j_max)
+    cases = feasible_cases(rng, 200, draw, traj.max_reachable_vel_per_segment)
+    return [lambda args=args: traj.max_reachable_vel_per_segment(*args) for args in cases]
+
+
+@benchmark('segment_synchronization', repeats=5)
+def segment_synchronization_cases(rng):
+    n_jts = 6
+    limits = [np.full(n_jts, limit) for limit in (p_max, v_max, a_max, j_max)]
+
+    def draw(rng):
+        # start and end velocities have the direction of the motion so the joints can be synchronized
+        pos_diff = rng.uniform(-3.0, 3.0, n_jts)
+        vel_start = np.sign(pos_diff)*rng.uniform(0.0, 1.0, n_jts)
+        vel_end = np.sign(pos_diff)*rng.uniform(0.0, 1.0, n_jts)
+        return (np.zeros(n_jts), pos_diff, vel_start, vel_end) + tuple(limits)
+    cases = feasible_cases(rng, 20, draw, traj.segment_synchronization)
+    return [lambda args=args: traj.segment_synchronization(*args) for args in cases]
+
+
+def random_paths(rng, n_paths, n_wpts, n_jts):
+    return [np.cumsum(rng.uniform(-1.0, 1.0, (n_wpts, n_jts)), axis=0) for _ in range(n_paths)]
+
+
+@benchmark('parameterize_path', repeats=10)
+def parameterize_path_cases(rng):
+    return [lambda path=path: traj.parameterize_path(path) for path in random_paths(rng, 10, 10, 6)]
+
+
+@benchmark('parameterize_path_numeric_1000', repeats=20)
+def parameterize_path_numeric_cases(rng):
+    return [lambda path=path: traj.parameterize_path(path, numeric=True) for path in random_paths(rng, 10, 1000, 6)]
+
+
+@benchmark('simplify_path_10000', repeats=5)
+def simplify_path_cases(rng):
+    # dense samples of smooth joint motions, like paths from IK sampling
+    t = np.linspace(0.0, 10.0, 10000)[:, np.newaxis]
+    paths = [np.sin(rng.uniform(0.1, 2.0, 6)*t + rng.uniform(0.0, np.pi, 6)) for _ in range(5)]
+    return [lambda path=path: traj.simplify_path(path, 1e-3) for path in paths]
+
+
+@benchmark('parameterize_path_with_blends', repeats=3)
+def parameterize_path_with_blends_cases(rng):
+    return [lambda path=path: traj.parameterize_path_with_blends(path, 0.1) for path in random_paths(rng, 5, 10, 6)]
+
+
+@benchmark('parameterize_path_with_blends_numeric_10000', repeats=5)
+def parameterize_path_with_blends_numeric_cases(rng):
+    return [lambda path=path: traj.parameterize_path_with_blends(path, 0.05, numeric=True)
+            for path in random_paths(rng, 5, 10000, 6)]
+
+
+@benchmark('piecewise_function_scalar_evaluation', repeats=5)
+def piecewise_function_scalar_evaluation_cases(rng):
+    position = traj.fit_traj_segment(0.0, 10.0, 1.5, -1.0, p_max, v_max, a_max, j_max)[0]
+    times = rng.uniform(position.boundaries[0], position.boundaries[-1], 100)
+    return [lambda t=t: position(t) for t in times]
+
+
+@benchmark('piecewise_function_array_evaluation_1000', repeats=50)
+def piecewise_function_array_evaluation_cases(rng):
+    position = traj.fit_traj_segment(0.0, 10.0, 1.5, -1.0, p_max, v_max, a_max, j_max)[0]
+    times = rng.uniform(position.boundaries[0], position.boundaries[-1], 1000)
+    position(times)  # builds the cached piece evaluators
+    return [lambda: position(times)]
+
+
+@benchmark('piecewise_polynomial_array_evaluation_1000', repeats=50)
+def piecewise_polynomial_array_evaluation_cases(rng):
+    position = traj.fit_traj_segment(0.0, 10.0, 1.5, -1.0, p_max, v_max, a_max, j_max, numeric=True)[0]
+    times = rng.uniform(position.boundaries[0], position.boundaries[-1], 1000)
+    return [lambda: position(times)]
+
+
+@benchmark('parameterize_path_discrete', repeats=3)
+def parameterize_path_discrete_cases(rng):
+    dtp = traj.discrete_time_parameterization
+
+    def case(p_end, v_max, a_max, j_max, delta_t):
+        def is_valid(position, velocity, acceleration, jerk):
+            if np.abs(acceleration) > a_max + dtp.ACCELERATION_THRESHOLD:
+                return False
+            if velocity > v_max + dtp.VELOCITY_THRESHOLD:
+                return False
+            if position < 0.0 or position > p_end + dtp.POSITION_THRESHOLD:
+                return False
+            return True
+        return lambda: dtp.parameterize_path_discrete(0.0, p_end, is_valid, j_max, delta_t)
+    return [case(rng.uniform(0.5, 2.0), rng.uniform(1.0, 4.0), 8.0, 30.0, 0.008) for _ in range(3)]
+
+
+def time_cases(cases, repeats):
+    '''
+    returns the time of each call in microseconds, every case is called once before timing starts
+    '''
+    for case in cases:
+        case()
+    times = []
+    for _ in range(repeats):
+        for case in cases:
+            start = time.perf_counter()
+            case()
+            times.append(time.perf_counter() - start)
+    return np.array(times)*1e6
+
+
+def summarize(times):
+    return {'calls': len(times),
+            'mean_us': float(np.mean(times)),
+            'min_us': float(np.min(times)),
+            'p50_us': float(np.percentile(times, 50)),
+            'p90_us': float(np.percentile(times, 90)),
+            'p99_us': float(np.percentile(times, 99)),
+            'max_us': float(np.max(times))}
+
+
+def run(names, seed=SEED, repeat_scale=1.0):
+    results = {}
+    for name in names:
+        setup, repeats = BENCHMARKS[name]
+        cases = setup(np.random.default_rng(seed))
+        results[name] = summarize(time_cases(cases, max(1, int(round(repeats*repeat_scale)))))
+        print('{:45s} p50 {:12.1f} us   p90 {:12.1f} us   p99 {:12.1f} us'.format(
+            name, results[name]['p50_us'], results[name]['p90_us'], results[name]['p99_us']))
+    return {'metadata': {'seed': seed,
+                         'python': platform.python_version(),
+                         'numpy': np.__version__,
+                         'machine': platform.machine(),
+                         'time': time.strftime('%Y-%m-%dT%H:%M:%S')},
+            'results': results}
+
+
+def compare(results, baseline, tolerance):
+    '''
+    compares the median time of each benchmark against the baseline, returns the names of the benchmarks which are
+    slower by more than "tolerance" (relative)
+    '''
+    slower = []
+    for name, stats in sorted(results['results'].items()):
+        if name not in baseline['results']:
+            print('{:45s} not in baseline'.format(name))
+            continue
+        ratio = stats['p50_us']/baseline['results'][name]['p50_us']
+        if ratio > 1.0 + tolerance:
+            flag = 'SLOWER'
+            slower.append(name)
+        elif ratio < 1.0 - tolerance:
+            flag = 'faster'
+        else:
+            flag = ''
+        print('{:45s} {:8.2f}x  {}'.format(name, ratio, flag))
+    return slower
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--compare', metavar='BASELINE', help='JSON results file to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='relative slowdown of the median which is flagged (default: 0.25)')
+    parser.add_argument('--filter', default='', help='only run benchmarks whose name contains this string')
+    parser.add_argument('--repeat-scale', type=float, default=1.0,
+                        help='scale the number of repeats of every benchmark (e.g. 0.2 for a quick run)')
+    parser.add_argument('--seed', type=int, default=SEED)
+    parser.add_argument('--list', action='store_true', help='list the benchmarks and exit')
+    args = parser.parse_args(argv)
+
+    names = [name for name in BENCHMARKS if args.filter in name]
+    if args.list:
+        print('\n'.join(names))
+        return 0
+
+    results = run(names, args.seed, args.repeat_scale)
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump(results, output_file, indent=2, sort_keys=True)
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+        print('\ncompared to {}:'.format(args.compare))
+        if compare(results, baseline, args.tolerance):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,64 @@
+import numpy as np
+
+import traj
+
+'''
+to test batch_planning.py: planning a batch of paths/segments in worker processes should give the same trajectories
+as planning each of them in this process, with None for the ones which can't be planned
+'''
+
+# limits
+max_velocities = np.array([1.0, 1.0, 1.0])
+max_accelerations = np.array([2.0, 2.0, 2.0])
+max_jerks = np.array([10.0, 10.0, 10.0])
+
+
+def random_paths(n_paths):
+    rng = np.random.default_rng(0)
+    return [np.cumsum(rng.uniform(-1.0, 1.0, (5, 3)), axis=0) for _ in range(n_paths)]
+
+
+def check_same_functions(functions, expected_functions):
+    for function, expected_function in zip(functions, expected_functions):
+        assert isinstance(function, traj.PiecewisePolynomial)
+        times = np.linspace(0.0, expected_function.boundaries[-1], 101)
+        assert np.allclose(function.boundaries, expected_function.boundaries.astype(np.float64))
+        assert np.allclose(function(times), expected_function(times))
+
+
+def test_trajectories_for_paths():
+    paths = random_paths(6)
+    trajectories = traj.trajectories_for_paths(paths, max_velocities, max_accelerations, max_jerks, processes=2)
+    assert len(trajectories) == len(paths)
+    for path, functions in zip(paths, trajectories):
+        check_same_functions(functions, traj.trajectory_for_path_v2(path, np.zeros(3), np.zeros(3), max_velocities,
+                                                                    max_accelerations, max_jerks, numeric=True))
+
+
+def test_trajectories_for_paths_version_1():
+    paths = random_paths(2)
+    trajectories = traj.trajectories_for_paths(paths, max_velocities, max_accelerations, max_jerks, version=1,
+                                               processes=1)
+    for path, functions in zip(paths, trajectories):
+        check_same_functions(functions, traj.trajectory_for_path(path, max_velocities, max_accelerations, max_jerks))
+
+
+def test_synchronize_segments():
+    n_jts = 3
+    limits = [np.full(n_jts, limit) for limit in (30.0, 3.0, 4.0, 10.0)]
+    segments = [(np.zeros(n_jts), np.array([1.0, 2.0, -1.5]), np.array([0.0, 0.5, -0.2]), np.zeros(n_jts)),
+                # the first joint moves away from its velocity, which can't be synchronized
+                (np.zeros(n_jts), np.array([1.0, 2.0, -1.5]), np.array([-0.5, 0.5, -0.2]), np.zeros(n_jts)),
+                (np.zeros(n_jts), np.array([-3.0, 0.5, 2.0]), np.zeros(n_jts), np.array([-0.5, 0.0, 0.5]))]
+    results = traj.synchronize_segments(segments, *limits, processes=2)
+    assert results[1] is None
+    for segment, result in zip(segments[::2], results[::2]):
+        sync_time, durations, jerks = result
+        expected_sync_time, expected_durations, expected_jerks = traj.segment_synchronization(*(segment + tuple(limits)))
+        assert sync_time == expected_sync_time
+        assert durations.shape == jerks.shape == (n_jts, max(len(d) for d in expected_durations))
+        for jt in range(n_jts):
+            n_phases = len(expected_durations[jt])
+            assert np.array_equal(durations[jt, :n_phases], expected_durations[jt])
+            assert np.array_equal(jerks[jt, :n_phases], expected_jerks[jt])
+            assert not durations[jt, n_phases:].any()
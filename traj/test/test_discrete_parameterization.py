@@ -1,3 +1,4 @@
+import nose
 import numpy as np
 
 import traj.discrete_time_parameterization
@@ -24,3 +25,195 @@ def simple_is_valid(position, velocity, acceleration, jerk):
 def test_stop_from_stopped():
     assert traj.discrete_time_parameterization.compute_stopping_trajectory(
         0.0, 0.0, 0.0, simple_is_valid, j_max=10.0, delta_t=0.001) is not None
+
+
+def sinusoidal_is_valid(position, velocity, acceleration, jerk):
+    """
+    Velocity limit which varies along the path, so that the trajectory has to slow down and speed
+    up again between the start and the end.
+    """
+    p_end = 4.0
+    v_max = 2.0 + 1.4 * np.sin(np.pi * position)
+    a_max = 8.0
+    if position < 0.0 or position > p_end + traj.discrete_time_parameterization.POSITION_THRESHOLD:
+        return False
+    if velocity > v_max + traj.discrete_time_parameterization.VELOCITY_THRESHOLD:
+        return False
+    if np.abs(acceleration) > a_max + traj.discrete_time_parameterization.ACCELERATION_THRESHOLD:
+        return False
+    return True
+
+
+def test_varying_velocity_limit():
+    trajectory = traj.discrete_time_parameterization.parameterize_path_discrete(
+        0.0, 4.0, sinusoidal_is_valid, j_max=30.0, delta_t=0.008)
+    assert trajectory[-1, 0] >= 4.0 - traj.discrete_time_parameterization.POSITION_THRESHOLD
+    assert all(sinusoidal_is_valid(*row[:3], 0.0) for row in trajectory)
+
+
+def check_closed_form_switch(v_start, a_start, j_max, delta_t):
+    dtp = traj.discrete_time_parameterization
+    # Decelerate with -j_max until the velocity drops to zero.
+    trajectory = [(0.0, v_start, a_start, -j_max)]
+    while trajectory[-1][1] >= dtp.VELOCITY_THRESHOLD:
+        trajectory.append(dtp.integrate(*trajectory[-1], delta_t) + (-j_max,))
+    trajectory = np.array(trajectory)
+
+    # Brute force: the latest timestep from which positive jerk reaches zero acceleration in time.
+    expected_switch_time_i = 0
+    for switch_time_i in range(len(trajectory)):
+        p, v, a = trajectory[switch_time_i, :3]
+        while a <= -dtp.ACCELERATION_THRESHOLD and v >= -dtp.VELOCITY_THRESHOLD:
+            p, v, a = dtp.integrate(p, v, a, j_max, delta_t)
+        if v >= -dtp.VELOCITY_THRESHOLD:
+            expected_switch_time_i = switch_time_i
+    assert dtp.closed_form_switch_time_i(trajectory, j_max, delta_t) == expected_switch_time_i
+
+    stop = dtp.smooth_stop(trajectory, lambda p, v, a, j: True, j_max, delta_t)
+    assert stop[-1, 1] >= -dtp.VELOCITY_THRESHOLD
+    assert stop[-1, 2] > -dtp.ACCELERATION_THRESHOLD
+
+
+def test_closed_form_switch():
+    for v_start, a_start, j_max, delta_t in ((1.0, 0.0, 10.0, 0.008), (3.0, 2.0, 30.0, 0.008),
+                                             (0.5, -2.0, 10.0, 0.001), (4.0, 5.0, 50.0, 0.004)):
+        check_closed_form_switch(v_start, a_start, j_max, delta_t)
+
+
+def sinusoidal_are_valid(positions, velocities, accelerations, jerks):
+    """
+    Array version of sinusoidal_is_valid.
+    """
+    p_end = 4.0
+    v_max = 2.0 + 1.4 * np.sin(np.pi * positions)
+    a_max = 8.0
+    return ((positions >= 0.0) & (positions <= p_end + traj.discrete_time_parameterization.POSITION_THRESHOLD) &
+            (velocities <= v_max + traj.discrete_time_parameterization.VELOCITY_THRESHOLD) &
+            (np.abs(accelerations) <= a_max + traj.discrete_time_parameterization.ACCELERATION_THRESHOLD))
+
+
+def test_array_constraint():
+    constraint = traj.discrete_time_parameterization.ArrayConstraint(sinusoidal_are_valid)
+    rows = np.array([(0.5, 1.0, 0.0, 0.0), (0.5, 4.0, 0.0, 0.0), (1.5, 1.0, 0.0, 0.0), (-1.0, 0.0, 0.0, 0.0)])
+    assert list(constraint.valid_rows(rows)) == [True, False, False, False]
+    assert constraint.first_invalid(rows) == 1
+    assert constraint.first_invalid(rows[:1]) == 1
+    assert constraint(*rows[0]) and not constraint(*rows[1])
+    # Subclasses have to implement valid_rows.
+    nose.tools.assert_raises(TypeError, type('NoRows', (traj.discrete_time_parameterization.BlockConstraint,), {}))
+
+
+def test_array_constraint_matches_scalar():
+    trajectory = traj.discrete_time_parameterization.parameterize_path_discrete(
+        0.0, 4.0, sinusoidal_is_valid, j_max=30.0, delta_t=0.008)
+    constraint = traj.discrete_time_parameterization.ArrayConstraint(sinusoidal_are_valid)
+    block_trajectory = traj.discrete_time_parameterization.parameterize_path_discrete(
+        0.0, 4.0, constraint, j_max=30.0, delta_t=0.008)
+    assert trajectory.shape == block_trajectory.shape
+    # The jerk in the final timestep is meaningless.
+    assert np.allclose(trajectory[:, :3], block_trajectory[:, :3])
+    assert np.allclose(trajectory[:-1, 3], block_trajectory[:-1, 3])
+
+    stop = traj.discrete_time_parameterization.compute_stopping_trajectory(
+        0.2, 1.5, 2.0, sinusoidal_is_valid, 30.0, 0.008)
+    block_stop = traj.discrete_time_parameterization.compute_stopping_trajectory(
+        0.2, 1.5, 2.0, constraint, 30.0, 0.008)
+    assert np.allclose(stop[:, :3], block_stop[:, :3])
+
+
+def test_reused_workspace():
+    dtp = traj.discrete_time_parameterization
+    trajectory = dtp.parameterize_path_discrete(0.0, 4.0, sinusoidal_is_valid, j_max=30.0, delta_t=0.008)
+    # The trajectory is longer than the workspace's initial buffers, so they have to grow.
+    assert len(trajectory) > dtp.Workspace.INITIAL_TIME_STEPS
+    workspace = dtp.Workspace()
+    for is_valid in (sinusoidal_is_valid, dtp.ArrayConstraint(sinusoidal_are_valid), sinusoidal_is_valid):
+        reused_trajectory = dtp.parameterize_path_discrete(
+            0.0, 4.0, is_valid, j_max=30.0, delta_t=0.008, workspace=workspace)
+        assert trajectory.shape == reused_trajectory.shape
+        assert np.allclose(trajectory[:, :3], reused_trajectory[:, :3])
+
+    nose.tools.assert_raises(RuntimeError, dtp.parameterize_path_discrete, 0.0, 4.0, sinusoidal_is_valid, 30.0, 0.008,
+                             workspace=dtp.Workspace(max_time_steps=100))
+
+    # A limit is only enforced when one is given.
+    stop = dtp.compute_stopping_trajectory(0.2, 1.5, 2.0, sinusoidal_is_valid, 30.0, 0.008)
+    assert dtp.Workspace().max_time_steps is None
+    limited_stop = dtp.compute_stopping_trajectory(0.2, 1.5, 2.0, sinusoidal_is_valid, 30.0, 0.008,
+                                                   workspace=dtp.Workspace(max_time_steps=2 * len(stop)))
+    assert np.allclose(stop[:, :3], limited_stop[:, :3])
+    nose.tools.assert_raises(RuntimeError, dtp.compute_stopping_trajectory, 0.2, 1.5, 2.0, sinusoidal_is_valid,
+                             30.0, 0.008, dtp.Workspace(max_time_steps=len(stop) - 1))
+
+
+def test_incremental():
+    dtp = traj.discrete_time_parameterization
+    trajectory = dtp.parameterize_path_discrete(0.0, 4.0, sinusoidal_is_valid, j_max=30.0, delta_t=0.008)
+    incremental_trajectory = dtp.parameterize_path_discrete(0.0, 4.0, sinusoidal_is_valid, j_max=30.0,
+                                                            delta_t=0.008, incremental=True)
+    assert np.array_equal(trajectory, incremental_trajectory, equal_nan=True)
+
+    # Any prediction gives the same stopping trajectory, whether it is right, shifted, or wrong.
+    workspace = dtp.Workspace()
+    stop = dtp.compute_stopping_trajectory(0.2, 1.5, 2.0, sinusoidal_is_valid, 30.0, 0.008, workspace).copy()
+    jerks = dtp.deceleration_jerks(workspace)
+    assert set(jerks) == {-30.0, 0.0}
+    for is_valid in (sinusoidal_is_valid, dtp.ArrayConstraint(sinusoidal_are_valid)):
+        for predicted_jerks in ([], jerks, jerks[5:], np.zeros(100), np.full(3, -30.0), [0.0, 7.0, -30.0]):
+            predicted_stop = dtp.compute_stopping_trajectory(0.2, 1.5, 2.0, is_valid, 30.0, 0.008,
+                                                             predicted_jerks=predicted_jerks)
+            assert np.array_equal(stop, predicted_stop, equal_nan=True)
+
+
+def test_joint_path():
+    dtp = traj.discrete_time_parameterization
+    v_max = np.array([2.0, 1.0, 3.0])
+    a_max = np.array([8.0, 4.0, 8.0])
+    j_max = np.array([80.0, 50.0, 80.0])
+    path = np.array([(0.0, 0.0, 0.0), (1.0, 0.0, 0.5), (2.0, 1.0, 0.5)])
+    delta_t = 0.008
+    for path_function in (traj.parameterize_path(path), traj.parameterize_path(path, numeric=True),
+                          traj.parameterize_path_with_blends(path, 0.2)):
+        trajectory = dtp.parameterize_joint_path_discrete(path_function, v_max, a_max, j_max, delta_t)
+        assert trajectory[-1, 0] >= path_function.boundaries[-1] - dtp.POSITION_THRESHOLD
+        joint_velocities = np.diff(path_function(trajectory[:, 0]), axis=0) / delta_t
+        assert np.all(np.abs(joint_velocities) <= v_max + 2 * dtp.VELOCITY_THRESHOLD)
+
+    # Paths don't have to start at s = 0, the trajectory covers the path from its first boundary.
+    path_function = traj.parameterize_path(path, numeric=True)
+    shifted_path = traj.PiecewisePolynomial(path_function.boundaries - 1.5, path_function.coefficients)
+    trajectory = dtp.parameterize_joint_path_discrete(path_function, v_max, a_max, j_max, delta_t)
+    shifted_trajectory = dtp.parameterize_joint_path_discrete(shifted_path, v_max, a_max, j_max, delta_t)
+    assert trajectory.shape == shifted_trajectory.shape
+    assert np.allclose(trajectory[:, 0] - 1.5, shifted_trajectory[:, 0])
+
+
+def test_short_piece():
+    # The middle piece is much shorter than the spacing of the constraint's table samples, so the
+    # samples only see the long pieces on either side of it.
+    dtp = traj.discrete_time_parameterization
+    path_function = traj.parameterize_path(np.array([(0.0, 0.0), (10.0, 0.0), (10.0, 0.01), (20.0, 0.01)]),
+                                           numeric=True)
+    v_max = np.array([1.0, 0.01])
+    delta_t = 0.01
+    trajectory = dtp.parameterize_joint_path_discrete(path_function, v_max, [1.0, 1.0], [10.0, 10.0], delta_t)
+    assert trajectory[-1, 0] >= path_function.boundaries[-1] - dtp.POSITION_THRESHOLD
+    joint_velocities = np.diff(path_function(trajectory[:, 0]), axis=0) / delta_t
+    assert np.all(np.abs(joint_velocities) <= v_max + 2 * dtp.VELOCITY_THRESHOLD)
+
+
+def test_integrate_jerks():
+    dtp = traj.discrete_time_parameterization
+    rng = np.random.default_rng(0)
+    jerks = rng.uniform(-30.0, 30.0, 500)
+    states = [(0.5, 1.0, -2.0)]
+    for j in jerks:
+        states.append(dtp.integrate(*states[-1], j, 0.008))
+    # Same floating point operations in the same order as the loop.
+    assert np.array_equal(dtp.integrate_jerks(0.5, 1.0, -2.0, jerks, 0.008), np.array(states))
+    assert dtp.integrate_jerks(0.5, 1.0, -2.0, [], 0.008).shape == (1, 3)
+    # The jerk changes the acceleration after the first timestep, so it only shows up in the last position.
+    p0, v0, a0, j0, dt = 0.5, 1.0, -2.0, 30.0, 0.1
+    assert np.allclose(dtp.pvaj_to_pppp(p0, v0, a0, j0, dt),
+                       [p0, p0 + v0 * dt, p0 + 2 * v0 * dt + a0 * dt ** 2,
+                        p0 + 3 * v0 * dt + 3 * a0 * dt ** 2 + j0 * dt ** 3])
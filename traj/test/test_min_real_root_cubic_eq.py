@@ -16,7 +16,7 @@ def check_min_positive_real_root_for_cubic_eq(a, b, c, d, root_value):
     elif n_rts ==3:
         r = traj.min_positive_root3(r1, r2, r3)
      
-    print r1, r2, r3, n_rts     
+    print(r1, r2, r3, n_rts)
     assert np.isclose(r, root_value)
  
     
@@ -43,3 +43,29 @@ def test_3_different_negative_real_roots():
     with nose.tools.assert_raises_regexp(ValueError, "there is no real positive roots!"):
         check_min_positive_real_root_for_cubic_eq(1, 6, 11, 6,  0)
         
+
+
+### vectorized version: NaN instead of error when there are no positive real roots
+def test_min_positive_root_cubic_eq_batch():
+    a = [1,  0, 1, 1, 1]
+    b = [-6, 1, -3, 1, 6]
+    c = [11, -3, 2, 1, 11]
+    d = [-6, 2, 0, -3, 6]
+    roots = traj.min_positive_root_cubic_eq_batch(a, b, c, d)
+    assert np.allclose(roots[:4], 1.0)
+    assert np.isnan(roots[4])
+
+
+def test_real_roots_cubic_eq_batch_matches_scalar():
+    rng = np.random.default_rng(0)
+    a, b, c, d = rng.uniform(-3.0, 3.0, (4, 500))
+    a[::10] = 0.0
+    d[::7] = 0.0
+    min_roots = traj.min_positive_root_cubic_eq_batch(a, b, c, d)
+    for i in range(len(a)):
+        roots = np.roots([a[i], b[i], c[i], d[i]])
+        positive_real_roots = [r.real for r in roots if abs(r.imag) < 1e-9 and r.real > 1e-12]
+        if positive_real_roots:
+            assert np.isclose(min(positive_real_roots), min_roots[i])
+        else:
+            assert np.isnan(min_roots[i])
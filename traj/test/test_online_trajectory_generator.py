@@ -0,0 +1,96 @@
+import nose
+import numpy as np
+import traj
+
+'''
+to test online_trajectory_generator.py: starting from standstill the generator should follow the same profile as
+fit_traj_segment_phases, and with targets changing while the joints move it should stay within the limits, stay
+continuous, and reach the final target
+'''
+
+#limits
+p_max = np.full(3, 30.0)
+v_max = np.array([3.0, 2.0, 4.0])
+a_max = np.array([4.0, 4.0, 8.0])
+j_max = np.array([10.0, 20.0, 40.0])
+cycle_time = 0.001
+
+
+def run(otg, targets, n_cycles):
+    states = []
+    for target_pos, target_vel in targets:
+        for _ in range(n_cycles):
+            states.append(np.array(otg.update(target_pos, target_vel)))
+    return np.array(states)
+
+
+def test_matches_traj_segment():
+    otg = traj.OnlineTrajectoryGenerator(np.zeros(3), p_max, v_max, a_max, j_max, cycle_time)
+    target_pos = np.array([2.0, -1.0, 5.0])
+    states = run(otg, [(target_pos, None)], 3000)
+    times = cycle_time*np.arange(1, len(states) + 1)
+    for jt in range(3):
+        segment = traj.fit_traj_segment_phases(0.0, target_pos[jt], 0.0, 0.0, p_max[jt], v_max[jt], a_max[jt], j_max[jt])
+        inside = times < segment.duration
+        pos, vel, acc, jrk = segment(times[inside])
+        assert np.allclose(states[inside, :, jt], np.array([pos, vel, acc]).T)
+        assert np.allclose(states[~inside, 0, jt], target_pos[jt])
+    assert otg.finished()
+
+
+def test_changing_targets():
+    rng = np.random.default_rng(0)
+    otg = traj.OnlineTrajectoryGenerator(np.zeros(3), p_max, v_max, a_max, j_max, cycle_time)
+    targets = [(rng.uniform(-3.0, 3.0, 3), None) for _ in range(8)]
+    targets.append((np.array([1.0, -1.0, 2.0]), np.array([0.5, -0.5, 0.0])))
+    states = run(otg, targets, 700)
+    assert np.all(np.abs(states[:, 1]) <= v_max + 1e-9)
+    assert np.all(np.abs(states[:, 2]) <= a_max + 1e-9)
+    assert np.all(np.abs(np.diff(states[:, 2], axis=0)) <= j_max*cycle_time + 1e-9)
+    #setpoints are continuous: the position changes by the average velocity of the cycle (exact for constant jerk)
+    assert np.allclose(np.diff(states[:, 0], axis=0), cycle_time*(states[:-1, 1] + states[1:, 1])/2.0, atol=1e-7)
+
+    #the last target has a velocity, once reached the joints keep moving with it
+    while not otg.finished():
+        otg.update()
+    pos, vel, acc = otg.update()
+    assert np.allclose(vel, [0.5, -0.5, 0.0]) and np.allclose(acc, 0.0)
+
+
+def check_limits(states):
+    assert np.all(np.abs(states[:, 1]) <= v_max + 1e-9)
+    assert np.all(np.abs(states[:, 2]) <= a_max + 1e-9)
+    assert np.all(np.abs(np.diff(states[:, 2], axis=0)) <= j_max*cycle_time + 1e-9)
+    assert np.allclose(np.diff(states[:, 0], axis=0), cycle_time*(states[:-1, 1] + states[1:, 1])/2.0, atol=1e-7)
+
+
+def test_turnaround():
+    #from standstill, target vels pointing back toward the joints need an overshoot past the target
+    otg = traj.OnlineTrajectoryGenerator(np.zeros(3), p_max, v_max, a_max, j_max, cycle_time)
+    target_pos = np.array([0.5, 2.0, -2.0])
+    target_vel = np.array([-0.1, -0.3, 0.3])
+    states = run(otg, [(target_pos, target_vel)], 1)
+    while not otg.finished():
+        states = np.concatenate((states, [np.array(otg.update())]))
+    check_limits(states)
+    #each joint goes past its target and comes back, then keeps moving with the target vel
+    assert np.all(np.sign(states[:, 0] - target_pos).max(axis=0) != np.sign(states[:, 0] - target_pos).min(axis=0))
+    assert np.allclose(states[-1, 1], target_vel)
+
+    #new targets with random vels while the joints move
+    rng = np.random.default_rng(1)
+    targets = [(rng.uniform(-3.0, 3.0, 3), rng.uniform(-1.0, 1.0, 3)*v_max) for _ in range(40)]
+    check_limits(run(otg, targets, 37))
+
+    #the turnaround point would be past the pos limit
+    otg = traj.OnlineTrajectoryGenerator(np.full(3, 29.0), p_max, v_max, a_max, j_max, cycle_time)
+    nose.tools.assert_raises(ValueError, otg.update, np.full(3, 29.9), -v_max)
+
+
+def test_update_reuses_arrays():
+    otg = traj.OnlineTrajectoryGenerator(np.zeros(3), p_max, v_max, a_max, j_max, cycle_time)
+    target_pos = np.array([2.0, -1.0, 5.0])
+    pos, vel, acc = otg.update(target_pos)
+    for _ in range(10):
+        next_pos, next_vel, next_acc = otg.update(target_pos)
+        assert next_pos is pos and next_vel is vel and next_acc is acc
@@ -2,5 +2,103 @@ import nose
 import numpy as np
 
 import traj
+from traj.parameterize_path import adaptive_blend_distances, path_derivatives, path_segments
 
+'''
+to test parameterize_path.py: s should be the length travelled along the path, with one linear piece per segment
+'''
 
+path = np.array([(0.0, 0.0, 0.0), (1.0, 0.5, 0.2), (1.0, 0.5, 0.2), (1.5, 0.2, -0.3), (0.5, 0.1, 0.0)])
+
+
+def test_path_segments():
+    starts, directions, lengths, boundaries = path_segments(path)
+    # the repeated waypoint doesn't give a segment
+    unique_path = np.delete(path, 2, axis=0)
+    assert np.allclose(starts, unique_path[:-1])
+    assert np.allclose(lengths, np.linalg.norm(np.diff(unique_path, axis=0), axis=1))
+    assert np.allclose(np.linalg.norm(directions, axis=1), 1.0)
+    assert np.allclose(starts + directions*lengths[:, np.newaxis], unique_path[1:])
+    assert np.allclose(boundaries, np.concatenate(([0.0], np.cumsum(lengths))))
+
+
+def test_numeric_matches_sympy():
+    numeric_path_function = traj.parameterize_path(path, numeric=True)
+    sympy_path_function = traj.parameterize_path(path)
+    assert len(sympy_path_function.functions) == len(numeric_path_function.coefficients) == 3
+    s_values = np.linspace(0.0, numeric_path_function.boundaries[-1], 51)
+    assert np.allclose(numeric_path_function(s_values), sympy_path_function(s_values))
+    assert np.allclose(numeric_path_function(numeric_path_function.boundaries), np.delete(path, 2, axis=0))
+
+
+def test_path_without_length():
+    nose.tools.assert_raises(ValueError, traj.parameterize_path, np.ones((3, 2)), numeric=True)
+
+
+def test_blends_match_sympy():
+    numeric_path_function = traj.parameterize_path_with_blends(path, 0.1, numeric=True)
+    sympy_path_function = traj.parameterize_path_with_blends(path, 0.1)
+    s_values = np.linspace(0.0, numeric_path_function.boundaries[-1], 51)
+    assert np.allclose(numeric_path_function.boundaries, sympy_path_function.boundaries)
+    assert np.allclose(numeric_path_function(s_values), sympy_path_function(s_values))
+    assert np.allclose(path_derivatives(numeric_path_function, s_values), path_derivatives(sympy_path_function, s_values))
+
+
+def test_blends_are_tangent():
+    rng = np.random.default_rng(0)
+    random_path = np.cumsum(rng.uniform(-1.0, 1.0, (50, 4)), axis=0)
+    path_function = traj.parameterize_path_with_blends(random_path, 0.05, numeric=True)
+    assert np.allclose(path_function(0.0), random_path[0])
+    assert np.allclose(path_function(path_function.boundaries[-1]), random_path[-1])
+    # position and direction are continuous where pieces meet, and the path has unit speed
+    inner_boundaries = path_function.boundaries[1:-1]
+    for offset in (-1e-9, 1e-9):
+        assert np.allclose(path_function(inner_boundaries + offset), path_function(inner_boundaries), atol=1e-8)
+    first_derivatives = path_derivatives(path_function, np.concatenate((inner_boundaries - 1e-9, inner_boundaries)), 1)
+    before, after = np.split(first_derivatives[:, 0], 2)
+    assert np.allclose(before, after, atol=1e-6)
+    s_values = np.linspace(0.0, path_function.boundaries[-1], 1001)
+    assert np.allclose(np.linalg.norm(path_derivatives(path_function, s_values, 1)[:, 0], axis=1), 1.0)
+    # every corner has an arc, which stays within the blend distance of the corner
+    assert np.all(path_function.radii[1::2] > 0.0)
+    for corner, s_start, s_end in zip(random_path[1:-1], path_function.boundaries[1::2], path_function.boundaries[2::2]):
+        arc_points = path_function(np.linspace(s_start, s_end, 11))
+        assert np.all(np.linalg.norm(arc_points - corner, axis=1) <= 0.05 + 1e-9)
+
+
+def test_blends_skip_straight_corners():
+    straight_path = np.array([(0.0, 0.0), (1.0, 0.0), (2.0, 0.0), (2.0, 1.0)])
+    path_function = traj.parameterize_path_with_blends(straight_path, 0.2, numeric=True)
+    # two lines into the only real corner, its arc, and the last line
+    assert len(path_function.radii) == 4
+    assert np.count_nonzero(path_function.radii) == 1
+    nose.tools.assert_raises(ValueError, traj.parameterize_path_with_blends, straight_path, 1.1, numeric=True)
+
+
+def test_adaptive_blends():
+    rng = np.random.default_rng(1)
+    random_path = np.cumsum(rng.uniform(-1.0, 1.0, (30, 3)), axis=0)
+    # a short segment which a fixed blend radius can't handle
+    random_path[10] = random_path[9] + 0.01
+    nose.tools.assert_raises(ValueError, traj.parameterize_path_with_blends, random_path, 0.2, numeric=True)
+
+    starts, directions, lengths, _ = path_segments(random_path)
+    distances = adaptive_blend_distances(directions, lengths, 0.02)
+    half_lengths = np.minimum(lengths[:-1], lengths[1:])/2.0
+    assert np.all(distances <= half_lengths)
+    path_function = traj.parameterize_path_with_blends(random_path, max_deviation=0.02, numeric=True)
+    assert np.allclose(path_function(path_function.boundaries[[0, -1]]), random_path[[0, -1]])
+
+    # the middle of each arc is its closest point to the corner
+    is_arc = path_function.radii > 0.0
+    assert np.count_nonzero(is_arc) == len(random_path) - 2
+    arc_middles = path_function((path_function.boundaries[:-1][is_arc] + path_function.boundaries[1:][is_arc])/2.0)
+    deviations = np.linalg.norm(arc_middles - random_path[1:-1], axis=1)
+    assert np.all(deviations <= 0.02 + 1e-9)
+    # the blends are as large as the tolerance allows, unless the segments are too short
+    limited_by_tolerance = distances < half_lengths
+    assert np.allclose(deviations[limited_by_tolerance], 0.02)
+    assert not np.all(limited_by_tolerance)
+
+    capped_path_function = traj.parameterize_path_with_blends(random_path, 0.05, numeric=True, max_deviation=0.02)
+    assert np.all(capped_path_function.radii[capped_path_function.radii > 0.0] <= path_function.radii[is_arc] + 1e-12)
@@ -0,0 +1,67 @@
+import numpy as np
+
+import traj
+from traj.parameterize_path import path_derivatives
+
+'''
+to test path_index.py: lookups through the index should give the same pieces and values as evaluating the path, for
+increasing and decreasing values of s
+'''
+
+path = np.array([(0.0, 0.0, 0.0), (1.0, 0.5, 0.2), (1.5, 0.2, -0.3), (0.5, 0.1, 0.0), (0.5, 1.0, 1.0)])
+
+
+def path_functions():
+    return (traj.parameterize_path(path), traj.parameterize_path(path, numeric=True),
+            traj.parameterize_path_with_blends(path, 0.1), traj.parameterize_path_with_blends(path, 0.1, numeric=True))
+
+
+def check_lookups(path_function, s_values):
+    path_index = traj.PathIndex(path_function, 200)
+    boundaries = path_index.boundaries
+    for s in s_values:
+        piece_i = path_index.piece_index(s)
+        assert piece_i == np.clip(np.searchsorted(boundaries, s, side='right') - 1, 0, path_index.n_pieces - 1)
+        assert np.allclose(path_index.position(s), path_function(np.array([s]))[0])
+
+
+def test_lookups():
+    for path_function in path_functions():
+        s_values = np.linspace(0.0, path_function.boundaries[-1], 57)
+        check_lookups(path_function, s_values)
+        check_lookups(path_function, s_values[::-1])
+        check_lookups(path_function, np.random.default_rng(0).permutation(s_values))
+        # exactly on the boundaries, and past the ends of the path
+        check_lookups(path_function, np.concatenate(([-1.0], np.asarray(path_function.boundaries, dtype=float),
+                                                     [path_function.boundaries[-1] + 1.0])))
+
+
+def test_tables():
+    for path_function in path_functions():
+        path_index = traj.PathIndex(path_function, 2001)
+        assert np.allclose(np.linalg.norm(path_index.directions, axis=1), 1.0)
+        assert np.allclose(path_index.derivatives[:, 0], path_derivatives(path_function, path_index.s_samples, 1)[:, 0])
+        assert np.allclose(path_index.start_derivatives[:, 0],
+                           path_derivatives(path_function, path_index.boundaries[:-1], 1)[:, 0])
+        s_values = np.linspace(0.0, path_index.boundaries[-1], 301)
+        sample_i = path_index.sample_indices(s_values)
+        assert np.all((path_index.s_samples[sample_i] <= s_values + 1e-12) &
+                      (s_values <= path_index.s_samples[sample_i + 1] + 1e-12))
+    for path_function in path_functions()[2:]:
+        # the first derivative of blended paths is continuous, so interpolation between samples is close
+        path_index = traj.PathIndex(path_function, 2001)
+        s_values = np.linspace(0.0, path_index.boundaries[-1], 301)
+        assert np.allclose(path_index.interpolated_derivatives(s_values)[:, 0],
+                           path_derivatives(path_function, s_values, 1)[:, 0], atol=1e-2)
+
+
+def test_curvature():
+    path_function = traj.parameterize_path_with_blends(path, 0.1, numeric=True)
+    path_index = traj.PathIndex(path_function, 5001)
+    piece_radii = path_function.radii[[path_index.piece_index(s) for s in path_index.s_samples]]
+    # arcs have the curvature of their circle, lines have none (away from the ends of the pieces)
+    inside = np.abs(path_index.s_samples[:, np.newaxis] - path_function.boundaries).min(axis=1) > 2.0*path_index.s_step
+    on_arc = inside & (piece_radii > 0.0)
+    assert np.any(on_arc)
+    assert np.allclose(path_index.curvature[on_arc], 1.0/piece_radii[on_arc])
+    assert np.allclose(path_index.curvature[inside & (piece_radii == 0.0)], 0.0)
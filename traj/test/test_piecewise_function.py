@@ -0,0 +1,84 @@
+import numpy as np
+from sympy import Symbol
+
+import traj
+
+
+def check_same_values(numeric_function, sympy_function):
+    assert np.allclose(numeric_function.boundaries, sympy_function.boundaries)
+    for value in np.linspace(numeric_function.boundaries[0], numeric_function.boundaries[-1], 17):
+        assert np.allclose(numeric_function(value), sympy_function(value))
+
+
+def test_integrate_matches_sympy():
+    t = Symbol('t')
+    jerk = traj.seven_segment_type3.fit(0.0, 30.0, 2.0, 0.4, 0.1, t)
+    numeric_jerk = traj.seven_segment_type3.fit(0.0, 30.0, 2.0, 0.4, 0.1, t, numeric=True)
+    check_same_values(numeric_jerk, jerk)
+    check_same_values(numeric_jerk.integrate(0.0), jerk.integrate(0.0))
+    check_same_values(numeric_jerk.integrate(0.0).integrate(1.0).integrate(2.0),
+                      jerk.integrate(0.0).integrate(1.0).integrate(2.0))
+
+
+def test_differentiate_inverts_integrate():
+    jerk = traj.seven_segment_type3.fit(0.0, 0.4, 3.1, 2.3, 0.1, Symbol('t'), numeric=True)
+    position = jerk.integrate(0.0).integrate(0.0).integrate(0.5)
+    assert position.degree == 3
+    check_same_values(position.differentiate().differentiate().differentiate(), jerk)
+    assert np.allclose(jerk.differentiate().coefficients, 0.0)
+
+
+def test_extend():
+    first = traj.PiecewisePolynomial([0.0, 1.0], [[[1.0], [2.0]]])
+    second = traj.PiecewisePolynomial([0.0, 2.0, 3.0], [[[3.0]], [[4.0]]])
+    first.extend(second)
+    assert np.allclose(first.boundaries, [0.0, 1.0, 3.0, 4.0])
+    assert first.coefficients.shape == (3, 2, 1)
+    assert np.allclose(first(0.5), 2.0)
+    assert np.allclose(first(2.0), 3.0)
+    assert np.allclose(first(4.0), 4.0)
+
+
+def test_to_sympy():
+    path = np.array([(0.0, 0.0), (0.3, -0.7), (1.0, 1.0), (-0.2, 0.4)])
+    numeric_path_function = traj.parameterize_path(path, numeric=True)
+    check_same_values(numeric_path_function, traj.parameterize_path(path))
+    check_same_values(numeric_path_function, numeric_path_function.to_sympy())
+    assert numeric_path_function.to_sympy().independent_variable == Symbol('s')
+
+
+def test_fit_traj_segment_numeric():
+    for v_start, v_end, p_end in ((0.0, 0.0, 5.0), (0.5, 2.5, 3.0), (1.5, -1.0, 10.0), (-1.5, 1.0, -5.0)):
+        sympy_functions = traj.fit_traj_segment(0.0, p_end, v_start, v_end, 30.0, 3.0, 4.0, 10.0)
+        numeric_functions = traj.fit_traj_segment(0.0, p_end, v_start, v_end, 30.0, 3.0, 4.0, 10.0, numeric=True)
+        for numeric_function, sympy_function in zip(numeric_functions, sympy_functions):
+            check_same_values(numeric_function, sympy_function)
+
+
+def test_seven_segment_type4_numeric():
+    t = Symbol('t')
+    jerk = traj.seven_segment_type4.fit(0.0, 30.0, 0.0, 0.0, 3.0, 2.0, 10.0, t, numeric=True)
+    position = jerk.integrate(0.0).integrate(0.0).integrate(0.0)
+    assert np.isclose(position(position.boundaries[-1])[0], 30.0)
+
+
+def check_array_evaluation(function):
+    values = np.linspace(function.boundaries[0], function.boundaries[-1], 101)
+    results = function(values)
+    assert results.shape == (len(values), len(function(values[0])))
+    for value, result in zip(values, results):
+        assert np.allclose(function(value), result)
+    assert function.evaluate_pieces(np.array([], dtype=int), np.array([])).shape == (0, results.shape[1])
+
+
+def test_array_evaluation():
+    position, velocity, acceleration, jerk = traj.fit_traj_segment(0.0, 10.0, 1.5, -1.0, 30.0, 3.0, 4.0, 10.0)
+    for function in (position, velocity, acceleration, jerk):
+        check_array_evaluation(function)
+        check_array_evaluation(function.to_polynomial())
+
+    path = np.array([(0.0, 0.0), (0.3, -0.7), (1.0, 1.0), (-0.2, 0.4)])
+    check_array_evaluation(traj.parameterize_path(path))
+    check_array_evaluation(traj.parameterize_path(path, numeric=True))
+    # Blended paths have arc pieces, which aren't polynomials.
+    check_array_evaluation(traj.parameterize_path_with_blends(path, 0.1))
@@ -0,0 +1,56 @@
+import traj
+
+'''
+to test planning_stats.py: while enabled, every call of the instrumented planning functions should be counted under
+the branch it took and the slowest calls should be kept with their inputs, while disabled nothing is recorded
+'''
+
+#limits
+p_max=30.0
+v_max=3.0
+a_max=4.0
+j_max=10.0
+
+# p_end, v_start, v_end
+cases = [(1.0, 0.0, 0.0), (10.0, 0.5, 0.5), (3.0, 0.5, 2.5), (-5.0, -2.5, -0.5), (10.0, 1.5, -1.0), (5.0, -1.5, 1.0)]
+
+
+def plan_cases():
+    for p_end, v_start, v_end in cases:
+        traj.fit_traj_segment_phases(0.0, p_end, v_start, v_end, p_max, v_max, a_max, j_max)
+    try:
+        traj.fit_traj_segment_phases(0.0, 0.1, 0.0, 3.0, p_max, v_max, a_max, j_max)
+    except ValueError:
+        pass
+
+
+def test_disabled():
+    traj.planning_stats.reset()
+    plan_cases()
+    assert traj.planning_stats.branch_stats() == {}
+    assert traj.planning_stats.slowest_cases('traj_segment_planning') == []
+
+
+def test_branches():
+    traj.planning_stats.reset()
+    traj.planning_stats.enable(n_slowest=3)
+    try:
+        plan_cases()
+    finally:
+        traj.planning_stats.disable()
+    stats = traj.planning_stats.branch_stats()
+    outer_calls = sum(s.calls for (name, _), s in stats.items() if name == 'calculate_jerk_sign_and_duration')
+    assert outer_calls == len(cases) + 1
+    for (name, branch), branch_stats in stats.items():
+        assert sum(branch_stats.histogram) == branch_stats.calls
+        assert branch_stats.max_us >= branch_stats.mean_us > 0.0
+    assert ('traj_segment_planning', 'b2b') in stats
+    assert ('calculate_jerk_sign_and_duration', 'complex_positive_dominant_pos_to_neg/a1') in stats
+    assert ('calculate_jerk_sign_and_duration', 'simple_positive/error') in stats
+
+    slowest = traj.planning_stats.slowest_cases('calculate_jerk_sign_and_duration')
+    assert len(slowest) == 3
+    assert slowest[0]['latency_us'] >= slowest[1]['latency_us'] >= slowest[2]['latency_us']
+    assert len(slowest[0]['args']) == 8
+    assert 'traj_segment_planning' in traj.planning_stats.report()
+    traj.planning_stats.reset()
@@ -0,0 +1,78 @@
+import numpy as np
+import traj
+import traj.reachability
+from traj.parameterize_path import path_derivatives
+
+'''
+to test reachability.py: the time optimal velocities should stay in the controllable and reachable sets, respect the
+joint limits, and match the bang-bang solution for a straight line
+'''
+
+#limits
+v_max = np.array([3.0, 2.0, 3.0])
+a_max = np.array([4.0, 3.0, 5.0])
+
+path = np.array([(0.0, 0.0, 0.0), (1.0, 0.0, 0.5), (2.0, 1.0, 0.5), (2.0, 1.5, 1.5)])
+
+
+def test_straight_line():
+    line = traj.parameterize_path(np.array([[0.0], [2.0]]), numeric=True)
+    s_grid, s_dots, times = traj.time_optimal_path_velocities(line, [1.0], [2.0], n_grid_points=1000)
+    # accelerate to v_max, cruise, and decelerate: 2.0/1.0 + 1.0/2.0
+    assert abs(times[-1] - 2.5) < 1e-3
+    assert s_dots[0] == 0.0 and s_dots[-1] == 0.0
+
+
+def check_limits(path_function):
+    s_grid, s_dots, times = traj.time_optimal_path_velocities(path_function, v_max, a_max, n_grid_points=500)
+    assert np.all(np.diff(times) > 0.0)
+    assert np.all(np.isin(path_function.boundaries, s_grid))
+
+    x = s_dots**2
+    x_max, u_bounds = traj.reachability.path_constraints(path_function, s_grid, v_max, a_max)
+    controllable = traj.reachability.controllable_sets(s_grid, x_max, u_bounds, 0.0)
+    reachable = traj.reachability.reachable_sets(s_grid, x_max, u_bounds, 0.0, controllable)
+    assert np.all(x >= controllable[:, 0] - 1e-9) and np.all(x <= controllable[:, 1] + 1e-9)
+    assert np.all(x >= reachable[:, 0] - 1e-9) and np.all(x <= reachable[:, 1] + 1e-9)
+    # the reachable sets only contain controllable values
+    assert np.all(reachable[:, 1] <= controllable[:, 1] + 1e-9)
+
+    # the limits hold with the derivatives on both sides of the piece boundaries
+    s_accelerations = np.diff(x)/(2.0*np.diff(s_grid))
+    for side in ('left', 'right'):
+        derivatives = path_derivatives(path_function, s_grid, 2, side=side)
+        joint_velocities = derivatives[:, 0]*s_dots[:, np.newaxis]
+        joint_accelerations = (derivatives[:-1, 0]*s_accelerations[:, np.newaxis] +
+                               derivatives[:-1, 1]*x[:-1, np.newaxis])
+        assert np.all(np.abs(joint_velocities) <= v_max + 1e-9)
+        assert np.all(np.abs(joint_accelerations) <= a_max + 1e-9)
+    return s_grid, s_dots, times
+
+
+def test_limits():
+    for path_function in (traj.parameterize_path(path, numeric=True), traj.parameterize_path_with_blends(path, 0.2)):
+        check_limits(path_function)
+
+
+def test_corner():
+    # the joint velocities can only change direction at an unblended corner if the path stops there
+    corner_path = np.array([(0.0, 0.0, 0.0), (1.0, 0.0, 0.0), (1.0, 1.0, 0.0)])
+    s_grid, s_dots, times = check_limits(traj.parameterize_path(corner_path, numeric=True))
+    assert s_dots[np.searchsorted(s_grid, 1.0)] == 0.0
+    # each straight segment is accelerate and decelerate with its joint's a_max, without reaching v_max
+    assert abs(times[-1] - (2.0*np.sqrt(1.0/a_max[0]) + 2.0*np.sqrt(1.0/a_max[1]))) < 1e-3
+
+    # a blended corner can be passed without stopping
+    s_grid, s_dots, blended_times = check_limits(traj.parameterize_path_with_blends(corner_path, 0.2, numeric=True))
+    assert np.all(s_dots[1:-1] > 0.0)
+    assert blended_times[-1] < times[-1]
+
+
+def test_infeasible_end_velocity():
+    line = traj.parameterize_path(np.array([[0.0], [2.0]]), numeric=True)
+    try:
+        traj.time_optimal_path_velocities(line, [1.0], [2.0], s_dot_end=2.0)
+    except ValueError:
+        pass
+    else:
+        assert False, 'Expected ValueError'
@@ -0,0 +1,73 @@
+import numpy as np
+import traj
+
+'''
+to test sample_segment.py: a SegmentSampler should agree with the TrajSegment fitted for the same segment inside the
+segment, hold the start/end state outside of it, and give the same values for scalar and array time instants
+'''
+
+#limits
+p_max=30.0
+v_max=3.0
+a_max=4.0
+j_max=10.0
+
+
+def check_sampler_matches_traj_segment(p_start, p_end, v_start, v_end):
+    segment = traj.fit_traj_segment_phases(p_start, p_end, v_start, v_end, p_max, v_max, a_max, j_max)
+    t_start = 2.0
+    sampler = traj.SegmentSampler(t_start, p_start, v_start, segment.phase_jrk, segment.phase_dur)
+    assert np.isclose(sampler.duration, segment.duration)
+
+    times = np.linspace(0.0, segment.duration, 51)[1:-1]
+    # phase boundaries are left out since the two differ in which phase's jerk they return there
+    times = times[np.min(np.abs(times[:, np.newaxis] - segment.phase_times), axis=1) > 1e-9]
+    sampled = np.array(sampler(times + t_start))
+    assert np.allclose(sampled, np.array(segment(times)))
+    for i, t in enumerate(times):
+        assert np.allclose(sampler(t + t_start), sampled[:, i])
+
+    # before and after the segment
+    assert np.allclose(sampler(t_start - 1.0), (p_start, v_start, 0.0, 0.0))
+    assert np.allclose(sampler(t_start + segment.duration + 1.0), (p_end, v_end, 0.0, 0.0))
+    assert np.allclose(sampler(np.array([t_start - 1.0, t_start + segment.duration + 1.0]))[3], 0.0)
+
+
+def test_sampler_matches_traj_segment():
+    for p_end, v_start, v_end in ((1.0, 0.0, 0.0), (5.0, 2.0, 2.5), (3.0, 2.5, 0.5), (-3.0, -0.5, -2.5), (10.0, 1.5, -1.0)):
+        check_sampler_matches_traj_segment(0.0, p_end, v_start, v_end)
+
+
+def test_sample_segment():
+    segment = traj.fit_traj_segment_phases(0.0, 5.0, 0.5, 2.5, p_max, v_max, a_max, j_max)
+    pos, vel, acc, jrk = traj.sample_segment(1.0 + segment.duration, 1.0, 0.0, 0.5, segment.phase_jrk, segment.phase_dur)
+    assert np.allclose((pos, vel, acc), (5.0, 2.5, 0.0))
+    # any number of phases
+    pos, vel, acc, jrk = traj.sample_segment(1.0, 0.0, 0.0, 0.0, [1.0, -1.0], [1.0, 1.0])
+    assert np.allclose((pos, vel, acc, jrk), (1.0/6.0, 0.5, 1.0, 1.0))
+
+
+def test_multi_joint_sampler_matches_segment_sampler():
+    pos_start = [0.0, 0.3, 0.0]
+    pos_end = [1.0, 0.8, -0.3]
+    vel_start = [0.0, 0.2, 0.0]
+    vel_end = [0.5, 0.0, 0.0]
+    syn_t, phase_dur_jt, phase_jrk_jt = traj.segment_synchronization(
+        pos_start, pos_end, vel_start, vel_end, [p_max]*3, [v_max]*3, [a_max]*3, [j_max]*3)
+    t_start = 1.0
+    sampler = traj.MultiJointSegmentSampler(t_start, pos_start, vel_start, phase_jrk_jt, phase_dur_jt)
+    times = np.linspace(t_start - 0.5, t_start + syn_t + 0.5, 201)
+    sampled = sampler(times)
+    assert sampled.shape == (len(times), 3, 4)
+    assert np.allclose(sampled[-1, :, 0], pos_end)
+    assert np.allclose(sampled[-1, :, 1], vel_end)
+    for jt in range(3):
+        joint_sampler = traj.SegmentSampler(t_start, pos_start[jt], vel_start[jt], phase_jrk_jt[jt], phase_dur_jt[jt])
+        assert np.allclose(sampled[:, jt], np.stack(joint_sampler(times), axis=-1))
+        assert np.allclose(sampler(times[100])[jt], joint_sampler(times[100]))
+
+
+def test_multi_joint_sampler_pads_phases():
+    sampler = traj.MultiJointSegmentSampler(0.0, [0.0, 0.0], [0.0, 1.0], [[1.0, -1.0], [0.0]], [[1.0, 1.0], [2.0]])
+    assert sampler.phase_dur.shape == (2, 2)
+    assert np.allclose(sampler(3.0), [[1.0, 1.0, 0.0, 0.0], [2.0, 1.0, 0.0, 0.0]])
@@ -0,0 +1,55 @@
+import numpy as np
+import traj
+
+'''
+to test segment_planning_batch.py: the batched planner should give the same phase times as calling traj_segment_planning
+for each segment, and NaN for the segments where traj_segment_planning raises an error
+'''
+
+#limits
+v_max=3.0
+a_max=4.0
+j_max=10.0
+
+# p_end, v_start, v_end for the cases in test_traj_segment.py
+cases = [(1.0, 0.0, 0.0), (3.0, 0.0, 0.0), (5.0, 0.0, 0.0),
+         (2.0, 1.0, 1.0), (3.0, 2.5, 2.5), (3.0, 0.5, 0.5), (10.0, 0.5, 0.5),
+         (2.0, 0.5, 1.5), (5.0, 2.0, 2.5), (3.0, 0.5, 2.5), (5.0, 0.5, 2.5),
+         (2.0, 1.5, 0.5), (5.0, 2.5, 2.0), (3.0, 2.5, 0.5), (5.0, 2.5, 0.5),
+         (-1.0, 0.0, 0.0), (-3.0, 0.0, 0.0), (-10.0, 0.5, 0.5), (-3.0, 0.5, 2.5),
+         (0.1, 0.0, 3.0), (0.0, 0.0, 0.0)]
+
+
+def check_batch_matches_scalar(p_end, abs_v_start, abs_v_end, abs_max_vel, abs_max_acc, abs_max_jrk):
+    batch_times = np.array(traj.traj_segment_planning_batch(0.0, p_end, abs_v_start, abs_v_end,
+                                                            abs_max_vel, abs_max_acc, abs_max_jrk))
+    for i in range(len(p_end)):
+        try:
+            times = traj.traj_segment_planning(0.0, p_end[i], abs_v_start[i], abs_v_end[i],
+                                               abs_max_vel[i], abs_max_acc[i], abs_max_jrk[i])
+        except ValueError:
+            assert np.isnan(batch_times[:, i]).all()
+            continue
+        assert np.allclose(times, batch_times[:, i])
+
+
+def test_batch_matches_scalar_cases():
+    p_end, v_start, v_end = [np.array(x) for x in zip(*cases)]
+    n = len(cases)
+    check_batch_matches_scalar(p_end, v_start, v_end, np.full(n, v_max), np.full(n, a_max), np.full(n, j_max))
+
+
+def test_batch_matches_scalar_random():
+    rng = np.random.default_rng(0)
+    n = 2000
+    v_start = rng.uniform(0.0, 3.0, n)
+    v_end = rng.uniform(0.0, 3.0, n)
+    v_start[::7] = v_end[::7]
+    check_batch_matches_scalar(rng.uniform(-10.0, 10.0, n), v_start, v_end,
+                               rng.uniform(3.0, 5.0, n), rng.uniform(1.0, 6.0, n), rng.uniform(2.0, 20.0, n))
+
+
+def test_batch_broadcasts_limits():
+    t_jrk_to_vf, t_acc_to_vf, t_jrk, t_acc, t_vel = traj.traj_segment_planning_batch(
+        0.0, np.array([[1.0, 3.0], [5.0, 10.0]]), 0.5, 0.5, v_max, a_max, j_max)
+    assert t_vel.shape == (2, 2)
@@ -0,0 +1,51 @@
+import numpy as np
+
+import traj
+from traj.simplify_path import _segment_distances
+
+'''
+to test simplify_path.py: every removed waypoint should be within the tolerance of the simplified path, and the
+waypoints which are needed to stay within the tolerance should be kept
+'''
+
+
+def check_within_tolerance(path, simplified_path, indices, tolerance):
+    assert np.array_equal(simplified_path, path[indices])
+    assert indices[0] == 0 and indices[-1] == len(path) - 1
+    # each waypoint is compared with the simplified segment around it
+    segment_i = np.clip(np.searchsorted(indices, np.arange(len(path)), side='right') - 1, 0, len(indices) - 2)
+    distances = _segment_distances(path, path[indices[segment_i]], path[indices[segment_i + 1]])
+    assert np.all(distances <= tolerance + 1e-12)
+
+
+def test_collinear_and_repeated_waypoints():
+    path = np.array([(0.0, 0.0), (0.5, 0.0), (0.5, 0.0), (1.0, 0.0005), (2.0, 0.0), (2.0, 1.0), (2.0, 1.0)])
+    simplified_path, indices = traj.simplify_path(path, 1e-3)
+    assert list(indices) == [0, 4, 6]
+    check_within_tolerance(path, simplified_path, indices, 1e-3)
+
+
+def test_reversal_is_kept():
+    # the path goes back along the same line, the far end is on the line between its neighbours
+    path = np.array([(0.0, 0.0), (1.0, 1.0), (2.0, 2.0), (0.5, 0.5), (0.0, 0.0)])
+    simplified_path, indices = traj.simplify_path(path, 1e-3)
+    assert list(indices) == [0, 2, 4]
+
+
+def test_dense_path():
+    t = np.linspace(0.0, 10.0, 5001)
+    path = np.stack((np.sin(t), np.cos(0.5*t), 0.1*t, np.zeros_like(t)), axis=1)
+    for tolerance in (1e-2, 1e-4):
+        simplified_path, indices = traj.simplify_path(path, tolerance)
+        assert len(indices) < len(path)/10
+        check_within_tolerance(path, simplified_path, indices, tolerance)
+
+
+def test_per_joint_tolerance():
+    rng = np.random.default_rng(0)
+    path = np.cumsum(rng.uniform(-1.0, 1.0, (200, 3))*[1.0, 0.01, 0.01], axis=0)
+    tolerance = np.array([0.1, 0.001, 0.001])
+    simplified_path, indices = traj.simplify_path(path, tolerance)
+    check_within_tolerance(path/tolerance, simplified_path/tolerance, indices, 1.0)
+    # the same as scaling the path by the tolerance
+    assert np.array_equal(indices, traj.simplify_path(path/tolerance, 1.0)[1])
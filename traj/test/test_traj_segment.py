@@ -198,3 +198,26 @@ def test_Y2_complex_positive_dominant_motion():
 
 
   
+
+
+
+############## fast mode: phase table instead of sympy functions ##########################
+def check_fit_traj_segment_phases(p_start, p_end, v_start, v_end, p_max, v_max, a_max, j_max):
+    segment = traj.fit_traj_segment_phases(p_start, p_end, v_start, v_end, p_max, v_max, a_max, j_max)
+    position, velocity, acceleration, jerk = traj.fit_traj_segment(p_start, p_end, v_start, v_end, p_max, v_max, a_max, j_max)
+
+    assert np.allclose(segment.phase_times, position.boundaries)
+    assert np.isclose(segment.infl_points_pos[-1], p_end)
+    assert np.isclose(segment.infl_points_vel[-1], v_end)
+    times = np.linspace(0.0, segment.duration, 50)
+    pos, vel, acc, jrk = segment(times)
+    assert np.allclose(pos, position(times)[:, 0])
+    assert np.allclose(vel, velocity(times)[:, 0])
+    assert np.allclose(acc, acceleration(times)[:, 0])
+
+
+def test_fit_traj_segment_phases():
+    check_fit_traj_segment_phases(0.0, 5.0,       0.5, 2.5,    p_max, v_max, a_max, j_max)
+    check_fit_traj_segment_phases(0.0, -3.0,      -2.5, -0.5,  p_max, v_max, a_max, j_max)
+    check_fit_traj_segment_phases(0.0, 10.0,      1.5, -1.0,   p_max, v_max, a_max, j_max)
+    check_fit_traj_segment_phases(0.0, -5.0,      -1.5,  1.0,  p_max, v_max, a_max, j_max)
@@ -0,0 +1,45 @@
+import numpy as np
+
+import traj
+
+'''
+to test trajectory_v2.py: the numeric pipeline should give the same trajectory as the sympy one,
+pass through the waypoints and respect the joint limits
+'''
+
+# limits
+max_velocities = np.array([1.0, 1.0, 1.0])
+max_accelerations = np.array([2.0, 2.0, 2.0])
+max_jerks = np.array([10.0, 10.0, 10.0])
+
+path = np.array([(0.0, 0.0, 0.0), (1.0, 0.5, 0.2), (1.5, 0.2, -0.3), (0.5, 0.1, 0.0)])
+
+
+def test_numeric_matches_sympy():
+    v_start = v_end = np.zeros(3)
+    sympy_functions = traj.trajectory_for_path_v2(path, v_start, v_end, max_velocities, max_accelerations, max_jerks)
+    numeric_functions = traj.trajectory_for_path_v2(path, v_start, v_end, max_velocities, max_accelerations, max_jerks,
+                                                    numeric=True)
+    times = np.linspace(0.0, numeric_functions[0].boundaries[-1], 101)
+    for numeric_function, sympy_function in zip(numeric_functions, sympy_functions):
+        assert np.allclose(numeric_function.boundaries, sympy_function.boundaries.astype(np.float64))
+        assert np.allclose(numeric_function(times), sympy_function(times))
+
+
+def test_numeric_trajectory_within_limits():
+    rng = np.random.default_rng(0)
+    random_path = rng.uniform(-1.0, 1.0, (50, 3))
+    position, velocity, acceleration, jerk = traj.trajectory_for_path_v2(
+        random_path, np.zeros(3), np.zeros(3), max_velocities, max_accelerations, max_jerks, numeric=True)
+    assert position.coefficients.shape[1:] == (4, 3)
+    assert np.allclose(position(position.boundaries[0]), random_path[0])
+    assert np.allclose(position(position.boundaries[-1]), random_path[-1])
+    assert np.allclose(velocity(velocity.boundaries[-1]), 0.0)
+
+    times = np.linspace(0.0, position.boundaries[-1], 5001)
+    assert np.all(np.abs(velocity(times)) <= max_velocities + 1e-6)
+    assert np.all(np.abs(acceleration(times)) <= max_accelerations + 1e-6)
+    assert np.all(np.abs(jerk(times)) <= max_jerks + 1e-6)
+    # every waypoint is reached at the start of one of the pieces
+    waypoint_distances = np.linalg.norm(position(position.boundaries)[:, np.newaxis] - random_path, axis=2)
+    assert np.allclose(waypoint_distances.min(axis=0), 0.0)